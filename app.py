@@ -1,5 +1,8 @@
-from flask import Flask, render_template, redirect, url_for, flash, request, jsonify
+from flask import Flask, render_template, redirect, url_for, flash, request, jsonify, Response, stream_with_context, send_file, g, has_request_context, session
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
@@ -8,8 +11,21 @@ import os
 from openai import OpenAI
 from authlib.integrations.flask_client import OAuth
 import secrets
+import re
+import json
+import time
+import threading
+import unicodedata
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from dotenv import load_dotenv
 from werkzeug.middleware.proxy_fix import ProxyFix
+import click
+import reports
+import pacing
+import forecast
+import numpy as np
 
 # Explicitly load .env file
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -19,7 +35,16 @@ if os.path.exists(dotenv_path):
 else:
     print(" * Warning: .env file not found.")
 
+class FinanzJSONProvider(DefaultJSONProvider):
+    """Los montos son Decimal: se serializan como número (no como string) para no romper el frontend."""
+    @staticmethod
+    def default(o):
+        if isinstance(o, Decimal):
+            return float(o)
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = FinanzJSONProvider(app)
 # Fix para Render: Permitir que Flask detecte HTTPS detrás del proxy
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1)
 
@@ -39,6 +64,26 @@ if database_url and database_url.startswith("postgres://"):
 
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url or 'sqlite:///finanzapp.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Pool de conexiones y ajustes del motor (por worker de gunicorn)
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+    engine_options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # Render/PgBouncer cierran conexiones inactivas: se validan antes de usarlas y se reciclan
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') != '0',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    statement_timeout_ms = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    if statement_timeout_ms > 0:
+        engine_options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout_ms}'}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+else:
+    # SQLite: esperar al lock en lugar de fallar con "database is locked"
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'connect_args': {'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', 15))}
+    }
 app.config['GOOGLE_CLIENT_ID'] = os.environ.get('GOOGLE_CLIENT_ID')
 app.config['GOOGLE_CLIENT_SECRET'] = os.environ.get('GOOGLE_CLIENT_SECRET')
 
@@ -52,13 +97,59 @@ oauth.register(
 )
 
 db = SQLAlchemy(app)
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Modo local: WAL permite lecturas concurrentes con una escritura y synchronous=NORMAL evita un fsync por commit."""
+    import sqlite3
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')}")
+    cursor.execute(f"PRAGMA synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    cursor.close()
 login_manager = LoginManager()
 login_manager.login_view = 'login'
 login_manager.init_app(app)
 
+# --- MONTOS EXACTOS (centavos enteros) ---
+# Todo el dinero se guarda como BIGINT de centavos y se expone como Decimal con 2 decimales:
+# las sumas en SQL son enteras y las de Python exactas, sin la deriva de Float.
+CENT = Decimal('0.01')
+
+def to_cents(value):
+    """Decimal/int/float/str -> centavos enteros (redondeo comercial a 2 decimales)."""
+    if isinstance(value, float):
+        value = repr(value)
+    return int(Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+def parse_money(value):
+    """Monto de un formulario como Decimal de 2 decimales. Lanza ValueError si no es un número válido."""
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Monto inválido: '{value}'.")
+    if not amount.is_finite():
+        raise ValueError(f"Monto inválido: '{value}'.")
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+class Money(db.TypeDecorator):
+    """Columna de dinero: BIGINT de centavos en la BD, Decimal en Python."""
+    impl = db.BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return get_session_user(int(user_id))
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -67,6 +158,7 @@ class User(UserMixin, db.Model):
     password = db.Column(db.String(255), nullable=False) 
     auth_type = db.Column(db.String(20), default='email') # 'email' or 'google'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    data_version = db.Column(db.Integer, nullable=False, default=0) # sube con cada escritura de sus datos
 
     transactions = db.relationship('Transaction', backref='author', lazy=True)
 
@@ -76,20 +168,25 @@ class User(UserMixin, db.Model):
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column('amount_cents', Money, nullable=False)
     type = db.Column(db.String(20), nullable=False)  # 'income' o 'expense'
     category = db.Column(db.String(50), nullable=False)
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     description = db.Column(db.Text, nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    # Todas las consultas calientes filtran por usuario + rango de fechas
+    __table_args__ = (
+        db.Index('ix_transaction_user_date', 'user_id', 'date'),
+    )
+
     def __repr__(self):
         return f'<Transaction {self.title} - {self.amount}>'
 
 class Subscription(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column('amount_cents', Money, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     billing_period = db.Column(db.String(20), nullable=False) # 'mensual', 'anual'
     start_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -97,9 +194,26 @@ class Subscription(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     active = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        db.Index('ix_subscription_user_active', 'user_id', 'active'),
+    )
+
     def __repr__(self):
         return f'<Subscription {self.name}>'
 
+# Registro de cobros ya posteados: la restricción única impide cobrar dos veces el mismo periodo
+class SubscriptionCharge(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('subscription.id'), nullable=False)
+    due_date = db.Column(db.DateTime, nullable=False)
+    # Movimiento posteado por este cobro (NULL si el usuario lo borró)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id', ondelete='SET NULL'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('subscription_id', 'due_date', name='uq_subscription_charge_period'),
+    )
+
 def add_months(sourcedate, months):
     import calendar
     month = sourcedate.month - 1 + months
@@ -108,15 +222,99 @@ def add_months(sourcedate, months):
     day = min(sourcedate.day, calendar.monthrange(year,month)[1])
     return sourcedate.replace(year=year, month=month, day=day)
 
+def month_range(year, month):
+    """Límites [inicio, fin) del mes, aptos para filtrar con el índice (user_id, date)."""
+    start_date = datetime(year, month, 1)
+    end_date = add_months(start_date, 1)
+    return start_date, end_date
+
+# --- CAPA DE AGREGACIÓN (KPIs calculados en SQL) ---
+# Las sumas se resuelven con GROUP BY en la base de datos (SQLite y PostgreSQL)
+# en lugar de cargar cada Transaction como objeto ORM y recorrerlo en Python.
+
+def get_period_kpis(user_id, start_date, end_date):
+    """Totales de ingresos/gastos, gasto por categoría y balance diario del periodo [start_date, end_date)."""
+    period_filter = (
+        Transaction.user_id == user_id,
+        Transaction.date >= start_date,
+        Transaction.date < end_date
+    )
+
+    rows = db.session.query(
+        Transaction.type,
+        Transaction.category,
+        db.func.sum(Transaction.amount),
+        db.func.count(Transaction.id)
+    ).filter(*period_filter).group_by(Transaction.type, Transaction.category).all()
+
+    total_income = 0
+    total_expense = 0
+    cat_totals = {}
+    tx_count = 0
+    for tx_type, category, amount, count in rows:
+        tx_count += count
+        if tx_type == 'income':
+            total_income += amount
+        elif tx_type == 'expense':
+            total_expense += amount
+            cat_totals[category] = cat_totals.get(category, 0) + amount
+
+    day_col = db.extract('day', Transaction.date)
+    signed_amount = db.case((Transaction.type == 'income', Transaction.amount), else_=-Transaction.amount)
+    daily_rows = db.session.query(
+        day_col,
+        db.func.sum(signed_amount)
+    ).filter(*period_filter).group_by(day_col).all()
+    daily_balances = {int(day): amount for day, amount in daily_rows}
+
+    return {
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'cat_totals': cat_totals,
+        'daily_balances': daily_balances,
+        'tx_count': tx_count
+    }
+
+def get_chart_data(user_id, since):
+    """Datos de las gráficas del dashboard desde `since`: gasto por categoría y flujo diario {fecha: {income, expense}}."""
+    category_rows = db.session.query(
+        Transaction.category,
+        db.func.sum(Transaction.amount)
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= since,
+        Transaction.type == 'expense'
+    ).group_by(Transaction.category).all()
+
+    day_col = db.func.date(Transaction.date)
+    daily_rows = db.session.query(
+        day_col,
+        db.func.sum(db.case((Transaction.type == 'income', Transaction.amount), else_=0)),
+        db.func.sum(db.case((Transaction.type == 'expense', Transaction.amount), else_=0))
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= since
+    ).group_by(day_col).all()
+
+    return {
+        'categories': {category: amount for category, amount in category_rows},
+        # date() devuelve str en SQLite y date en PostgreSQL
+        'daily': {str(day)[:10]: {'income': income, 'expense': expense} for day, income, expense in daily_rows}
+    }
+
 # Modelo para Metas de Ahorro
 class SavingsGoal(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    target_amount = db.Column(db.Float, nullable=False)
-    current_amount = db.Column(db.Float, default=0.0)
+    target_amount = db.Column('target_amount_cents', Money, nullable=False)
+    current_amount = db.Column('current_amount_cents', Money, default=0)
     target_date = db.Column(db.DateTime, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_savings_goal_user', 'user_id'),
+    )
+
     def __repr__(self):
         return f'<SavingsGoal {self.name}>'
 
@@ -124,8 +322,612 @@ class SavingsGoal(db.Model):
 class Budget(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     category = db.Column(db.String(50), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column('amount_cents', Money, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    # Cubre filter_by(user_id=...) y la búsqueda (user_id, category) de add_budget
+    __table_args__ = (
+        db.Index('ix_budget_user_category', 'user_id', 'category'),
+    )
+
+# Resumen mensual materializado por usuario (se mantiene en cada escritura de Transaction)
+class MonthlySummary(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    total_income = db.Column('total_income_cents', Money, nullable=False, default=0)
+    total_expense = db.Column('total_expense_cents', Money, nullable=False, default=0)
+    category_totals = db.Column(db.JSON, nullable=False, default=dict) # gasto por categoría, en centavos
+    tx_count = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0) # sube con cada escritura del mes
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'year', 'month', name='uq_monthly_summary_user_month'),
+    )
+
+    def __repr__(self):
+        return f'<MonthlySummary {self.user_id} {self.year}-{self.month}>'
+
+# --- VERSIÓN DE DATOS POR USUARIO ---
+# User.data_version sube en la misma transacción que cualquier escritura de movimientos,
+# suscripciones, metas o presupuestos. Las cachés derivadas (p. ej. el dashboard) la usan
+# como parte de la clave, así que nunca hace falta borrarlas explícitamente.
+
+def bump_data_version(user_id=None):
+    """Sube la versión de datos del usuario (o de todos si user_id es None). No hace commit."""
+    query = db.update(User).values(data_version=User.data_version + 1)
+    if user_id is not None:
+        query = query.where(User.id == user_id)
+    db.session.execute(query)
+
+def get_data_version(user_id):
+    return db.session.execute(db.select(User.data_version).where(User.id == user_id)).scalar() or 0
+
+# --- RESUMEN MENSUAL (ROLLUP INCREMENTAL) ---
+
+def update_monthly_summary(user_id, date, tx_type, category, amount, sign=1, count=1):
+    """Suma (sign=1) o resta (sign=-1) un movimiento en el resumen de su mes.
+
+    `amount` y `count` pueden ser el total de varios movimientos del mismo mes/tipo/categoría.
+
+    No hace commit: el cambio viaja en la misma transacción de BD que la escritura del movimiento.
+    """
+    # FOR UPDATE no bloquea una fila que aún no existe: dos primeras escrituras del mes a la vez
+    # chocarían en uq_monthly_summary_user_month. Se crea antes con INSERT ... ON CONFLICT DO NOTHING
+    # y luego se bloquea la fila, exista ya o no.
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name in ('postgresql', 'sqlite'):
+        if dialect_name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.session.execute(insert(MonthlySummary).values(
+            user_id=user_id, year=date.year, month=date.month, total_income=Decimal(0), total_expense=Decimal(0),
+            category_totals={}, tx_count=0, version=0
+        ).on_conflict_do_nothing(index_elements=['user_id', 'year', 'month']))
+
+    summary = MonthlySummary.query.filter_by(
+        user_id=user_id, year=date.year, month=date.month
+    ).with_for_update().first()
+
+    if not summary:
+        summary = MonthlySummary(user_id=user_id, year=date.year, month=date.month,
+                                 total_income=Decimal(0), total_expense=Decimal(0), category_totals={}, tx_count=0, version=0)
+        db.session.add(summary)
+
+    delta = sign * amount
+    if tx_type == 'income':
+        summary.total_income += delta
+    else:
+        summary.total_expense += delta
+
+    if tx_type == 'expense':
+        # Reasignar el dict para que SQLAlchemy detecte el cambio en la columna JSON
+        category_totals = dict(summary.category_totals or {})
+        category_totals[category] = category_totals.get(category, 0) + to_cents(delta)
+        summary.category_totals = category_totals
+
+    summary.tx_count += sign * count
+    summary.version += 1
+    bump_data_version(user_id)
+
+def rebuild_monthly_summaries(user_id=None):
+    """Recalcula desde cero los resúmenes mensuales (de un usuario o de todos) a partir de Transaction."""
+    delete_query = MonthlySummary.query
+    if user_id is not None:
+        delete_query = delete_query.filter_by(user_id=user_id)
+    # Conservar la versión de cada mes para no reutilizar reportes cacheados de datos anteriores
+    previous_versions = {(m.user_id, m.year, m.month): m.version for m in delete_query.all()}
+    delete_query.delete(synchronize_session=False)
+
+    year_col = db.extract('year', Transaction.date)
+    month_col = db.extract('month', Transaction.date)
+    query = db.session.query(
+        Transaction.user_id,
+        year_col,
+        month_col,
+        Transaction.type,
+        Transaction.category,
+        db.func.sum(Transaction.amount),
+        db.func.count(Transaction.id)
+    )
+    if user_id is not None:
+        query = query.filter(Transaction.user_id == user_id)
+    rows = query.group_by(Transaction.user_id, year_col, month_col, Transaction.type, Transaction.category).all()
+
+    summaries = {}
+    for uid, year, month, tx_type, category, amount, count in rows:
+        key = (uid, int(year), int(month))
+        if key not in summaries:
+            summaries[key] = {'total_income': Decimal(0), 'total_expense': Decimal(0), 'category_totals': {}, 'tx_count': 0}
+        summary = summaries[key]
+        if tx_type == 'income':
+            summary['total_income'] += amount
+        else:
+            summary['total_expense'] += amount
+        if tx_type == 'expense':
+            summary['category_totals'][category] = summary['category_totals'].get(category, 0) + to_cents(amount)
+        summary['tx_count'] += count
+
+    for (uid, year, month), values in summaries.items():
+        version = previous_versions.get((uid, year, month), 0) + 1
+        db.session.add(MonthlySummary(user_id=uid, year=year, month=month, version=version, **values))
+
+    bump_data_version(user_id)
+    db.session.commit()
+    return len(summaries)
+
+def get_monthly_history(user_id, since):
+    """Ingresos, gastos y balance por mes desde el mes de `since`, del más reciente al más antiguo."""
+    month_names = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+    summaries = MonthlySummary.query.filter(
+        MonthlySummary.user_id == user_id,
+        MonthlySummary.tx_count > 0,
+        MonthlySummary.year * 12 + MonthlySummary.month >= since.year * 12 + since.month
+    ).order_by(MonthlySummary.year.desc(), MonthlySummary.month.desc()).all()
+
+    return [{
+        'year': m.year,
+        'month': m.month,
+        'name': f"{month_names[m.month - 1]} {m.year}",
+        'total_income': m.total_income,
+        'total_expense': m.total_expense,
+        'balance': m.total_income - m.total_expense
+    } for m in summaries]
+
+@app.cli.command('rebuild-monthly-summary')
+@click.option('--user-id', type=int, default=None, help='Reconstruir solo este usuario.')
+def rebuild_monthly_summary_command(user_id):
+    """Backfill/reconstrucción de la tabla MonthlySummary."""
+    count = rebuild_monthly_summaries(user_id)
+    print(f" * Resumen mensual reconstruido: {count} meses.")
+
+# --- CACHÉ (TTL + LRU) ---
+# Backend en proceso por defecto. Si se define CACHE_REDIS_URL se usa Redis como backend
+# compartido, así todos los workers de gunicorn aprovechan los mismos aciertos (el límite
+# de tamaño lo aplica Redis con maxmemory-policy allkeys-lru).
+
+class TTLCache:
+    """Caché en memoria con expiración por TTL y desalojo LRU al superar `maxsize`.
+
+    `clock` devuelve segundos monótonos (time.monotonic); los tests pasan un reloj falso.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < self.clock():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (self.clock() + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {'backend': 'memory', 'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+class RedisCache:
+    """Misma interfaz que TTLCache sobre Redis (valores serializados en JSON)."""
+
+    def __init__(self, client, namespace, ttl=300):
+        self.client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key):
+        return f"finanzapp:{self.namespace}:{key}"
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception as e:
+            print(f"Cache Error (Redis): {e}")
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.setex(self._key(key), int(ttl or self.ttl), json.dumps(value))
+        except Exception as e:
+            print(f"Cache Error (Redis): {e}")
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception as e:
+            print(f"Cache Error (Redis): {e}")
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(self._key('*')):
+                self.client.delete(key)
+        except Exception as e:
+            print(f"Cache Error (Redis): {e}")
+
+    def stats(self):
+        return {'backend': 'redis', 'hits': self.hits, 'misses': self.misses}
+
+_redis_client = None
+
+def make_cache(namespace, maxsize=1024, ttl=300):
+    """Crea una caché compartida (Redis) si CACHE_REDIS_URL está configurada; si no, en memoria."""
+    global _redis_client
+    redis_url = os.environ.get('CACHE_REDIS_URL')
+    if redis_url:
+        try:
+            if _redis_client is None:
+                import redis
+                _redis_client = redis.Redis.from_url(redis_url)
+            return RedisCache(_redis_client, namespace, ttl=ttl)
+        except Exception as e:
+            print(f" * Cache Advertencia: Redis no disponible ({e}). Usando caché en memoria.")
+    return TTLCache(maxsize=maxsize, ttl=ttl)
+
+def normalize_question(text):
+    """Clave de caché para preguntas: minúsculas, sin acentos y con espacios colapsados."""
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+# --- IDENTIDAD DE SESIÓN (current_user sin consulta por request) ---
+# El user_loader de flask-login se ejecuta en cada request autenticado. En lugar de cargar el
+# User completo, se cachea una identidad ligera (id, name, email, auth_type).
+# Cada acierto es una consulta ahorrada (user_identity_cache.stats()['hits']).
+# Lo que necesite datos frescos (p. ej. el hash de la contraseña) debe leer User de la BD.
+# Con CACHE_REDIS_URL la caché es compartida y una invalidación llega a todos los workers. Sin
+# Redis es por proceso: tras un cambio de perfil, los demás workers pueden servir la identidad
+# anterior hasta USER_CACHE_TTL segundos.
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+user_identity_cache = make_cache('user_identity', maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+class SessionUser(UserMixin):
+    """Instantánea de solo lectura del usuario autenticado (no está ligada a la sesión de SQLAlchemy)."""
+
+    def __init__(self, id, name, email, auth_type):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.auth_type = auth_type
+
+    def __repr__(self):
+        return f'<SessionUser {self.email}>'
+
+def get_session_user(user_id):
+    # Se cachean los campos (serializables en JSON para Redis), no el objeto
+    identity = user_identity_cache.get(user_id)
+    if identity is None:
+        row = db.session.execute(
+            db.select(User.id, User.name, User.email, User.auth_type).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        identity = list(row)
+        user_identity_cache.set(user_id, identity)
+    return SessionUser(*identity)
+
+def invalidate_session_user(user_id):
+    """Descarta la identidad cacheada para que el próximo request la recargue de la BD."""
+    user_identity_cache.delete(user_id)
+
+@event.listens_for(User, 'after_update')
+def queue_session_user_invalidation(mapper, connection, target):
+    # Cualquier UPDATE de un User vía ORM (contraseña, nombre, correo...) invalida su identidad,
+    # pero solo al confirmar: antes, otro request podría volver a cachear los datos sin confirmar
+    from sqlalchemy.orm import object_session
+    object_session(target).info.setdefault('stale_user_ids', set()).add(target.id)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_committed_session_users(session):
+    for user_id in session.info.pop('stale_user_ids', ()):
+        invalidate_session_user(user_id)
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_session_user_invalidations(session):
+    session.info.pop('stale_user_ids', None)
+
+# --- MÉTRICAS DE RENDIMIENTO (/metrics en formato Prometheus + log de consultas lentas) ---
+# Por request: ruta, latencia total, número y tiempo de consultas SQL (eventos de SQLAlchemy).
+# Aparte: duración de llamadas salientes (LLM, búsqueda, render de PDF). Los valores son por
+# proceso: con varios workers de gunicorn, Prometheus debe raspar cada uno o sumarlos.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # sin token, /metrics solo responde en modo debug
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+class MetricsRegistry:
+    """Contadores e histogramas en memoria, serializables en el formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = OrderedDict()  # nombre -> (tipo, ayuda, buckets)
+        self._values = {}           # (nombre, labels) -> valor o [conteos por bucket, suma, total]
+
+    def describe(self, name, kind, help_text, buckets=None):
+        self._meta[name] = (kind, help_text, buckets)
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._values[key] = value
+
+    def observe(self, name, value, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        buckets = self._meta[name][2]
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+        return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(v[0]), v[1], v[2]) if isinstance(v, list) else v for key, v in self._values.items()}
+
+        lines = []
+        for name, (kind, help_text, buckets) in self._meta.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (metric, labels), value in values.items():
+                if metric != name:
+                    continue
+                if kind != 'histogram':
+                    lines.append(f'{name}{self._format_labels(labels)} {value}')
+                    continue
+                bucket_counts, total, count = value
+                for bound, bucket_count in zip(buckets, bucket_counts):
+                    lines.append(f'{name}_bucket{self._format_labels(labels + (("le", bound),))} {bucket_count}')
+                lines.append(f'{name}_bucket{self._format_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{self._format_labels(labels)} {total}')
+                lines.append(f'{name}_count{self._format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+metrics.describe('http_requests_total', 'counter', 'Requests atendidos por ruta, método y estado.')
+metrics.describe('http_request_duration_seconds', 'histogram', 'Latencia del handler por ruta.', LATENCY_BUCKETS)
+metrics.describe('http_request_db_queries', 'histogram', 'Consultas SQL por request (un N+1 desplaza la distribución).', QUERY_COUNT_BUCKETS)
+metrics.describe('db_queries_total', 'counter', 'Consultas SQL ejecutadas por ruta.')
+metrics.describe('db_query_seconds_total', 'counter', 'Tiempo acumulado en consultas SQL por ruta.')
+metrics.describe('db_slow_queries_total', 'counter', f'Consultas SQL de más de {SLOW_QUERY_MS:.0f}ms por ruta.')
+metrics.describe('outbound_call_duration_seconds', 'histogram', 'Duración de llamadas salientes (LLM, búsqueda, PDF).', LATENCY_BUCKETS)
+metrics.describe('cache_hits_total', 'counter', 'Aciertos por caché (en user_identity, consultas ahorradas).')
+metrics.describe('cache_misses_total', 'counter', 'Fallos por caché.')
+
+def request_route():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+def observe_outbound(service, seconds):
+    metrics.observe('outbound_call_duration_seconds', seconds, {'service': service})
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def record_query_start(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query_end(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+    route = request_route() if has_request_context() else 'cli'
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+        g.db_seconds = g.get('db_seconds', 0.0) + elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        metrics.inc('db_slow_queries_total', {'route': route})
+        print(f" * Slow query ({elapsed * 1000:.0f}ms, {route}): {' '.join(statement.split())[:500]}")
+
+@event.listens_for(Engine, 'handle_error')
+def discard_query_start(exception_context):
+    starts = exception_context.connection.info.get('query_start_time') if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.db_queries = 0
+    g.db_seconds = 0.0
+
+@app.after_request
+def record_request_metrics(response):
+    # En respuestas en streaming (SSE, exportaciones) solo se mide hasta que el handler devuelve
+    if 'request_start' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    route = request_route()
+    metrics.inc('http_requests_total', {'route': route, 'method': request.method, 'status': response.status_code})
+    metrics.observe('http_request_duration_seconds', elapsed, {'route': route})
+    metrics.observe('http_request_db_queries', g.db_queries, {'route': route})
+    metrics.inc('db_queries_total', {'route': route}, g.db_queries)
+    metrics.inc('db_query_seconds_total', {'route': route}, g.db_seconds)
+
+    response.headers['Server-Timing'] = (
+        f'app;dur={elapsed * 1000:.1f}, db;dur={g.db_seconds * 1000:.1f};desc="{g.db_queries} queries"'
+    )
+    if elapsed * 1000 >= SLOW_REQUEST_MS:
+        print(f" * Slow request ({elapsed * 1000:.0f}ms, {request.method} {route}): "
+              f"{g.db_queries} queries en {g.db_seconds * 1000:.0f}ms")
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not METRICS_TOKEN:
+        # Sin token configurado solo se expone en modo debug (desarrollo local)
+        if not app.debug:
+            return Response('Not Found\n', status=404, mimetype='text/plain')
+    elif request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    # Los contadores de cada caché se leen en el momento del scrape
+    caches = {
+        'user_identity': user_identity_cache,
+        'dashboard': dashboard_cache,
+        'support_answers': support_answer_cache,
+        'search_query': search_query_cache,
+        'search_results': search_results_cache
+    }
+    for name, cache in caches.items():
+        stats = cache.stats()
+        metrics.set('cache_hits_total', stats['hits'], {'cache': name})
+        metrics.set('cache_misses_total', stats['misses'], {'cache': name})
+
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# --- MOTOR DE FACTURACIÓN DE SUSCRIPCIONES ---
+# Corre fuera del request (CLI / worker). Cobra por lotes todas las suscripciones vencidas
+# de todos los usuarios, poniéndose al día con todos los periodos atrasados.
+
+BILLING_PERIOD_MONTHS = {'mensual': 1, 'anual': 12}
+
+def bill_due_subscriptions(now=None, batch_size=500):
+    """Cobra todos los periodos vencidos hasta `now`. Devuelve el número de cargos posteados.
+
+    Es idempotente: cada periodo queda registrado en SubscriptionCharge (único por suscripción
+    y fecha de cobro) en la misma transacción que el cargo y el avance de next_due_date. En
+    PostgreSQL los lotes se reclaman con FOR UPDATE SKIP LOCKED, así que varios workers de
+    gunicorn pueden ejecutarlo a la vez sin pisarse.
+    """
+    from sqlalchemy.exc import IntegrityError, OperationalError
+
+    now = now or datetime.now()
+    total_charges = 0
+    failed_batches = 0
+
+    while True:
+        subs = Subscription.query.filter(
+            Subscription.active == True,
+            Subscription.next_due_date <= now,
+            Subscription.billing_period.in_(BILLING_PERIOD_MONTHS.keys())
+        ).order_by(Subscription.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+        if not subs:
+            break
+
+        # Periodos ya posteados (p. ej. por otro worker) para no duplicarlos
+        already_charged = set(db.session.query(
+            SubscriptionCharge.subscription_id, SubscriptionCharge.due_date
+        ).filter(
+            SubscriptionCharge.subscription_id.in_([sub.id for sub in subs]),
+            SubscriptionCharge.due_date <= now
+        ).all())
+
+        tx_rows = []
+        charge_rows = []
+        summary_deltas = {}
+
+        for sub in subs:
+            months = BILLING_PERIOD_MONTHS[sub.billing_period]
+            due_date = sub.next_due_date
+            while due_date <= now:
+                if (sub.id, due_date) not in already_charged:
+                    tx_rows.append({
+                        'title': f"{RECURRING_TITLE_PREFIX}{sub.name}",
+                        'amount': sub.amount,
+                        'type': 'expense',
+                        'category': sub.category,
+                        'date': due_date,
+                        'user_id': sub.user_id
+                    })
+                    charge_rows.append({'subscription_id': sub.id, 'due_date': due_date, 'created_at': datetime.utcnow()})
+
+                    key = (sub.user_id, due_date.year, due_date.month, sub.category)
+                    amount, count = summary_deltas.get(key, (0, 0))
+                    summary_deltas[key] = (amount + sub.amount, count + 1)
+
+                due_date = add_months(due_date, months)
+            sub.next_due_date = due_date
+
+        try:
+            if charge_rows:
+                # Los ids se devuelven en el orden de tx_rows para enlazar cada cargo con su movimiento
+                tx_ids = db.session.execute(
+                    db.insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True), tx_rows
+                ).scalars().all()
+                for charge, tx_id in zip(charge_rows, tx_ids):
+                    charge['transaction_id'] = tx_id
+                db.session.execute(db.insert(SubscriptionCharge), charge_rows)
+                for (user_id, year, month, category), (amount, count) in summary_deltas.items():
+                    update_monthly_summary(user_id, datetime(year, month, 1), 'expense', category, amount, count=count)
+            db.session.commit()
+            total_charges += len(charge_rows)
+            failed_batches = 0
+        except (IntegrityError, OperationalError) as e:
+            # Otro worker cobró este lote primero: se descarta y se vuelve a consultar
+            db.session.rollback()
+            failed_batches += 1
+            print(f" * Facturación: lote descartado por concurrencia ({e.__class__.__name__}).")
+            if failed_batches >= 3:
+                raise
+
+    return total_charges
+
+@app.cli.command('bill-subscriptions')
+@click.option('--batch-size', type=int, default=500, help='Suscripciones por lote.')
+@click.option('--interval', type=int, default=0, help='Si es > 0, repetir cada N segundos (modo worker).')
+def bill_subscriptions_command(batch_size, interval):
+    """Cobra las suscripciones vencidas de todos los usuarios."""
+    while True:
+        try:
+            charges = bill_due_subscriptions(batch_size=batch_size)
+            print(f" * Facturación: {charges} cargos posteados.")
+        except Exception as e:
+            # En modo worker un fallo puntual (p. ej. la BD reiniciándose) no debe tumbar el proceso
+            db.session.rollback()
+            if interval <= 0:
+                raise
+            print(f"Error en facturación de suscripciones: {e}")
+        if interval <= 0:
+            break
+        time.sleep(interval)
 
 @app.route('/')
 def index():
@@ -242,469 +1044,898 @@ def google_callback():
         flash(f"Error al iniciar sesión con Google: {str(e)}", "error")
         return redirect(url_for('login'))
 
+HISTORY_PAGE_SIZE = 20
+
+# --- CACHÉ DEL DASHBOARD ---
+# Se guarda cada sección JSON ya renderizada bajo (usuario, versión de datos, fecha, plantilla):
+# una escritura sube la versión y la entrada anterior simplemente deja de consultarse. Con
+# CACHE_REDIS_URL la caché es compartida entre workers. El mismo valor de la clave sirve de ETag,
+# así que un navegador al día recibe un 304 tras una sola consulta. La página (~180 KB, sin
+# consultas) solo usa el ETag: guardarla por usuario ocuparía memoria sin ahorrar trabajo.
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 600))
+DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', 128))  # ~6 entradas (secciones) por usuario
+dashboard_cache = make_cache('dashboard', maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL)
+
+def template_hash(template_name):
+    """Huella de la plantilla: un despliegue con otra plantilla no reutiliza páginas ni ETags viejos."""
+    import hashlib
+    if template_name not in _template_hashes:
+        source = app.jinja_env.loader.get_source(app.jinja_env, template_name)[0]
+        _template_hashes[template_name] = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+    return _template_hashes[template_name]
+
+_template_hashes = {}
+
+def dashboard_etag(user_id, version, template_name='dashboard.html'):
+    # El dashboard depende de la fecha (mes en curso en UTC, días restantes de las metas en hora local)
+    return f"{user_id}-v{version}-{datetime.utcnow():%Y%m%d}-{datetime.now():%Y%m%d}-{template_hash(template_name)}"
+
+def cached_dashboard_response(etag, render, mimetype, cache=True):
+    """304 si el navegador ya tiene `etag`; si no, el cuerpo cacheado bajo `etag` o `render()`.
+
+    Con cache=False el cuerpo se renderiza siempre y solo se aprovecha el ETag.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        body = dashboard_cache.get(etag) if cache else None
+        if body is None:
+            body = render()
+            if cache:
+                dashboard_cache.set(etag, body)
+        response = Response(body, mimetype=mimetype)
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    # --- PROCESAMIENTO DE SUSCRIPCIONES ---
-    today = datetime.now()
-    active_subscriptions = Subscription.query.filter_by(user_id=current_user.id, active=True).all()
-    
-    payments_processed = False
-    
-    for sub in active_subscriptions:
-        if sub.next_due_date <= today:
-            new_tx = Transaction(
-                title=f"Pago recurrente: {sub.name}",
-                amount=sub.amount,
-                type='expense',
-                category=sub.category,
-                date=today,
-                user_id=current_user.id
-            )
-            db.session.add(new_tx)
-            
-            if sub.billing_period == 'mensual':
-                sub.next_due_date = add_months(sub.next_due_date, 1)
-            elif sub.billing_period == 'anual':
-                sub.next_due_date = add_months(sub.next_due_date, 12)
-            
-            payments_processed = True
-    
-    if payments_processed:
-        db.session.commit()
-    
-    # 1. Obtener transacciones del mes actual
-    now = datetime.utcnow()
-    start_date = datetime(now.year, now.month, 1)
-    if now.month == 12:
-        end_date = datetime(now.year + 1, 1, 1)
-    else:
-        end_date = datetime(now.year, now.month + 1, 1)
+    # Con mensajes flash pendientes la página lleva contenido de un solo uso: ni caché ni 304
+    if session.get('_flashes'):
+        return render_dashboard()
 
-    transactions = Transaction.query.filter_by(user_id=current_user.id).filter(
-        Transaction.date >= start_date,
-        Transaction.date < end_date
-    ).order_by(Transaction.date.desc()).all()
+    etag = dashboard_etag(current_user.id, get_data_version(current_user.id))
+    return cached_dashboard_response(etag, render_dashboard, 'text/html', cache=False)
 
-    # 2. Calcular KPIs básicos
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expense = sum(t.amount for t in transactions if t.type == 'expense')
-    balance = total_income - total_expense
+def render_dashboard():
+    # Solo el armazón de la página: los datos de cada sección llegan de /api/dashboard/<sección>
+    return render_template('dashboard.html', name=current_user.name)
+
+# --- SECCIONES DEL DASHBOARD (una respuesta JSON por sección) ---
+# Cada sección calcula solo sus datos y se renderiza con su plantilla dashboard_<sección>.html.
+# La respuesta trae `data` (para el JS y otros clientes) y `html`: un <template data-slot> por
+# cada hueco de la página que la sección rellena. Así el tiempo hasta el primer byte no depende
+# de la sección más lenta y el navegador hidrata todas en paralelo.
+
+def dashboard_history_since(now):
+    """Inicio de la ventana de historial del dashboard: ~6 meses antes del mes en curso."""
+    from datetime import timedelta
+    return month_range(now.year, now.month)[0] - timedelta(days=180)
+
+def dashboard_kpis(user_id):
+    month_names = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+    now = datetime.utcnow()
+    start_date, end_date = month_range(now.year, now.month)
+
+    # Agregados en SQL del mes en curso
+    kpis = get_period_kpis(user_id, start_date, end_date)
+    total_income = kpis['total_income']
+    total_expense = kpis['total_expense']
 
-    # 3. Datos para el reporte
     savings_rate = 0
     if total_income > 0:
         savings_rate = ((total_income - total_expense) / total_income) * 100
     savings_rate = round(max(savings_rate, 0), 1)
 
-    expenses = [t for t in transactions if t.type == 'expense']
-    cat_totals = {}
-    for e in expenses:
-        cat_totals[e.category] = cat_totals.get(e.category, 0) + e.amount
-    
+    cat_totals = kpis['cat_totals']
     top_category = "N/A"
     top_cat_percentage = 0
     if cat_totals:
         top_category = max(cat_totals, key=cat_totals.get)
         if total_expense > 0:
             top_cat_percentage = round((cat_totals[top_category] / total_expense) * 100, 1)
-    
-    days_in_month = (end_date - start_date).days
-    daily_balances = {}
-    for t in transactions:
-        d = t.date.day
-        if d not in daily_balances: daily_balances[d] = 0
-        if t.type == 'income': daily_balances[d] += t.amount
-        else: daily_balances[d] -= t.amount
-    
-    surplus_days = sum(1 for bal in daily_balances.values() if bal >= 0)
 
-    # 5. Historial Mensual
-    from datetime import timedelta
-    six_months_ago = start_date - timedelta(days=180) 
-    all_transactions = Transaction.query.filter_by(user_id=current_user.id).filter(
-        Transaction.date >= six_months_ago
-    ).order_by(Transaction.date.desc()).all()
+    return {
+        'balance': total_income - total_expense,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'savings_rate': savings_rate,
+        'top_category': top_category,
+        'top_cat_percentage': top_cat_percentage,
+        'cat_totals': cat_totals,
+        'surplus_days': sum(1 for bal in kpis['daily_balances'].values() if bal >= 0),
+        'days_in_month': (end_date - start_date).days,
+        'current_day': now.day,
+        'report_month': f"{month_names[now.month - 1]} {now.year}",
+        'tx_count': kpis['tx_count']
+    }
 
-    history_map = {}
-    month_names = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+def dashboard_history(user_id):
+    since = dashboard_history_since(datetime.utcnow())
+    return {
+        'monthly_history': get_monthly_history(user_id, since),
+        'chart_data': get_chart_data(user_id, since)
+    }
 
-    for t in all_transactions:
-        key = f"{t.date.year}-{t.date.month}"
-        if key not in history_map:
-            history_map[key] = {
-                'year': t.date.year,
-                'month': t.date.month,
-                'name': f"{month_names[t.date.month - 1]} {t.date.year}",
-                'total_income': 0,
-                'total_expense': 0,
-                'balance': 0
-            }
-        if t.type == 'income':
-            history_map[key]['total_income'] += t.amount
-        else:
-            history_map[key]['total_expense'] += t.amount
-        
-        history_map[key]['balance'] = history_map[key]['total_income'] - history_map[key]['total_expense']
-    
-    monthly_history = list(history_map.values())
+def dashboard_budgets(user_id):
+    now = datetime.utcnow()
+    return {'budgets': get_budget_status(user_id, now.year, now.month)}
 
+def dashboard_goals(user_id):
+    now = datetime.utcnow()
+    # El superávit para la viabilidad sale del resumen mensual (incluye el balance del mes en curso)
+    monthly_history = get_monthly_history(user_id, dashboard_history_since(now))
+    balance = next((m['balance'] for m in monthly_history if (m['year'], m['month']) == (now.year, now.month)), 0)
+    avg_monthly_surplus = planning_surplus([m['balance'] for m in monthly_history], balance)
 
-    transactions_data = [{
-        'date': t.date.strftime('%Y-%m-%d'),
-        'title': t.title,
-        'amount': t.amount,
-        'type': t.type,
-        'category': t.category
-    } for t in all_transactions]
+    savings_goals = SavingsGoal.query.filter_by(user_id=user_id).all()
+    goals_data = build_goal_plans(savings_goals, datetime.now(), avg_monthly_surplus)
 
-    month_name = month_names[now.month - 1]
-    
-    # --- PRESUPUESTOS (SMART BUDGETS) ---
-    budgets = Budget.query.filter_by(user_id=current_user.id).all()
-    budgets_data = []
-    
-    # Calcular gasto actual vs presupuesto
-    # Usamos expenses (transacciones del mes actual de tipo gasto) ya calculados arriba y cat_totals
-    for budget in budgets:
-        spent = cat_totals.get(budget.category, 0)
-        percentage = 0
-        if budget.amount > 0:
-            percentage = min((spent / budget.amount) * 100, 100)
-            
-        status_color = "success"
-        if percentage >= 100:
-            status_color = "danger"
-        elif percentage >= 80:
-            status_color = "warning"
-            
-        budgets_data.append({
-            'id': budget.id,
-            'category': budget.category,
-            'amount': budget.amount,
-            'spent': spent,
-            'remaining': max(budget.amount - spent, 0),
-            'percentage': round(percentage, 1),
-            'status_color': status_color
-        })
-
-    # --- METAS DE AHORRO ---
-    savings_goals = SavingsGoal.query.filter_by(user_id=current_user.id).all()
-    goals_data = []
+    goals_global_progress = 0
+    if goals_data:
+        goals_global_progress = sum(g['progress'] for g in goals_data) / len(goals_data)
+
+    return {'savings_goals': goals_data, 'goals_global_progress': goals_global_progress}
+
+def dashboard_subscriptions(user_id):
+    # Las suscripciones se cobran en el motor de facturación (flask bill-subscriptions); aquí solo se leen
+    subscriptions = Subscription.query.filter_by(user_id=user_id, active=True).all()
+    return {
+        'subscriptions': [{
+            'id': sub.id,
+            'name': sub.name,
+            'amount': sub.amount,
+            'category': sub.category,
+            'billing_period': sub.billing_period,
+            'next_due_date': sub.next_due_date.strftime('%Y-%m-%d')
+        } for sub in subscriptions],
+        'subscriptions_total': sum(sub.amount for sub in subscriptions)
+    }
 
-    # --- CÁLCULO DE VIABILIDAD (PROMEDIO DE SUPERÁVIT) ---
-    avg_monthly_surplus = 0
-    if monthly_history:
-        total_historic_surplus = sum(m['balance'] for m in monthly_history)
-        avg_monthly_surplus = total_historic_surplus / len(monthly_history)
-    
-    # Fallback si el historial no es suficiente o es negativo, usar el balance actual conservadoramente
-    if avg_monthly_surplus <= 100: 
-         avg_monthly_surplus = max(balance, 100) # Asumimos al menos 100 de capacidad si el balance actual lo permite
-
-    for goal in savings_goals:
-        # Calcular progreso
-        progress_percentage = 0
-        if goal.target_amount > 0:
-            progress_percentage = min((goal.current_amount / goal.target_amount) * 100, 100)
-        
-        # Estado de fechas
-        is_due_today = goal.target_date.date() == today.date()
-        is_past_due = goal.target_date.date() < today.date()
-        days_remaining = (goal.target_date.date() - today.date()).days
-        
-        # Calcular ahorro mensual sugerido (Smart Pacing)
-        monthly_saving_suggested = 0
-        weekly_saving_suggested = 0
-        daily_saving_suggested = 0
-        amount_remaining = max(goal.target_amount - goal.current_amount, 0)
-
-        # 1. Feature Smart Pacing
-        if not is_past_due and not is_due_today and amount_remaining > 0:
-             # Diferencia en meses aprox
-             diff_months = (goal.target_date.year - today.year) * 12 + (goal.target_date.month - today.month)
-             if diff_months < 1: diff_months = 1
-             
-             monthly_saving_suggested = amount_remaining / diff_months
-             
-             if days_remaining > 0:
-                daily_saving_suggested = amount_remaining / days_remaining
-                weekly_saving_suggested = daily_saving_suggested * 7
-        
-        # 2. Feature Viabilidad (Reality Check)
-        feasibility = "viable" # viable, hard, imposible
-        feasibility_color = "success"
-        feasibility_msg = "Meta saludable"
+def dashboard_transactions(user_id):
+    from datetime import timedelta
 
-        if amount_remaining > 0 and monthly_saving_suggested > 0:
-            ratio = monthly_saving_suggested / avg_monthly_surplus if avg_monthly_surplus > 0 else 999
-            
-            if ratio > 1.2:
-                feasibility = "retadora"
-                feasibility_color = "danger"
-                feasibility_msg = f"Requiere un esfuerzo extra de ${monthly_saving_suggested:,.0f}/mes. Considera extender el plazo."
-            elif ratio > 0.8:
-                feasibility = "ajustada"
-                feasibility_color = "warning"
-                feasibility_msg = f"Requiere disciplina. Usarás el {ratio*100:.0f}% de tu flujo libre."
-            else:
-                feasibility = "viable"
-                feasibility_color = "success"
-                feasibility_msg = "Tu flujo de caja actual soporta esta meta cómodamente."
+    # Solo la primera página del mes en curso; el resto se pide a /api/transactions bajo demanda
+    now = datetime.utcnow()
+    start_date, end_date = month_range(now.year, now.month)
+    history_filters = {'start': start_date.strftime('%Y-%m-%d'), 'end': (end_date - timedelta(days=1)).strftime('%Y-%m-%d')}
+    rows, next_cursor = transactions_page(user_id, history_filters, limit=HISTORY_PAGE_SIZE)
+    return {
+        'transactions': [{
+            'id': r.id,
+            'date': r.date.strftime('%Y-%m-%d'),
+            'title': r.title,
+            'amount': r.amount,
+            'type': r.type,
+            'category': r.category
+        } for r in rows],
+        'transactions_next_cursor': next_cursor,
+        'history_filters': history_filters
+    }
 
-        goals_data.append({
-            'id': goal.id,
-            'name': goal.name,
-            'target_amount': goal.target_amount,
-            'current_amount': goal.current_amount,
-            'target_date': goal.target_date.strftime('%d/%m/%Y'),
-            'progress': round(progress_percentage, 1),
-            'monthly_contribution': round(monthly_saving_suggested, 2),
-            'weekly_contribution': round(weekly_saving_suggested, 2),
-            'daily_contribution': round(daily_saving_suggested, 2),
-            'remaining_amount': amount_remaining,
-            'is_due_today': is_due_today,
-            'is_past_due': is_past_due,
-            'days_remaining': days_remaining,
-            'feasibility': feasibility,
-            'feasibility_color': feasibility_color,
-            'feasibility_msg': feasibility_msg
+DASHBOARD_SECTIONS = {
+    'kpis': dashboard_kpis,
+    'history': dashboard_history,
+    'budgets': dashboard_budgets,
+    'goals': dashboard_goals,
+    'subscriptions': dashboard_subscriptions,
+    'transactions': dashboard_transactions
+}
+
+@app.template_filter('date_format')
+def date_format(value, fmt):
+    """Formatea una fecha ISO ('YYYY-MM-DD') de los datos JSON de una sección."""
+    return datetime.strptime(value[:10], '%Y-%m-%d').strftime(fmt)
+
+@app.route('/api/dashboard/<section>')
+@login_required
+def dashboard_section(section):
+    build = DASHBOARD_SECTIONS.get(section)
+    if build is None:
+        return jsonify({'success': False, 'message': 'Sección no encontrada.'}), 404
+
+    template_name = f'dashboard_{section}.html'
+
+    def render():
+        data = build(current_user.id)
+        return app.json.dumps({
+            'success': True,
+            'section': section,
+            'data': data,
+            'html': render_template(template_name, **data)
         })
 
-    # --- DATOS PARA INSIGHTS (Asistente IA) ---
-    subscriptions_total = sum(sub.amount for sub in active_subscriptions)
-
-    goals_global_progress = 0
-    if goals_data:
-        total_p = sum(g['progress'] for g in goals_data)
-        goals_global_progress = total_p / len(goals_data)
-
-    return render_template('dashboard.html', 
-                           name=current_user.name,
-                           balance="{:,.2f}".format(balance),
-                           total_income="{:,.2f}".format(total_income),
-                           total_expense="{:,.2f}".format(total_expense),
-                           current_month_income=total_income,
-                           current_month_expenses=total_expense,
-                           current_day=now.day,
-                           days_in_month=days_in_month,
-                           transactions=transactions, 
-                           transactions_data=transactions_data,
-                           report_month=f"{month_name} {now.year}",
-                           savings_rate=savings_rate,
-                           top_category=top_category,
-                           top_cat_percentage=top_cat_percentage,
-                           surplus_days=surplus_days,
-                           total_days_month=days_in_month if days_in_month else 30,
-                           monthly_history=monthly_history,
-                           subscriptions=active_subscriptions,
-                           subscriptions_total=subscriptions_total,
-                           savings_goals=goals_data,
-                           goals_global_progress=goals_global_progress,
-                           budgets=budgets_data
-                           )
+    etag = f"{section}-{dashboard_etag(current_user.id, get_data_version(current_user.id), template_name)}"
+    return cached_dashboard_response(etag, render, 'application/json')
+
+# --- REPORTES PDF (render en pool de procesos + caché en disco) ---
+# Cada reporte se identifica por (usuario, año, mes, versión de datos del mes). La versión
+# sale de MonthlySummary y sube con cada escritura del mes, así que un reporte sin cambios
+# se sirve desde disco y uno modificado se vuelve a generar.
+REPORT_CACHE_DIR = os.environ.get('REPORT_CACHE_DIR', os.path.join(app.instance_path, 'report_cache'))
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+REPORT_TIMEOUT = float(os.environ.get('REPORT_TIMEOUT', 60))
+REPORT_FAILED_JOBS_MAX = int(os.environ.get('REPORT_FAILED_JOBS_MAX', 100))
+REPORT_LOGO_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'static', 'multimedia', 'logo.png')
+
+_report_pool = None
+_report_pool_pid = None
+_report_jobs = {}
+_report_jobs_lock = threading.Lock()
+
+def get_report_pool():
+    """Pool de procesos del worker actual (se crea de forma perezosa y se recrea tras un fork)."""
+    global _report_pool, _report_pool_pid
+    if _report_pool is None or _report_pool_pid != os.getpid():
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # 'spawn': el hijo solo importa reports.py, no hereda sockets ni hilos del worker web
+        _report_pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        _report_pool_pid = os.getpid()
+        _report_jobs.clear()
+    return _report_pool
+
+def prune_report_jobs():
+    """Quita de _report_jobs los jobs que ya no sirven. Se llama con _report_jobs_lock tomado.
+
+    Un job terminado con éxito sobra: su PDF se sirve desde disco, y si el directorio de caché se
+    limpió hay que generarlo de nuevo (reutilizar su future devolvería una ruta inexistente). Los
+    fallidos se conservan para que /reports/<job_id> informe el error, hasta REPORT_FAILED_JOBS_MAX.
+    """
+    for job_id, future in list(_report_jobs.items()):
+        if future.done() and future.exception() is None:
+            del _report_jobs[job_id]
+    failed = [job_id for job_id, future in _report_jobs.items() if future.done()]
+    # El dict conserva el orden de inserción: se descartan primero los fallos más antiguos
+    for job_id in failed[:max(len(failed) - REPORT_FAILED_JOBS_MAX, 0)]:
+        del _report_jobs[job_id]
+
+def parse_report_job_id(job_id):
+    """'<user_id>-<year>-<month>-v<version>' -> (user_id, year, month) o None si no es válido."""
+    try:
+        user_id, year, month, version = job_id.split('-')
+        if not version.startswith('v'):
+            return None
+        int(version[1:])
+        return int(user_id), int(year), int(month)
+    except ValueError:
+        return None
+
+def report_job(user, year, month):
+    """Devuelve (job_id, ruta del PDF, future). future es None si el PDF ya está en caché."""
+    summary = MonthlySummary.query.filter_by(user_id=user.id, year=year, month=month).first()
+    version = summary.version if summary else 0
+    job_id = f"{user.id}-{year}-{month}-v{version}"
+    pdf_path = os.path.join(REPORT_CACHE_DIR, f"{job_id}.pdf")
+
+    if os.path.exists(pdf_path):
+        return job_id, pdf_path, None
+
+    with _report_jobs_lock:
+        prune_report_jobs()
+        # Tras la poda solo quedan jobs en curso (se reutilizan) o fallidos (se reintentan)
+        future = _report_jobs.get(job_id)
+        if future is not None and not future.done():
+            return job_id, pdf_path, future
+        if os.path.exists(pdf_path):
+            # El render terminó entre la comprobación de arriba y la poda
+            return job_id, pdf_path, None
+
+        os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+        # Eliminar versiones anteriores del mismo mes
+        stale_prefix = f"{user.id}-{year}-{month}-v"
+        for filename in os.listdir(REPORT_CACHE_DIR):
+            if filename.startswith(stale_prefix) and filename != f"{job_id}.pdf" and filename.endswith('.pdf'):
+                try:
+                    os.remove(os.path.join(REPORT_CACHE_DIR, filename))
+                except OSError:
+                    pass
+
+        # Filtrar transacciones del periodo solicitado (rango [inicio, fin) para usar el índice)
+        start_date, end_date = month_range(year, month)
+        rows = db.session.query(
+            Transaction.date, Transaction.title, Transaction.category, Transaction.type, Transaction.amount
+        ).filter(
+            Transaction.user_id == user.id,
+            Transaction.date >= start_date,
+            Transaction.date < end_date
+        ).order_by(Transaction.date.desc()).all()
+        transactions = [{'date': r.date, 'title': r.title, 'category': r.category, 'type': r.type, 'amount': r.amount} for r in rows]
+
+        # La duración incluye la espera en la cola del pool, que es lo que percibe el usuario
+        submitted = time.perf_counter()
+        future = get_report_pool().submit(reports.render_report_pdf, user.name, year, month, transactions, REPORT_LOGO_PATH, pdf_path)
+        future.add_done_callback(lambda f: observe_outbound('pdf_render', time.perf_counter() - submitted))
+        _report_jobs[job_id] = future
+        return job_id, pdf_path, future
+
+def report_download_name(year, month):
+    return f'Reporte_FinanzApp_{reports.MONTH_NAMES[month - 1]}_{year}.pdf'
+
+def parse_report_period():
+    """(año, mes) pedido en query string o formulario; None si el mes o el año están fuera de rango."""
+    try:
+        req_month = int(request.args.get('month', request.form.get('month', datetime.now().month)))
+        req_year = int(request.args.get('year', request.form.get('year', datetime.now().year)))
+    except ValueError:
+        req_month = datetime.now().month
+        req_year = datetime.now().year
+    # datetime admite años 1..9999 y month_range necesita el mes siguiente
+    if not 1 <= req_month <= 12 or not 1 <= req_year <= 9998:
+        return None
+    return req_year, req_month
 
 @app.route('/download_report')
 @login_required
 def download_report():
-    from xhtml2pdf import pisa
-    from io import BytesIO
-    import os
+    period = parse_report_period()
+    if period is None:
+        return jsonify({'success': False, 'message': 'Parámetros inválidos.'}), 400
+    req_year, req_month = period
+    job_id, pdf_path, future = report_job(current_user, req_year, req_month)
+
+    if future is not None:
+        try:
+            future.result(timeout=REPORT_TIMEOUT)
+        except Exception as e:
+            print(f"Error al generar PDF: {e}")
+            return "Error al generar PDF"
+
+    return send_file(pdf_path, as_attachment=True, download_name=report_download_name(req_year, req_month), mimetype='application/pdf')
+
+@app.route('/reports', methods=['POST'])
+@login_required
+def enqueue_report():
+    """Encola la generación del reporte del mes y responde de inmediato."""
+    period = parse_report_period()
+    if period is None:
+        return jsonify({'success': False, 'message': 'Parámetros inválidos.'}), 400
+    req_year, req_month = period
+    job_id, pdf_path, future = report_job(current_user, req_year, req_month)
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'ready' if future is None else 'pending',
+        'status_url': url_for('report_status', job_id=job_id),
+        'download_url': url_for('download_report_job', job_id=job_id)
+    }), 202 if future is not None else 200
+
+@app.route('/reports/<job_id>')
+@login_required
+def report_status(job_id):
+    period = parse_report_job_id(job_id)
+    if not period or period[0] != current_user.id:
+        return jsonify({'success': False, 'message': 'No autorizado'}), 403
+
+    if os.path.exists(os.path.join(REPORT_CACHE_DIR, f"{job_id}.pdf")):
+        status = 'ready'
+    else:
+        future = _report_jobs.get(job_id)
+        # Sin future local el reporte puede estar generándose en otro worker
+        status = 'error' if future is not None and future.done() and future.exception() else 'pending'
+
+    return jsonify({'success': status != 'error', 'job_id': job_id, 'status': status})
+
+@app.route('/reports/<job_id>/download')
+@login_required
+def download_report_job(job_id):
+    period = parse_report_job_id(job_id)
+    if not period or period[0] != current_user.id:
+        return jsonify({'success': False, 'message': 'No autorizado'}), 403
+
+    pdf_path = os.path.join(REPORT_CACHE_DIR, f"{job_id}.pdf")
+    if not os.path.exists(pdf_path):
+        return jsonify({'success': False, 'status': 'pending'}), 404
 
+    _, year, month = period
+    return send_file(pdf_path, as_attachment=True, download_name=report_download_name(year, month), mimetype='application/pdf')
+
+# --- LISTADO PAGINADO DE MOVIMIENTOS (keyset sobre (date, id)) ---
+TRANSACTIONS_PAGE_SIZE = 50
+TRANSACTIONS_MAX_PAGE_SIZE = 200
+
+def encode_transactions_cursor(row):
+    return f"{row.date.strftime('%Y%m%d%H%M%S%f')}.{row.id}"
+
+TRANSACTIONS_CURSOR_RE = re.compile(r'([0-9]{20})\.([0-9]{1,18})')
+
+def decode_transactions_cursor(cursor):
+    """'<YYYYmmddHHMMSSffffff>.<id>' -> (fecha, id). ValueError si el cursor no tiene exactamente esa forma."""
+    match = TRANSACTIONS_CURSOR_RE.fullmatch(cursor)
+    if not match:
+        raise ValueError(f"Cursor inválido: {cursor!r}")
+    return datetime.strptime(match.group(1), '%Y%m%d%H%M%S%f'), int(match.group(2))
+
+def transactions_page(user_id, args, limit=TRANSACTIONS_PAGE_SIZE, cursor=None):
+    """Una página de movimientos (más recientes primero) y el cursor de la siguiente, o None si no hay más.
+
+    Keyset en lugar de OFFSET: cada página cuesta lo mismo sin importar qué tan atrás se esté.
+    """
+    query = db.select(
+        Transaction.id, Transaction.date, Transaction.title, Transaction.amount,
+        Transaction.type, Transaction.category
+    ).where(Transaction.user_id == user_id)
+    query = filter_transactions_query(query, args)
+
+    if cursor:
+        cursor_date, cursor_id = decode_transactions_cursor(cursor)
+        query = query.where(db.or_(
+            Transaction.date < cursor_date,
+            db.and_(Transaction.date == cursor_date, Transaction.id < cursor_id)
+        ))
+
+    rows = db.session.execute(
+        query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = encode_transactions_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+@app.route('/api/transactions')
+@login_required
+def api_transactions():
     try:
-        req_month = int(request.args.get('month', datetime.now().month))
-        req_year = int(request.args.get('year', datetime.now().year))
+        limit = int(request.args.get('limit', TRANSACTIONS_PAGE_SIZE))
+        if not 1 <= limit <= TRANSACTIONS_MAX_PAGE_SIZE:
+            raise ValueError(f"limit fuera de rango: {limit}")
+        rows, next_cursor = transactions_page(current_user.id, request.args, limit=limit, cursor=request.args.get('cursor'))
     except ValueError:
-        req_month = datetime.now().month
-        req_year = datetime.now().year
+        return jsonify({'success': False, 'message': 'Parámetros inválidos.'}), 400
 
-    # Filtrar transacciones del periodo solicitado
-    transactions = Transaction.query.filter_by(user_id=current_user.id).filter(
-        db.extract('month', Transaction.date) == req_month,
-        db.extract('year', Transaction.date) == req_year
-    ).order_by(Transaction.date.desc()).all()
+    return jsonify({
+        'success': True,
+        'items': [{
+            'id': r.id,
+            'date': r.date.strftime('%Y-%m-%d'),
+            'title': r.title,
+            'amount': r.amount,
+            'type': r.type,
+            'category': r.category
+        } for r in rows],
+        'next_cursor': next_cursor
+    })
 
-    incomes = [t for t in transactions if t.type == 'income']
-    expenses = [t for t in transactions if t.type == 'expense']
+# --- BÚSQUEDA DE TEXTO COMPLETO (FTS5 en SQLite, tsvector + GIN en PostgreSQL) ---
+# El índice lo mantienen triggers de la BD, así que inserts, ediciones, borrados e importaciones
+# masivas quedan sincronizados sin tocar cada ruta. Si no hay backend disponible se usa LIKE.
+SEARCH_MAX_TERMS = 8
+transaction_search_backend = None  # 'fts5', 'tsvector' o None (LIKE)
+
+SQLITE_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS transaction_fts USING fts5(
+        title, description, content='transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_fts_ai AFTER INSERT ON "transaction" BEGIN
+        INSERT INTO transaction_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_fts_ad AFTER DELETE ON "transaction" BEGIN
+        INSERT INTO transaction_fts(transaction_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS transaction_fts_au AFTER UPDATE OF title, description ON "transaction" BEGIN
+        INSERT INTO transaction_fts(transaction_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO transaction_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    'ALTER TABLE "transaction" ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    """CREATE OR REPLACE FUNCTION transaction_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('simple', unaccent(coalesce(NEW.title, '') || ' ' || coalesce(NEW.description, '')));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    # DO + IF NOT EXISTS en lugar de CREATE OR REPLACE TRIGGER, que requiere PostgreSQL 14
+    """DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'transaction_search_vector_trigger') THEN
+            CREATE TRIGGER transaction_search_vector_trigger BEFORE INSERT OR UPDATE OF title, description
+                ON "transaction" FOR EACH ROW EXECUTE FUNCTION transaction_search_vector_update();
+        END IF;
+    END
+    $$""",
+    'CREATE INDEX IF NOT EXISTS ix_transaction_search ON "transaction" USING GIN (search_vector)',
+]
+
+SEARCH_SETUP_LOCK_KEY = 7310421  # pg_advisory_xact_lock: un solo worker ejecuta el DDL a la vez
+SQLITE_SEARCH_TRIGGERS = {'transaction_fts_ai', 'transaction_fts_ad', 'transaction_fts_au'}
+
+def detect_transaction_search_backend(conn):
+    """Backend según lo que existe en la BD (tabla/columna y triggers), sin importar qué worker lo creó."""
+    from sqlalchemy import text, inspect
 
-    total_income = sum(t.amount for t in incomes)
-    total_expense = sum(t.amount for t in expenses)
-    balance = total_income - total_expense
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        triggers = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+        if inspect(conn).has_table('transaction_fts') and SQLITE_SEARCH_TRIGGERS <= triggers:
+            return 'fts5'
+    elif dialect == 'postgresql':
+        columns = [col['name'] for col in inspect(conn).get_columns('transaction')]
+        has_trigger = conn.execute(text(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'transaction_search_vector_trigger'"
+        )).first() is not None
+        if 'search_vector' in columns and has_trigger:
+            return 'tsvector'
+    return None
+
+def setup_transaction_search():
+    """Crea (si falta) el índice de búsqueda del dialecto actual y lo rellena con lo ya existente.
+
+    Todo el DDL es idempotente y, en PostgreSQL, se serializa con un advisory lock: los workers que
+    arrancan a la vez esperan al primero y luego encuentran el índice ya creado.
+    """
+    global transaction_search_backend
+    from sqlalchemy import text, inspect
 
-    month_names = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
-    month_name = month_names[req_month - 1]
-    
-    # Calcular último día del mes
-    if req_month == 2:
-        last_day = 29 if (req_year % 4 == 0 and req_year % 100 != 0) or (req_year % 400 == 0) else 28
-    elif req_month in [4, 6, 9, 11]:
-        last_day = 30
-    else:
-        last_day = 31
-        
-    period_name = f"Del 01 al {last_day} de {month_name.lower()} {req_year}"
+    dialect = db.engine.dialect.name
+    try:
+        with db.engine.begin() as conn:
+            if dialect == 'postgresql':
+                conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': SEARCH_SETUP_LOCK_KEY})
+            if detect_transaction_search_backend(conn) is not None:
+                return
+            if dialect == 'sqlite':
+                is_new = not inspect(conn).has_table('transaction_fts')
+                for statement in SQLITE_SEARCH_DDL:
+                    conn.execute(text(statement))
+                if is_new:
+                    conn.execute(text("INSERT INTO transaction_fts(transaction_fts) VALUES ('rebuild')"))
+            elif dialect == 'postgresql':
+                for statement in POSTGRES_SEARCH_DDL:
+                    conn.execute(text(statement))
+                conn.execute(text(
+                    """UPDATE "transaction" SET search_vector = to_tsvector('simple', unaccent(coalesce(title, '') || ' ' || coalesce(description, '')))
+                    WHERE search_vector IS NULL"""
+                ))
+    finally:
+        with db.engine.connect() as conn:
+            transaction_search_backend = detect_transaction_search_backend(conn)
+
+def search_terms(query_text):
+    """Términos de búsqueda normalizados: minúsculas, sin acentos y solo alfanuméricos ("Café!" -> ["cafe"])."""
+    return re.findall(r'[^\W_]+', normalize_question(query_text))[:SEARCH_MAX_TERMS]
+
+def transaction_search_clause(query_text):
+    """Condición WHERE para movimientos cuyo título o descripción contengan todos los términos como prefijo.
+
+    Devuelve None si el texto no tiene términos buscables.
+    """
+    terms = search_terms(query_text)
+    if not terms:
+        return None
+
+    if transaction_search_backend == 'fts5':
+        fts_query = ' '.join(f'"{term}"*' for term in terms)
+        return Transaction.id.in_(
+            db.text('SELECT rowid FROM transaction_fts WHERE transaction_fts MATCH :fts_query').bindparams(fts_query=fts_query)
+        )
+    if transaction_search_backend == 'tsvector':
+        ts_query = ' & '.join(f'{term}:*' for term in terms)
+        return db.text("\"transaction\".search_vector @@ to_tsquery('simple', :ts_query)").bindparams(ts_query=ts_query)
 
-    base_dir = os.path.abspath(os.path.dirname(__file__))
-    logo_path = os.path.join(base_dir, 'static', 'multimedia', 'logo.png')
-    
-    # Colores de marca
-    brand_color = "#1e3a8a" 
-    text_main = "#1e293b"
-    text_muted = "#64748b"
-
-    html = f"""
-    <html>
-    <head>
-        <style>
-            @page {{ size: letter; margin: 1.5cm; }}
-            body {{ font-family: 'Helvetica', sans-serif; color: {text_main}; line-height: 1.5; font-size: 12px; }}
-            
-            /* Header */
-            .header {{ margin-bottom: 40px; border-bottom: 2px solid #f1f5f9; padding-bottom: 20px; }}
-            .logo-img {{ width: 50px; height: auto; display: block; }}
-            .user-details {{ text-align: right; font-size: 10px; color: {text_muted}; vertical-align: middle; }}
-            .user-details strong {{ font-weight: bold; color: {text_main}; font-size: 11px; }}
-
-            /* Títulos */
-            .report-title {{ color: {brand_color}; font-size: 22px; font-weight: bold; margin-bottom: 5px; }}
-            .report-subtitle {{ color: {text_muted}; font-size: 14px; margin-bottom: 30px; }}
-            
-            .section-header {{ margin-bottom: 15px; margin-top: 30px; border-bottom: 1px solid #e2e8f0; padding-bottom: 5px; }}
-            .section-title {{ font-size: 14px; font-weight: bold; color: {brand_color}; text-transform: uppercase; letter-spacing: 0.5px; }}
-
-            /* Resumen Tabla */
-            .summary-table {{ width: 100%; border-collapse: collapse; margin-bottom: 20px; }}
-            .summary-row td {{ padding: 10px 0; border-bottom: 1px dashed #e2e8f0; }}
-            .summary-label {{ font-size: 12px; color: {text_main}; }}
-            .summary-value {{ font-size: 12px; font-weight: bold; text-align: right; }}
-            
-            /* Balance Row Fix: Completely Separate Style */
-            .balance-container {{
-                background-color: #f8fafc;
-                border-top: 2px solid {text_main};
-                border-bottom: 2px solid {text_main};
-                padding: 20px 10px;
-                margin-top: 20px;
-            }}
-            
-            .balance-table {{ width: 100%; }}
-            .balance-label {{ font-weight: bold; font-size: 14px; color: {brand_color}; }}
-            .balance-value {{ font-weight: bold; font-size: 14px; color: {brand_color}; text-align: right; }}
-
-            /* Detalle Movimientos */
-            .movements-table {{ width: 100%; border-collapse: collapse; margin-top: 10px; }}
-            .movements-header th {{ 
-                text-align: left; 
-                font-size: 9px; 
-                color: {text_muted}; 
-                padding: 8px 5px; 
-                border-bottom: 1px solid #cbd5e1; 
-                background-color: #f1f5f9;
-                text-transform: uppercase; 
-            }}
-            .movements-row td {{ padding: 10px 5px; border-bottom: 1px solid #f1f5f9; font-size: 11px; }}
-            .badge-cat {{ background-color: #f1f5f9; padding: 2px 6px; border-radius: 4px; font-size: 9px; color: {text_muted}; }}
-            .footer {{ position: fixed; bottom: 0; width: 100%; text-align: center; font-size: 8px; color: #cbd5e1; border-top: 1px solid #f1f5f9; padding-top: 10px; }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <table style="width: 100%;">
-                <tr>
-                    <td style="vertical-align: middle;"><img src="{logo_path}" class="logo-img" /></td>
-                    <td class="user-details">
-                        Reporte generado para:<br/>
-                        <strong>{current_user.name}</strong><br/>
-                        <span style="font-size: 9px;">{period_name}</span>
-                    </td>
-                </tr>
-            </table>
-        </div>
-
-        <div class="report-title">Estado financiero mensual</div>
-        <div class="report-subtitle">Resumen de tu actividad en {month_name.lower()}</div>
-
-        <div class="section-header">
-            <span class="section-title">Resumen general</span>
-        </div>
-
-        <table class="summary-table">
-            <tr class="summary-row">
-                <td class="summary-label">Ingresos totales</td>
-                <td class="summary-value" style="color: #10b981;">+${"{:,.2f}".format(total_income)}</td>
-            </tr>
-            <tr class="summary-row">
-                <td class="summary-label">Gastos totales</td>
-                <td class="summary-value" style="color: #ef4444;">-${"{:,.2f}".format(total_expense)}</td>
-            </tr>
-            <tr class="summary-row">
-                <td class="summary-label">Resultado neto</td>
-                <td class="summary-value" style="color: {text_muted};">${"{:,.2f}".format(max(total_income - total_expense, 0))}</td>
-            </tr>
-        </table>
-        
-        <!-- Bloque independiente para el balance para evitar overlap -->
-        <div class="balance-container">
-            <table class="balance-table">
-                <tr>
-                    <td class="balance-label">Balance global</td>
-                    <td class="balance-value">${"{:,.2f}".format(balance)}</td>
-                </tr>
-            </table>
-        </div>
-
-        <div class="section-header">
-            <span class="section-title">Detalle de operaciones</span>
-        </div>
-        
-        <table class="movements-table">
-            <tr class="movements-header">
-                <th style="width: 15%;">Fecha</th>
-                <th style="width: 45%;">Concepto</th>
-                <th style="width: 25%;">Categoría</th>
-                <th style="width: 15%; text-align: right;">Monto</th>
-            </tr>
+    # Sin índice: LIKE por término (sensible a acentos)
+    return db.and_(*[
+        db.or_(Transaction.title.ilike(f'%{term}%'), Transaction.description.ilike(f'%{term}%'))
+        for term in terms
+    ])
+
+@app.route('/api/transactions/search')
+@login_required
+def search_transactions():
+    if not search_terms(request.args.get('q')):
+        return jsonify({'success': False, 'message': 'Escribe algo para buscar.'}), 400
+    return api_transactions()
+
+# --- EXPORTACIÓN CSV / EXCEL (historial completo en streaming) ---
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+EXPORT_COLUMNS = ['Fecha', 'Concepto', 'Tipo', 'Categoría', 'Monto', 'Descripción']
+
+def filter_transactions_query(query, args):
+    """Aplica los filtros opcionales start/end (YYYY-MM-DD, fin inclusivo), type, category y q (texto).
+
+    Lanza ValueError si alguna fecha no es válida.
     """
-    
-    for t in transactions:
-        amount_style = ""
-        sign = "-"
-        if t.type == 'income':
-            sign = "+"
-            amount_style = "color: #10b981;"
-        else:
-            amount_style = "color: #ef4444;"
-        
-        html += f"""
-        <tr class="movements-row">
-            <td style="color: #64748b;">{t.date.strftime('%d/%m')}</td>
-            <td><strong>{t.title}</strong></td>
-            <td><span class="badge-cat">{t.category}</span></td>
-            <td style="text-align: right; {amount_style}">{sign}${"{:,.2f}".format(t.amount)}</td>
-        </tr>
-        """
-        
-    html += f"""
-        </table>
-        
-        <div class="footer">
-            FinanzApp &bull; Tu asistente financiero personal &bull; {datetime.now().year}
-        </div>
-    </body>
-    </html>
+    from datetime import timedelta
+
+    start_str = args.get('start')
+    end_str = args.get('end')
+    if start_str:
+        query = query.where(Transaction.date >= datetime.strptime(start_str, '%Y-%m-%d'))
+    if end_str:
+        query = query.where(Transaction.date < datetime.strptime(end_str, '%Y-%m-%d') + timedelta(days=1))
+    if args.get('type'):
+        query = query.where(Transaction.type == args.get('type'))
+    if args.get('category'):
+        query = query.where(Transaction.category == args.get('category'))
+    if args.get('q'):
+        search_clause = transaction_search_clause(args.get('q'))
+        if search_clause is not None:
+            query = query.where(search_clause)
+    return query
+
+def export_transactions_query(user_id, args):
+    """Consulta de exportación con los filtros de filter_transactions_query."""
+    query = db.select(
+        Transaction.date, Transaction.title, Transaction.type, Transaction.category,
+        Transaction.amount, Transaction.description
+    ).where(Transaction.user_id == user_id)
+    query = filter_transactions_query(query, args)
+
+    # yield_per: cursor del lado del servidor en PostgreSQL y lotes de tamaño fijo en memoria
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc()).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+def export_rows(query):
+    for row in db.session.execute(query):
+        yield [
+            row.date.strftime('%Y-%m-%d'),
+            row.title,
+            'Ingreso' if row.type == 'income' else 'Gasto',
+            row.category,
+            row.amount,
+            row.description or ''
+        ]
+
+@app.route('/export_transactions')
+@login_required
+def export_transactions():
+    import csv
+    from io import StringIO
+
+    export_format = request.args.get('format', 'csv').lower()
+    try:
+        query = export_transactions_query(current_user.id, request.args)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Fecha inválida (usa el formato YYYY-MM-DD).'}), 400
+
+    filename = f"Movimientos_FinanzApp_{datetime.now().strftime('%Y%m%d')}"
+
+    if export_format == 'xlsx':
+        try:
+            import xlsxwriter
+        except ImportError:
+            return jsonify({'success': False, 'message': 'Exportación a Excel no disponible en este servidor.'}), 501
+        import tempfile
+
+        # constant_memory: xlsxwriter escribe cada fila a disco en cuanto se completa
+        tmp = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+        tmp.close()
+        workbook = xlsxwriter.Workbook(tmp.name, {'constant_memory': True})
+        sheet = workbook.add_worksheet('Movimientos')
+        sheet.write_row(0, 0, EXPORT_COLUMNS)
+        for row_num, row in enumerate(export_rows(query), start=1):
+            sheet.write_row(row_num, 0, row)
+        workbook.close()
+
+        response = send_file(tmp.name, as_attachment=True, download_name=f"{filename}.xlsx",
+                             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        response.call_on_close(lambda: os.remove(tmp.name))
+        return response
+
+    if export_format != 'csv':
+        return jsonify({'success': False, 'message': 'Formato no soportado (usa csv o xlsx).'}), 400
+
+    def generate():
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff') # BOM para que Excel reconozca UTF-8 (acentos)
+        writer.writerow(EXPORT_COLUMNS)
+        for row_num, row in enumerate(export_rows(query), start=1):
+            writer.writerow(row)
+            if row_num % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}.csv'})
+
+# --- IMPORTACIÓN MASIVA (CSV / OFX) ---
+TRANSACTION_TYPES = ('income', 'expense')
+TRANSACTION_CATEGORIES = ('Comida', 'Transporte', 'Vivienda', 'Salud', 'Entretenimiento', 'Salario', 'Educación', 'Servicios', 'Otros')
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+IMPORT_MAX_REPORTED_ERRORS = 1000
+
+_IMPORT_TYPE_ALIASES = {'income': 'income', 'ingreso': 'income', 'credit': 'income', 'expense': 'expense', 'gasto': 'expense', 'debit': 'expense'}
+_IMPORT_CATEGORY_ALIASES = {normalize_question(c): c for c in TRANSACTION_CATEGORIES}
+_IMPORT_COLUMN_ALIASES = {
+    'date': 'date', 'fecha': 'date',
+    'title': 'title', 'concepto': 'title', 'name': 'title',
+    'amount': 'amount', 'monto': 'amount', 'importe': 'amount',
+    'type': 'type', 'tipo': 'type',
+    'category': 'category', 'categoria': 'category',
+    'description': 'description', 'descripcion': 'description', 'memo': 'description'
+}
+
+def parse_import_row(raw):
+    """Valida una fila cruda (dict de strings) y devuelve los valores del Transaction o lanza ValueError."""
+    title = (raw.get('title') or '').strip()
+    if not title:
+        raise ValueError('El concepto es obligatorio.')
+    if len(title) > 100:
+        raise ValueError('El concepto excede 100 caracteres.')
+
+    amount_str = (raw.get('amount') or '').strip().replace('$', '').replace(',', '')
+    try:
+        amount = parse_money(amount_str)
+    except ValueError:
+        raise ValueError(f"Monto inválido: '{raw.get('amount')}'.")
+
+    type_str = normalize_question(raw.get('type'))
+    if type_str:
+        if type_str not in _IMPORT_TYPE_ALIASES:
+            raise ValueError(f"Tipo inválido: '{raw.get('type')}' (usa income/expense).")
+        tx_type = _IMPORT_TYPE_ALIASES[type_str]
+    else:
+        # Estados de cuenta: el signo del monto indica cargo o abono
+        tx_type = 'expense' if amount < 0 else 'income'
+    amount = abs(amount)
+    if amount <= 0:
+        raise ValueError('El monto debe ser mayor a cero.')
+
+    category_str = normalize_question(raw.get('category'))
+    if category_str:
+        if category_str not in _IMPORT_CATEGORY_ALIASES:
+            raise ValueError(f"Categoría inválida: '{raw.get('category')}'.")
+        category = _IMPORT_CATEGORY_ALIASES[category_str]
+    else:
+        category = 'Otros'
+
+    date_str = (raw.get('date') or '').strip()
+    for date_format, length in (('%Y-%m-%d', 10), ('%d/%m/%Y', 10), ('%Y%m%d', 8)):
+        try:
+            date = datetime.strptime(date_str[:length], date_format)
+            break
+        except ValueError:
+            continue
+    else:
+        raise ValueError(f"Fecha inválida: '{date_str}' (usa YYYY-MM-DD).")
+
+    return {
+        'title': title,
+        'amount': amount,
+        'type': tx_type,
+        'category': category,
+        'date': date,
+        'description': (raw.get('description') or '').strip() or None
+    }
+
+def iter_csv_rows(text_stream):
+    """Filas del CSV como dicts con claves canónicas (acepta los encabezados de la exportación)."""
+    import csv
+    reader = csv.reader(text_stream)
+    header = next(reader, None) or []
+    columns = [_IMPORT_COLUMN_ALIASES.get(normalize_question(h)) for h in header]
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        yield {col: value for col, value in zip(columns, values) if col}
+
+def iter_ofx_rows(text_stream):
+    """Movimientos <STMTTRN> de un estado de cuenta OFX/QFX (SGML o XML), leído línea por línea."""
+    tag_re = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+    current = None
+    for line in text_stream:
+        for closing, tag, value in tag_re.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing:
+                    if current is not None:
+                        yield {
+                            'date': current.get('DTPOSTED', ''),
+                            'title': current.get('NAME') or current.get('MEMO', ''),
+                            'amount': current.get('TRNAMT', ''),
+                            'description': current.get('MEMO') if current.get('NAME') else None
+                        }
+                    current = None
+                else:
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+def import_transactions(user_id, text_stream, file_format='csv'):
+    """Importa movimientos en lotes dentro de una sola transacción de BD.
+
+    Omite filas que ya existían antes de la importación con el mismo (día, monto en centavos, concepto)
+    y devuelve un reporte por fila con los errores de validación.
     """
-    
-    buffer = BytesIO()
-    pisa_status = pisa.CreatePDF(html, dest=buffer)
-    
-    if pisa_status.err:
-        return "Error al generar PDF"
-        
-    buffer.seek(0)
-    
-    from flask import send_file
-    filename = f'Reporte_FinanzApp_{month_name}_{req_year}.pdf'
-    return send_file(buffer, as_attachment=True, download_name=filename, mimetype='application/pdf')
+    from datetime import timedelta
+
+    rows = iter_ofx_rows(text_stream) if file_format == 'ofx' else iter_csv_rows(text_stream)
+    # Solo se deduplica contra lo que ya existía: filas repetidas dentro del archivo se respetan
+    max_existing_id = db.session.query(db.func.max(Transaction.id)).filter(Transaction.user_id == user_id).scalar() or 0
+
+    report = {'imported': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+    summary_deltas = {}
+
+    def dedupe_key(date, amount, title):
+        # Las exportaciones (y los estados de cuenta) solo traen el día: la hora no cuenta
+        return date.date(), to_cents(amount), title
+
+    def flush(batch):
+        existing = {dedupe_key(*row) for row in db.session.query(Transaction.date, Transaction.amount, Transaction.title).filter(
+            Transaction.user_id == user_id,
+            Transaction.id <= max_existing_id,
+            Transaction.date >= min(r['date'] for r in batch),
+            Transaction.date < max(r['date'] for r in batch) + timedelta(days=1),
+            Transaction.title.in_(list({r['title'] for r in batch}))
+        ).all()}
+        new_rows = [r for r in batch if dedupe_key(r['date'], r['amount'], r['title']) not in existing]
+        report['duplicates'] += len(batch) - len(new_rows)
+        if new_rows:
+            # executemany (insertmanyvalues en PostgreSQL): una sentencia por lote
+            db.session.execute(db.insert(Transaction), new_rows)
+            report['imported'] += len(new_rows)
+            for r in new_rows:
+                key = (r['date'].year, r['date'].month, r['type'], r['category'])
+                amount, count = summary_deltas.get(key, (0, 0))
+                summary_deltas[key] = (amount + r['amount'], count + 1)
+
+    batch = []
+    for row_num, raw in enumerate(rows, start=1):
+        try:
+            values = parse_import_row(raw)
+        except ValueError as e:
+            report['error_count'] += 1
+            if len(report['errors']) < IMPORT_MAX_REPORTED_ERRORS:
+                report['errors'].append({'row': row_num, 'message': str(e)})
+            continue
+        values['user_id'] = user_id
+        batch.append(values)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    for (year, month, tx_type, category), (amount, count) in summary_deltas.items():
+        update_monthly_summary(user_id, datetime(year, month, 1), tx_type, category, amount, count=count)
+
+    db.session.commit()
+    return report
+
+def import_file_format(filename, requested=None):
+    if requested in ('csv', 'ofx'):
+        return requested
+    return 'ofx' if (filename or '').lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+@app.route('/import_transactions', methods=['POST'])
+@login_required
+def import_transactions_route():
+    import io
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'success': False, 'message': 'Selecciona un archivo CSV u OFX.'}), 400
+
+    file_format = import_file_format(upload.filename, request.form.get('format'))
+    text_stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        report = import_transactions(current_user.id, text_stream, file_format)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error en Importación: {e}")
+        return jsonify({'success': False, 'message': f"Error del servidor: {str(e)}"}), 500
+
+    return jsonify({'success': True, **report})
+
+@app.cli.command('import-transactions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--email', required=True, help='Correo del usuario destino.')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ofx']), default=None)
+def import_transactions_command(path, email, file_format):
+    """Importa un CSV/OFX de movimientos para un usuario."""
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise click.ClickException(f"No existe el usuario {email}.")
+    with open(path, encoding='utf-8-sig', errors='replace', newline='') as f:
+        report = import_transactions(user.id, f, import_file_format(path, file_format))
+    print(f" * Importación: {report['imported']} importados, {report['duplicates']} duplicados, {report['error_count']} errores.")
+    for error in report['errors']:
+        print(f"   Fila {error['row']}: {error['message']}")
 
 @app.route('/delete_transaction/<int:id>', methods=['POST'])
 @login_required
@@ -713,6 +1944,7 @@ def delete_transaction(id):
     if transaction.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
     
+    update_monthly_summary(transaction.user_id, transaction.date, transaction.type, transaction.category, transaction.amount, sign=-1)
     db.session.delete(transaction)
     db.session.commit()
     return jsonify({'success': True})
@@ -741,8 +1973,11 @@ def edit_transaction(id):
     if transaction.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
     
+    # Retirar el efecto anterior del resumen mensual antes de modificar
+    update_monthly_summary(transaction.user_id, transaction.date, transaction.type, transaction.category, transaction.amount, sign=-1)
+
     transaction.title = request.form.get('title')
-    transaction.amount = float(request.form.get('amount'))
+    transaction.amount = parse_money(request.form.get('amount'))
     transaction.type = request.form.get('type')
     transaction.category = request.form.get('category')
     
@@ -751,6 +1986,7 @@ def edit_transaction(id):
     if date_str:
         transaction.date = datetime.strptime(date_str, '%Y-%m-%d')
     
+    update_monthly_summary(transaction.user_id, transaction.date, transaction.type, transaction.category, transaction.amount)
     db.session.commit()
     return redirect(url_for('dashboard'))
 
@@ -759,7 +1995,7 @@ def edit_transaction(id):
 def movements():
     if request.method == 'POST':
         title = request.form.get('title')
-        amount = float(request.form.get('amount'))
+        amount = parse_money(request.form.get('amount'))
         type = request.form.get('type')
         category = request.form.get('category')
 
@@ -778,6 +2014,7 @@ def movements():
             date=date
         )
         db.session.add(new_transaction)
+        update_monthly_summary(current_user.id, date, type, category, amount)
         db.session.commit()
         return redirect(url_for('dashboard'))
 
@@ -800,7 +2037,9 @@ def update_password():
          flash('No puedes cambiar la contraseña de una cuenta de Google.', 'error')
          return redirect(url_for('dashboard', section='profile'))
 
-    if not check_password_hash(current_user.password, current_password):
+    # El hash se lee siempre de la BD: current_user es una identidad cacheada sin contraseña
+    user = db.session.get(User, current_user.id)
+    if not check_password_hash(user.password, current_password):
         flash('La contraseña actual es incorrecta.', 'error')
         return redirect(url_for('dashboard', section='profile'))
 
@@ -825,7 +2064,8 @@ def update_password():
         flash('La contraseña debe incluir al menos un carácter especial (@, #, $, etc).', 'error')
         return redirect(url_for('dashboard', section='profile'))
 
-    current_user.password = generate_password_hash(new_password, method='pbkdf2:sha256')
+    user.password = generate_password_hash(new_password, method='pbkdf2:sha256')
+    # El commit invalida la identidad cacheada (queue_session_user_invalidation)
     db.session.commit()
     
     flash('Contraseña actualizada correctamente.', 'success')
@@ -837,7 +2077,7 @@ def update_password():
 @login_required
 def add_subscription():
     name = request.form.get('name')
-    amount = float(request.form.get('amount'))
+    amount = parse_money(request.form.get('amount'))
     category = request.form.get('category')
     billing_period = request.form.get('billing_period')
     start_date_str = request.form.get('start_date')
@@ -849,8 +2089,8 @@ def add_subscription():
         return redirect(url_for('dashboard'))
         
     # La próxima fecha de cobro inicial es... ¿la fecha de inicio?
-    # Asumimos que si pone fecha futura, es esa. Si pone fecha pasada, el sistema
-    # cobrará lo pendiente al entrar al dashboard.
+    # Asumimos que si pone fecha futura, es esa. Si pone fecha pasada, el motor de
+    # facturación (flask bill-subscriptions) cobrará todos los periodos pendientes.
     
     new_sub = Subscription(
         name=name,
@@ -863,6 +2103,7 @@ def add_subscription():
     )
     
     db.session.add(new_sub)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash('Suscripción agregada correctamente.', 'success')
     return redirect(url_for('dashboard'))
@@ -874,16 +2115,298 @@ def delete_subscription(id):
     if sub.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
     
+    SubscriptionCharge.query.filter_by(subscription_id=sub.id).delete()
     db.session.delete(sub)
+    bump_data_version(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
+# --- METAS DE AHORRO: RITMO Y VIABILIDAD (motor vectorizado en pacing.py) ---
+
+def planning_surplus(month_balances, current_balance):
+    """Superávit mensual con el que se planean las metas: promedio de los meses con movimientos.
+
+    Si el historial es insuficiente o negativo se usa el balance actual, asumiendo al menos 100 de capacidad.
+    """
+    surplus = sum(month_balances) / len(month_balances) if month_balances else 0
+    if surplus <= 100:
+        surplus = max(current_balance, 100)
+    return surplus
+
+def monthly_surplus_by_user(user_ids, now):
+    """planning_surplus de varios usuarios con una sola consulta a MonthlySummary (mismos 6 meses que el dashboard)."""
+    from datetime import timedelta
+
+    since = month_range(now.year, now.month)[0] - timedelta(days=180)
+    rows = db.session.query(
+        MonthlySummary.user_id, MonthlySummary.year, MonthlySummary.month,
+        MonthlySummary.total_income, MonthlySummary.total_expense
+    ).filter(
+        MonthlySummary.user_id.in_(user_ids),
+        MonthlySummary.tx_count > 0,
+        MonthlySummary.year * 12 + MonthlySummary.month >= since.year * 12 + since.month
+    ).all()
+
+    balances = {user_id: [] for user_id in user_ids}
+    current_balances = {}
+    for user_id, year, month, income, expense in rows:
+        balances[user_id].append(income - expense)
+        if (year, month) == (now.year, now.month):
+            current_balances[user_id] = income - expense
+    return {user_id: planning_surplus(values, current_balances.get(user_id, 0)) for user_id, values in balances.items()}
+
+def goal_arrays(goals):
+    """Columnas de las metas (objetos o dicts con target_amount, current_amount y target_date) para pacing.plan_goals."""
+    def field(goal, name):
+        return goal[name] if isinstance(goal, dict) else getattr(goal, name)
+    return (
+        [to_cents(field(g, 'target_amount')) for g in goals],
+        [to_cents(field(g, 'current_amount') or 0) for g in goals],
+        [field(g, 'target_date').date() for g in goals],
+    )
+
+def build_goal_plans(goals, today, monthly_surplus):
+    """Datos de cada meta para el dashboard: progreso, ritmo sugerido y viabilidad frente a `monthly_surplus`."""
+    if not goals:
+        return []
+    plan = pacing.plan_goals(*goal_arrays(goals), today=today.date())
+    levels, ratios = pacing.rate_feasibility(plan['monthly'], float(monthly_surplus))
+
+    goals_data = []
+    for i, goal in enumerate(goals):
+        level = int(levels[i])
+        feasibility, feasibility_color = pacing.FEASIBILITY_LEVELS[level]
+        goals_data.append({
+            'id': goal.id,
+            'name': goal.name,
+            'target_amount': goal.target_amount,
+            'current_amount': goal.current_amount,
+            'target_date': goal.target_date.strftime('%d/%m/%Y'),
+            'progress': round(float(plan['progress'][i]), 1),
+            'monthly_contribution': round(float(plan['monthly'][i]), 2),
+            'weekly_contribution': round(float(plan['weekly'][i]), 2),
+            'daily_contribution': round(float(plan['daily'][i]), 2),
+            'remaining_amount': from_cents(plan['remaining_cents'][i]),
+            'is_due_today': bool(plan['is_due_today'][i]),
+            'is_past_due': bool(plan['is_past_due'][i]),
+            'days_remaining': int(plan['days_remaining'][i]),
+            'feasibility': feasibility,
+            'feasibility_color': feasibility_color,
+            'feasibility_msg': pacing.feasibility_message(level, float(plan['monthly'][i]), float(ratios[i]))
+        })
+    return goals_data
+
+@app.route('/api/goals/what_if', methods=['POST'])
+@login_required
+def goals_what_if():
+    """Re-planifica las metas con otros superávits mensuales sin escribir en la BD.
+
+    JSON: {"monthly_surplus": 1500 | [800, 1500, 3000], "goals": [...] (opcional)}. Sin "goals" se usan
+    las metas del usuario; cada meta hipotética lleva name, target_amount, current_amount y target_date (YYYY-MM-DD).
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'message': 'Parámetros inválidos.'}), 400
+    surplus = data.get('monthly_surplus')
+    scenarios = surplus if isinstance(surplus, list) else [surplus]
+    try:
+        scenarios = [float(s) for s in scenarios]
+        if data.get('goals') is not None:
+            goals = [{
+                'name': g.get('name', f'Meta {i + 1}'),
+                'target_amount': parse_money(g.get('target_amount')),
+                'current_amount': parse_money(g.get('current_amount') or 0),
+                'target_date': datetime.strptime(g.get('target_date') or '', '%Y-%m-%d')
+            } for i, g in enumerate(data['goals'])]
+        else:
+            goals = [{
+                'id': g.id, 'name': g.name, 'target_amount': g.target_amount,
+                'current_amount': g.current_amount, 'target_date': g.target_date
+            } for g in SavingsGoal.query.filter_by(user_id=current_user.id).all()]
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'success': False, 'message': 'Parámetros inválidos.'}), 400
+    if not scenarios or not goals:
+        return jsonify({'success': True, 'scenarios': []})
+
+    plan = pacing.plan_goals(*goal_arrays(goals), today=datetime.now().date())
+    # Todas las metas contra todos los escenarios en una sola operación (n_metas x n_escenarios)
+    levels, ratios = pacing.rate_feasibility(plan['monthly'], [scenarios])
+
+    return jsonify({
+        'success': True,
+        'scenarios': [{
+            'monthly_surplus': surplus_value,
+            'goals': [{
+                'id': goal.get('id'),
+                'name': goal['name'],
+                'monthly_contribution': round(float(plan['monthly'][i]), 2),
+                'feasibility': pacing.FEASIBILITY_LEVELS[int(levels[i, j])][0],
+                'feasibility_color': pacing.FEASIBILITY_LEVELS[int(levels[i, j])][1],
+                'feasibility_msg': pacing.feasibility_message(int(levels[i, j]), float(plan['monthly'][i]), float(ratios[i, j]))
+            } for i, goal in enumerate(goals)]
+        } for j, surplus_value in enumerate(scenarios)]
+    })
+
+@app.cli.command('plan-goals')
+@click.option('--user-id', type=int, default=None, help='Evaluar solo las metas de este usuario.')
+def plan_goals_command(user_id):
+    """Evalúa en lote el ritmo y la viabilidad de las metas de todos los usuarios."""
+    query = SavingsGoal.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    goals = query.order_by(SavingsGoal.user_id).all()
+    if not goals:
+        print(" * No hay metas de ahorro.")
+        return
+
+    now = datetime.now()
+    surplus_by_user = monthly_surplus_by_user(sorted({g.user_id for g in goals}), now)
+    plan = pacing.plan_goals(*goal_arrays(goals), today=now.date())
+    levels, _ = pacing.rate_feasibility(plan['monthly'], [float(surplus_by_user[g.user_id]) for g in goals])
+
+    counts = {}
+    for level in levels.tolist():
+        name = pacing.FEASIBILITY_LEVELS[level][0] if level != pacing.HEALTHY else 'sin aporte pendiente'
+        counts[name] = counts.get(name, 0) + 1
+    print(f" * {len(goals)} metas de {len(surplus_by_user)} usuarios evaluadas: "
+          + ", ".join(f"{name}={count}" for name, count in sorted(counts.items())))
+
+# --- PROYECCIÓN DE FLUJO DE CAJA (motor vectorizado en forecast.py) ---
+FORECAST_HISTORY_MONTHS = int(os.environ.get('FORECAST_HISTORY_MONTHS', 12))
+FORECAST_MAX_MONTHS = 24
+RECURRING_TITLE_PREFIX = 'Pago recurrente: '  # título de los movimientos de bill_due_subscriptions
+
+def build_cash_flow_forecast(user_id, months=12, now=None, min_balance=0):
+    """Balance diario proyectado de los próximos `months` meses, con alertas de balance y presupuestos.
+
+    Los cargos de suscripciones se proyectan desde su calendario real (add_months) y los movimientos
+    enlazados a un SubscriptionCharge se excluyen del patrón histórico para no contarlos dos veces.
+    """
+    from datetime import timedelta
+
+    now = now or datetime.now()
+    first_day = (now + timedelta(days=1)).date()
+    last_day = add_months(now, months).date()
+    days = forecast.day_range(first_day, last_day)
+
+    # Balance de apertura: neto de todo el historial
+    signed_amount = db.case((Transaction.type == 'income', Transaction.amount), else_=-Transaction.amount)
+    opening_balance = db.session.query(db.func.sum(signed_amount)).filter(Transaction.user_id == user_id).scalar() or 0
+
+    # Patrón histórico: meses completos anteriores al actual, sin cargos recurrentes
+    history_end = month_range(now.year, now.month)[0]
+    history_start = add_months(history_end, -FORECAST_HISTORY_MONTHS)
+    day_col = db.func.date(Transaction.date)
+    is_recurring_charge = db.exists().where(SubscriptionCharge.transaction_id == Transaction.id)
+    rows = db.session.query(
+        day_col, Transaction.type, Transaction.category, db.func.sum(Transaction.amount)
+    ).filter(
+        Transaction.user_id == user_id,
+        Transaction.date >= history_start,
+        Transaction.date < history_end,
+        ~is_recurring_charge
+    ).group_by(day_col, Transaction.type, Transaction.category).all()
+
+    subscriptions = Subscription.query.filter_by(user_id=user_id, active=True).all()
+    budgets = Budget.query.filter_by(user_id=user_id).all()
+
+    categories = sorted({r[2] for r in rows if r[1] == 'expense'} | {s.category for s in subscriptions} | {b.category for b in budgets})
+    category_index = {category: i for i, category in enumerate(categories)}
+
+    income_rows = [r for r in rows if r[1] == 'income']
+    expense_rows = [r for r in rows if r[1] == 'expense']
+    # date() devuelve str en SQLite y date en PostgreSQL
+    observed_months = sorted({str(r[0])[:7] for r in rows})
+    n_months = 0
+    if observed_months:
+        first_year, first_month = map(int, observed_months[0].split('-'))
+        n_months = (history_end.year - first_year) * 12 + history_end.month - first_month
+
+    income_profile = forecast.day_of_month_profile(
+        [0] * len(income_rows), [str(r[0])[:10] for r in income_rows], [float(r[3]) for r in income_rows], 1, n_months
+    )[0]
+    expense_dates = [str(r[0])[:10] for r in expense_rows]
+    expense_amounts = [float(r[3]) for r in expense_rows]
+    expense_profile = forecast.day_of_month_profile(
+        [category_index[r[2]] for r in expense_rows], expense_dates, expense_amounts, len(categories), n_months
+    )
+    seasonal = forecast.seasonal_factors(expense_dates, expense_amounts)
+
+    # Calendario de suscripciones (los cobros vencidos y aún no posteados caen mañana)
+    scheduled = []
+    scheduled_items = []
+    horizon_end = datetime.combine(last_day, datetime.max.time())
+    for sub in subscriptions:
+        period = BILLING_PERIOD_MONTHS.get(sub.billing_period)
+        if period is None:
+            continue
+        due_date = sub.next_due_date
+        while due_date <= horizon_end:
+            charge_day = max(due_date.date(), first_day)
+            scheduled.append(((charge_day - first_day).days, category_index[sub.category], float(sub.amount)))
+            scheduled_items.append({'date': charge_day.isoformat(), 'name': sub.name, 'amount': sub.amount})
+            due_date = add_months(due_date, period)
+
+    budget_limits = np.full(len(categories), np.nan)
+    for budget in budgets:
+        budget_limits[category_index[budget.category]] = float(budget.amount)
+    # Gasto ya hecho en el mes de first_day. El último día del mes la proyección arranca en el mes
+    # siguiente, que aún no tiene gasto: sembrar el del mes actual daría alertas falsas.
+    month_to_date_spent = np.zeros(len(categories))
+    if (first_day.year, first_day.month) == (now.year, now.month):
+        month_to_date = get_period_kpis(user_id, history_end, datetime.combine(first_day, datetime.min.time()))['cat_totals']
+        month_to_date_spent = np.array([float(month_to_date.get(category, 0)) for category in categories])
+
+    result = forecast.project_cash_flow(
+        days, float(opening_balance), income_profile, expense_profile, seasonal,
+        scheduled=scheduled, budget_limits=budget_limits, month_to_date_spent=month_to_date_spent,
+        min_balance=float(min_balance)
+    )
+
+    dates = [str(d) for d in days]
+    balance_alert = result['alerts']['balance']
+    return {
+        'start_balance': opening_balance,
+        'dates': dates,
+        'income': np.round(result['income'], 2).tolist(),
+        'expense': np.round(result['expense'], 2).tolist(),
+        'balance': np.round(result['balance'], 2).tolist(),
+        'subscriptions': sorted(scheduled_items, key=lambda item: item['date']),
+        'alerts': {
+            'balance': {
+                'min_balance': balance_alert['min_balance'],
+                'first_breach_date': dates[balance_alert['first_breach']] if balance_alert['first_breach'] is not None else None,
+                'days_below': balance_alert['days_below'],
+                'lowest_date': dates[balance_alert['lowest']],
+                'lowest_balance': round(float(result['balance'][balance_alert['lowest']]), 2)
+            },
+            'budgets': [{
+                'category': categories[alert['category']],
+                'month': dates[alert['month_start']][:7],
+                'breach_date': dates[alert['breach_day']],
+                'projected': round(alert['projected'], 2),
+                'limit': alert['limit']
+            } for alert in result['alerts']['budgets']]
+        }
+    }
+
+@app.route('/api/forecast')
+@login_required
+def api_forecast():
+    try:
+        months = min(max(int(request.args.get('months', 12)), 1), FORECAST_MAX_MONTHS)
+        min_balance = float(request.args.get('min_balance', 0))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parámetros inválidos.'}), 400
+
+    return jsonify({'success': True, **build_cash_flow_forecast(current_user.id, months, min_balance=min_balance)})
+
 @app.route('/add_savings_goal', methods=['POST'])
 @login_required
 def add_savings_goal():
     name = request.form.get('name')
-    target_amount = float(request.form.get('target_amount'))
-    initial_amount = float(request.form.get('initial_amount') or 0.0)
+    target_amount = parse_money(request.form.get('target_amount'))
+    initial_amount = parse_money(request.form.get('initial_amount') or 0)
     target_date_str = request.form.get('target_date')
     
     try:
@@ -904,6 +2427,7 @@ def add_savings_goal():
     )
     
     db.session.add(new_goal)
+    bump_data_version(current_user.id)
     db.session.commit()
     flash('Meta de ahorro creada correctamente.', 'success')
     return redirect(url_for('dashboard'))
@@ -916,6 +2440,7 @@ def delete_savings_goal(id):
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
     
     db.session.delete(goal)
+    bump_data_version(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -929,6 +2454,7 @@ def extend_savings_goal(id):
     # Extender 30 días
     from datetime import timedelta
     goal.target_date += timedelta(days=30)
+    bump_data_version(current_user.id)
     db.session.commit()
     
     return jsonify({'success': True, 'new_date': goal.target_date.strftime('%d/%m/%Y')})
@@ -940,23 +2466,80 @@ def add_funds_to_goal(id):
     if goal.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
         
-    amount = float(request.form.get('amount') or 0)
+    amount = parse_money(request.form.get('amount') or 0)
     
     if amount <= 0:
         return jsonify({'success': False, 'message': 'Monto inválido'}), 400
         
     goal.current_amount += amount
+    bump_data_version(current_user.id)
     db.session.commit()
     
     return jsonify({'success': True})
 
 # --- RUTAS DE PRESUPUESTO (SMART BUDGETS) ---
 
+def get_budget_status(user_id, year, month):
+    """Gasto, restante, porcentaje y color de estado de cada presupuesto del usuario en el mes.
+
+    El gasto por categoría sale de MonthlySummary.category_totals, que cada escritura de Transaction
+    actualiza de forma incremental, así que no se recorren los movimientos del mes.
+    """
+    budgets = Budget.query.filter_by(user_id=user_id).all()
+    if not budgets:
+        return []
+
+    summary = MonthlySummary.query.filter_by(user_id=user_id, year=year, month=month).first()
+    category_totals = {category: from_cents(cents) for category, cents in (summary.category_totals if summary else {}).items()}
+
+    budgets_data = []
+    for budget in budgets:
+        spent = category_totals.get(budget.category, 0)
+        percentage = 0
+        if budget.amount > 0:
+            percentage = min((spent / budget.amount) * 100, 100)
+
+        status_color = "success"
+        if percentage >= 100:
+            status_color = "danger"
+        elif percentage >= 80:
+            status_color = "warning"
+
+        budgets_data.append({
+            'id': budget.id,
+            'category': budget.category,
+            'amount': budget.amount,
+            'spent': spent,
+            'remaining': max(budget.amount - spent, 0),
+            'percentage': round(percentage, 1),
+            'status_color': status_color
+        })
+    return budgets_data
+
+@app.route('/api/budgets/status')
+@login_required
+def budgets_status():
+    now = datetime.utcnow()
+    try:
+        year = int(request.args.get('year', now.year))
+        month = int(request.args.get('month', now.month))
+        if not 1 <= month <= 12:
+            raise ValueError
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Parámetros inválidos.'}), 400
+
+    return jsonify({
+        'success': True,
+        'month': f"{year}-{month:02d}",
+        'budgets': get_budget_status(current_user.id, year, month)
+    })
+
+
 @app.route('/add_budget', methods=['POST'])
 @login_required
 def add_budget():
     category = request.form.get('category')
-    amount = float(request.form.get('amount'))
+    amount = parse_money(request.form.get('amount'))
     
     # Check if budget for category already exists
     existing = Budget.query.filter_by(user_id=current_user.id, category=category).first()
@@ -968,6 +2551,7 @@ def add_budget():
         db.session.add(new_budget)
         flash('Presupuesto creado correctamente.', 'success')
         
+    bump_data_version(current_user.id)
     db.session.commit()
     return redirect(url_for('dashboard'))
 
@@ -979,6 +2563,7 @@ def delete_budget(id):
         return jsonify({'success': False}), 403
     
     db.session.delete(budget)
+    bump_data_version(current_user.id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -989,8 +2574,9 @@ def edit_budget(id):
     if budget.user_id != current_user.id:
         return jsonify({'success': False, 'message': 'No autorizado'}), 403
     
-    amount = float(request.form.get('amount'))
+    amount = parse_money(request.form.get('amount'))
     budget.amount = amount
+    bump_data_version(current_user.id)
     db.session.commit()
     
     flash(f'Presupuesto de {budget.category} actualizado.', 'success')
@@ -998,51 +2584,101 @@ def edit_budget(id):
 
 
 # --- RUTA API AURELIUS (IA) ---
-@app.route('/api/ask_aurelius', methods=['POST'])
-@login_required
-def ask_aurelius():
-    data = request.json
-    user_message = data.get('message', '')
-    
-    # 1. Recopilar Contexto Financiero del Usuario
-    now = datetime.utcnow()
-    start_date = datetime(now.year, now.month, 1)
-    if now.month == 12:
-        end_date = datetime(now.year + 1, 1, 1)
-    else:
-        end_date = datetime(now.year, now.month + 1, 1)
-
-    transactions = Transaction.query.filter_by(user_id=current_user.id).filter(
-        Transaction.date >= start_date,
-        Transaction.date < end_date
-    ).all()
-
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expense = sum(t.amount for t in transactions if t.type == 'expense')
-    balance = float(str(total_income)) - float(str(total_expense)) # Safe float conversion
-    
-    expenses_by_cat = {}
-    for t in transactions:
-        if t.type == 'expense':
-            expenses_by_cat[t.category] = expenses_by_cat.get(t.category, 0) + t.amount
-
-    top_cat = max(expenses_by_cat, key=expenses_by_cat.get) if expenses_by_cat else "Ninguna"
-    
-    savings_goals = SavingsGoal.query.filter_by(user_id=current_user.id).all()
-    goals_context = ", ".join([f"{g.name}: ${g.current_amount}/${g.target_amount}" for g in savings_goals])
-    
-    # 2. Configurar Cliente OpenAI (usando Groq - Gratis y Rápido)
-    api_key = os.environ.get('GROQ_API_KEY')
-    
-    if not api_key:
-         # Fallback si no hay clave
-        return jsonify({
-            'response': f"Hola {current_user.name}. He cambiado mi cerebro a <strong>Groq (Llama 3)</strong> para ser más rápido y gratuito.<br>Por favor configura tu <a href='https://console.groq.com/keys' target='_blank'>API Key de Groq</a> en el código para activarme."
-        })
-
-    client = OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
-
-    # 3. ADVANCED RAG (Search + LLM) - TAVILY IMPLEMENTATION
+GROQ_BASE_URL = os.environ.get('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
+TAVILY_BASE_URL = os.environ.get('TAVILY_BASE_URL', 'https://api.tavily.com')
+AURELIUS_MODEL = "llama-3.3-70b-versatile"
+
+# --- REGISTRO DE CLIENTES HTTP (OpenAI/Groq y Tavily) ---
+# Un cliente por proceso con pool de conexiones: reutiliza keep-alive y sesiones TLS entre
+# requests. Se crean de forma perezosa y se recrean si el PID cambia (fork de gunicorn),
+# para que un worker nunca herede sockets abiertos del proceso padre.
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 30))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+HTTP_POOL_MAX_CONNECTIONS = int(os.environ.get('HTTP_POOL_MAX_CONNECTIONS', 20))
+HTTP_POOL_MAX_KEEPALIVE = int(os.environ.get('HTTP_POOL_MAX_KEEPALIVE', 10))
+HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', 0.5))
+
+_client_registry = {}
+_client_registry_lock = threading.Lock()
+
+def _get_pooled_client(name, api_key, factory):
+    key = (name, api_key, os.getpid())
+    client = _client_registry.get(key)
+    if client is None:
+        with _client_registry_lock:
+            client = _client_registry.get(key)
+            if client is None:
+                # Descartar clientes de otro PID (heredados antes del fork)
+                for stale_key in [k for k in _client_registry if k[2] != os.getpid()]:
+                    del _client_registry[stale_key]
+                client = factory()
+                _client_registry[key] = client
+    return client
+
+def get_llm_client(api_key):
+    """Cliente OpenAI compatible (Groq) compartido por el proceso, con pool, timeout y reintentos."""
+    def factory():
+        import httpx
+        from openai import DefaultHttpxClient
+        http_client = DefaultHttpxClient(limits=httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE
+        ))
+        return OpenAI(api_key=api_key, base_url=GROQ_BASE_URL, timeout=LLM_TIMEOUT,
+                      max_retries=LLM_MAX_RETRIES, http_client=http_client)
+    return _get_pooled_client('llm', api_key, factory)
+
+def get_tavily_client(api_key):
+    """TavilyClient compartido por el proceso sobre una requests.Session con pool y backoff."""
+    def factory():
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        from tavily import TavilyClient
+        session = requests.Session()
+        retry = Retry(total=LLM_MAX_RETRIES, backoff_factor=HTTP_RETRY_BACKOFF,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None)
+        session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAX_CONNECTIONS, max_retries=retry))
+        return TavilyClient(api_key=api_key, api_base_url=TAVILY_BASE_URL, session=session)
+    return _get_pooled_client('tavily', api_key, factory)
+
+def aurelius_missing_key_message():
+    return f"Hola {current_user.name}. He cambiado mi cerebro a <strong>Groq (Llama 3)</strong> para ser más rápido y gratuito.<br>Por favor configura tu <a href='https://console.groq.com/keys' target='_blank'>API Key de Groq</a> en el código para activarme."
+
+def aurelius_error_message(e):
+    print(f"Error AI: {e}")
+    error_msg = str(e)
+    if "402" in error_msg or "Insufficient Balance" in error_msg:
+        return "Parece que tu cuenta de DeepSeek no tiene saldo (Error 402). Por favor recarga créditos en platform.deepseek.com para que pueda responderte."
+    elif "401" in error_msg:
+        return "Error de autenticación (401). Verifica que tu API Key sea correcta."
+    return "Lo siento, tuve un problema conectando con mi red neuronal. Por favor verifica tu conexión o tu API Key."
+
+# Presupuestos de tiempo por etapa (segundos). Si la búsqueda no llega a tiempo,
+# Aurelius responde sin resultados de búsqueda en lugar de esperar.
+AURELIUS_REWRITE_TIMEOUT = float(os.environ.get('AURELIUS_REWRITE_TIMEOUT', 4))
+AURELIUS_SEARCH_TIMEOUT = float(os.environ.get('AURELIUS_SEARCH_TIMEOUT', 5))
+AURELIUS_SEARCH_DEADLINE = float(os.environ.get('AURELIUS_SEARCH_DEADLINE', 6))
+aurelius_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('AURELIUS_MAX_WORKERS', 8)), thread_name_prefix='aurelius')
+
+# Cachés de búsqueda: pregunta normalizada -> query reescrita, y query -> resultados de Tavily
+search_query_cache = make_cache('search_query', maxsize=int(os.environ.get('SEARCH_CACHE_SIZE', 2048)),
+                                ttl=int(os.environ.get('SEARCH_QUERY_CACHE_TTL', 86400)))
+search_results_cache = make_cache('search_results', maxsize=int(os.environ.get('SEARCH_CACHE_SIZE', 2048)),
+                                  ttl=int(os.environ.get('SEARCH_RESULTS_CACHE_TTL', 1800)))
+
+AURELIUS_OUTBOUND_STAGES = {'rewrite': 'llm_rewrite', 'search': 'tavily_search', 'llm': 'llm'}
+
+def log_aurelius_timings(timings):
+    timings = dict(timings)
+    stages = " ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in timings.items())
+    print(f" * Aurelius timings: {stages}")
+    for stage, service in AURELIUS_OUTBOUND_STAGES.items():
+        if stage in timings:
+            observe_outbound(service, timings[stage])
+
+def aurelius_search_context(client, user_message, timings):
+    """Pipeline de búsqueda (reescritura de query con el LLM + Tavily). No toca la base de datos."""
     search_context = ""
 
     # Configura aquí tu API Key de Tavily
@@ -1056,29 +2692,41 @@ def ask_aurelius():
                 search_context = "Nota para el asistente: No tienes acceso a búsqueda en internet en este momento. Responde usando solo tu conocimiento interno."
             else:
                  try:
-                     from tavily import TavilyClient
-                     tavily = TavilyClient(api_key=tavily_api_key)
-                     
-                     # Optimizar query con LLM primero
-                     query_gen_prompt = [
-                        {"role": "system", "content": "You are a Search Query Generator. Output ONLY the best search query (keywords) for the user's question, focusing on finances in Mexico. Add 'Mexico' and 'actual' if relevant. NO explanations."},
-                        {"role": "user", "content": f"Question: {user_message}"}
-                     ]
-                     
-                     q_response = client.chat.completions.create(
-                        model="llama-3.3-70b-versatile",
-                        messages=query_gen_prompt,
-                        max_tokens=30
-                     )
-                     search_query = q_response.choices[0].message.content.strip().replace('"', '')
+                     # Optimizar query con LLM primero (cacheada por pregunta normalizada)
+                     question_key = normalize_question(user_message)
+                     search_query = search_query_cache.get(question_key)
+                     if search_query is None:
+                         query_gen_prompt = [
+                            {"role": "system", "content": "You are a Search Query Generator. Output ONLY the best search query (keywords) for the user's question, focusing on finances in Mexico. Add 'Mexico' and 'actual' if relevant. NO explanations."},
+                            {"role": "user", "content": f"Question: {user_message}"}
+                         ]
+                         
+                         stage_start = time.perf_counter()
+                         q_response = client.chat.completions.create(
+                            model=AURELIUS_MODEL,
+                            messages=query_gen_prompt,
+                            max_tokens=30,
+                            timeout=AURELIUS_REWRITE_TIMEOUT
+                         )
+                         search_query = q_response.choices[0].message.content.strip().replace('"', '')
+                         timings['rewrite'] = time.perf_counter() - stage_start
+                         search_query_cache.set(question_key, search_query)
                      print(f"SEARCH QUERY OPTIMIZED (Tavily): {search_query}")
     
-                     # Ejecutar búsqueda con Tavily
-                     response = tavily.search(query=search_query, search_depth="basic", max_results=3)
-                     
-                     results_text = []
-                     for res in response.get('results', []):
-                         results_text.append(f"Title: {res['title']}\nSnippet: {res['content']}\nSource: {res['url']}")
+                     # Ejecutar búsqueda con Tavily (cacheada por query reescrita)
+                     query_key = normalize_question(search_query)
+                     results_text = search_results_cache.get(query_key)
+                     if results_text is None:
+                         tavily = get_tavily_client(tavily_api_key)
+
+                         stage_start = time.perf_counter()
+                         response = tavily.search(query=search_query, search_depth="basic", max_results=3, timeout=AURELIUS_SEARCH_TIMEOUT)
+                         timings['search'] = time.perf_counter() - stage_start
+                         
+                         results_text = []
+                         for res in response.get('results', []):
+                             results_text.append(f"Title: {res['title']}\nSnippet: {res['content']}\nSource: {res['url']}")
+                         search_results_cache.set(query_key, results_text)
                      
                      if results_text:
                          search_context = "\n‼️ INFORMACIÓN EN TIEMPO REAL (PRIORIDAD MÁXIMA - USAR ESTO SOBRE TU CONOCIMIENTO INTERNO):\n"
@@ -1092,7 +2740,53 @@ def ask_aurelius():
         except Exception as e:
             print(f"RAG Error (Tavily): {e}")
 
-    # 4. Construir Prompt del Sistema
+    return search_context
+
+def build_aurelius_messages(client, data, timings):
+    """Arma el prompt de Aurelius: contexto financiero del usuario + búsqueda (Tavily) + historial.
+
+    La búsqueda corre en paralelo con las consultas a la base de datos; `timings` recibe
+    la duración de cada etapa.
+    """
+    user_message = data.get('message', '')
+    
+    # La búsqueda (red) arranca primero y avanza mientras se consulta la base de datos
+    search_future = None
+    if len(user_message) > 4:
+        search_future = aurelius_executor.submit(aurelius_search_context, client, user_message, timings)
+
+    # 1. Recopilar Contexto Financiero del Usuario
+    stage_start = time.perf_counter()
+    now = datetime.utcnow()
+    start_date, end_date = month_range(now.year, now.month)
+
+    kpis = get_period_kpis(current_user.id, start_date, end_date)
+    total_income = kpis['total_income']
+    total_expense = kpis['total_expense']
+    balance = total_income - total_expense
+    expenses_by_cat = kpis['cat_totals']
+
+    top_cat = max(expenses_by_cat, key=expenses_by_cat.get) if expenses_by_cat else "Ninguna"
+    
+    savings_goals = SavingsGoal.query.filter_by(user_id=current_user.id).all()
+    goals_context = ", ".join([f"{g.name}: ${g.current_amount}/${g.target_amount}" for g in savings_goals])
+    timings['db_context'] = time.perf_counter() - stage_start
+    # La conexión vuelve al pool antes de esperar a la red (búsqueda y LLM): un chat lento no la retiene
+    db.session.close()
+    
+    # 2. ADVANCED RAG (Search + LLM) - esperar la búsqueda como máximo hasta el deadline
+    search_context = ""
+    if search_future:
+        stage_start = time.perf_counter()
+        try:
+            search_context = search_future.result(timeout=AURELIUS_SEARCH_DEADLINE)
+        except FuturesTimeoutError:
+            print(f"RAG Timeout: búsqueda descartada tras {AURELIUS_SEARCH_DEADLINE}s.")
+        except Exception as e:
+            print(f"RAG Error (Tavily): {e}")
+        timings['search_wait'] = time.perf_counter() - stage_start
+
+    # 3. Construir Prompt del Sistema
     system_prompt = f"""
     Eres Aurelius, un asesor financiero personal experto.
     Estás hablando con {current_user.name}.
@@ -1142,34 +2836,96 @@ def ask_aurelius():
     # (El frontend a veces envía el mensaje aparte del historial)
     messages.append({"role": "user", "content": user_message})
 
+    return messages
+
+@app.route('/api/ask_aurelius', methods=['POST'])
+@login_required
+def ask_aurelius():
+    data = request.json
+    
+    # Configurar Cliente OpenAI (usando Groq - Gratis y Rápido)
+    api_key = os.environ.get('GROQ_API_KEY')
+    
+    if not api_key:
+         # Fallback si no hay clave
+        return jsonify({'response': aurelius_missing_key_message()})
+
+    request_start = time.perf_counter()
+    timings = {}
+    client = get_llm_client(api_key)
+    messages = build_aurelius_messages(client, data, timings)
+
     try:
+        stage_start = time.perf_counter()
         response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+            model=AURELIUS_MODEL,
             messages=messages,
             stream=False
         )
         ai_reply = response.choices[0].message.content
+        timings['llm'] = time.perf_counter() - stage_start
         return jsonify({'response': ai_reply})
         
     except Exception as e:
-        print(f"Error AI: {e}")
-        error_msg = str(e)
-        if "402" in error_msg or "Insufficient Balance" in error_msg:
-            return jsonify({'response': "Parece que tu cuenta de DeepSeek no tiene saldo (Error 402). Por favor recarga créditos en platform.deepseek.com para que pueda responderte."})
-        elif "401" in error_msg:
-             return jsonify({'response': "Error de autenticación (401). Verifica que tu API Key sea correcta."})
-             
-        return jsonify({'response': "Lo siento, tuve un problema conectando con mi red neuronal. Por favor verifica tu conexión o tu API Key."})
+        return jsonify({'response': aurelius_error_message(e)})
+    finally:
+        timings['total'] = time.perf_counter() - request_start
+        log_aurelius_timings(timings)
 
+@app.route('/api/ask_aurelius/stream', methods=['POST'])
+@login_required
+def ask_aurelius_stream():
+    """Variante en streaming (Server-Sent Events): envía los tokens conforme llegan del modelo.
 
-# --- RUTA CHATBOT SOPORTE (LANDING PAGE) ---
-@app.route('/api/ask_support', methods=['POST'])
-def ask_support():
+    Cada evento es `data: {"token": "..."}`; el stream termina con `data: [DONE]`.
+    """
     data = request.json
-    user_message = data.get('message', '')
-    
-    # Contexto de la aplicación (Knowledge Base básico)
-    app_context = """
+
+    def sse(payload):
+        return f"data: {json.dumps(payload)}\n\n"
+
+    api_key = os.environ.get('GROQ_API_KEY')
+    if not api_key:
+        # El mensaje se arma aquí: el generador corre fuera del contexto de la petición
+        message = aurelius_missing_key_message()
+        def missing_key():
+            yield sse({'token': message})
+            yield "data: [DONE]\n\n"
+        return Response(stream_with_context(missing_key()), mimetype='text/event-stream')
+
+    request_start = time.perf_counter()
+    timings = {}
+    client = get_llm_client(api_key)
+    messages = build_aurelius_messages(client, data, timings)
+
+    def generate():
+        stage_start = time.perf_counter()
+        try:
+            stream = client.chat.completions.create(
+                model=AURELIUS_MODEL,
+                messages=messages,
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield sse({'token': token})
+        except Exception as e:
+            yield sse({'token': aurelius_error_message(e), 'error': True})
+        timings['llm'] = time.perf_counter() - stage_start
+        timings['total'] = time.perf_counter() - request_start
+        log_aurelius_timings(timings)
+        yield "data: [DONE]\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# --- RUTA CHATBOT SOPORTE (LANDING PAGE) ---
+# Contexto de la aplicación (Knowledge Base básico)
+SUPPORT_APP_CONTEXT = """
     INFORMACIÓN SOBRE FINANZAPP:
     - Qué es: Una plataforma web para gestionar finanzas personales y empresariales.
     - Costo: Completamente GRATIS actualmente.
@@ -1179,12 +2935,12 @@ def ask_support():
     - Soporte: Correo de contacto soporte@finanzapp.com.
     - Registro: Se requiere nombre, correo y contraseña.
     """
-    
-    system_prompt = f"""
+
+SUPPORT_SYSTEM_PROMPT = f"""
     Eres Aurelius, el Asistente Inteligente de FinanzApp.
     NO eres un asesor financiero personal en este chat, eres un guía sobre la plataforma.
     
-    {app_context}
+    {SUPPORT_APP_CONTEXT}
     
     Reglas:
     1. Eres amable, profesional, inteligente y conciso.
@@ -1192,7 +2948,91 @@ def ask_support():
     3. Si preguntan algo técnico o financiero complejo, diles que "en el Dashboard" podrás analizar sus datos reales.
     4. Responde siempre en español.
     """
+
+def support_key(text):
+    """Clave normalizada para el bot de soporte: sin acentos, sin signos y con espacios colapsados."""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', normalize_question(text)).split())
+
+# FAQ precalculada a partir de SUPPORT_APP_CONTEXT: se responde sin llamar al LLM
+_SUPPORT_FAQ_ANSWERS = {
+    'costo': "¡Sí! FinanzApp es <b>completamente gratis</b> actualmente. Regístrate con tu nombre, correo y contraseña y empieza a organizar tus finanzas hoy mismo.",
+    'que_es': "FinanzApp es una plataforma web para gestionar tus <b>finanzas personales y empresariales</b>: registra ingresos y gastos, define presupuestos mensuales, crea metas de ahorro y visualiza todo en un dashboard con gráficos.",
+    'funciones': "Con FinanzApp puedes registrar ingresos y gastos, crear presupuestos mensuales, seguir metas de ahorro, descargar reportes PDF/Excel y analizar tu dashboard con gráficos. Además cuentas con <b>Aurelius</b>, tu asesor financiero IA.",
+    'registro': "Registrarte es muy fácil: solo necesitas tu <b>nombre, correo y contraseña</b>. ¡Y es gratis!",
+    'privacidad': "Tu información está protegida: <b>no conectamos con bancos</b>, el registro de movimientos es manual para mayor seguridad y tus datos se guardan encriptados.",
+    'aurelius': "Aurelius es el <b>asesor financiero con IA</b> de FinanzApp. Dentro del Dashboard analiza tus datos reales y te da consejos accionables.",
+    'soporte': "Puedes escribirnos a <b>soporte@finanzapp.com</b> y con gusto te ayudamos.",
+}
+
+SUPPORT_FAQ = {support_key(question): _SUPPORT_FAQ_ANSWERS[topic] for question, topic in [
+    ("¿Es gratis?", 'costo'),
+    ("¿Es gratuito?", 'costo'),
+    ("¿Cuánto cuesta?", 'costo'),
+    ("¿Tiene costo?", 'costo'),
+    ("¿Qué es FinanzApp?", 'que_es'),
+    ("¿Qué es esto?", 'que_es'),
+    ("¿Qué puedo hacer con FinanzApp?", 'funciones'),
+    ("¿Qué funciones tiene?", 'funciones'),
+    ("¿Puedo descargar reportes?", 'funciones'),
+    ("¿Cómo me registro?", 'registro'),
+    ("¿Qué necesito para registrarme?", 'registro'),
+    ("¿Es seguro?", 'privacidad'),
+    ("¿Se conecta con mi banco?", 'privacidad'),
+    ("¿Mis datos están seguros?", 'privacidad'),
+    ("¿Quién es Aurelius?", 'aurelius'),
+    ("¿Qué es Aurelius?", 'aurelius'),
+    ("¿Cómo contacto a soporte?", 'soporte'),
+    ("Contacto", 'soporte'),
+]}
+
+support_answer_cache = make_cache('support_answers', maxsize=int(os.environ.get('SUPPORT_CACHE_SIZE', 1024)),
+                                  ttl=int(os.environ.get('SUPPORT_CACHE_TTL', 21600)))
+
+class TokenBucketLimiter:
+    """Limitador token-bucket por clave (IP). `rate` tokens por segundo, ráfagas de hasta `capacity`.
+
+    `clock` devuelve segundos monótonos (time.monotonic); los tests pasan un reloj falso.
+    """
+
+    def __init__(self, rate, capacity, max_keys=10000, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+# Por defecto: ráfaga de 5 preguntas y 1 pregunta nueva cada 10 s por IP
+support_limiter = TokenBucketLimiter(rate=float(os.environ.get('SUPPORT_RATE_PER_SEC', 0.1)),
+                                     capacity=int(os.environ.get('SUPPORT_RATE_BURST', 5)))
+
+@app.route('/api/ask_support', methods=['POST'])
+def ask_support():
+    data = request.json
+    user_message = data.get('message', '')
     
+    # 1. FAQ precalculada y respuestas ya generadas (sin llamada saliente)
+    question_key = support_key(user_message)
+    if question_key in SUPPORT_FAQ:
+        return jsonify({'response': SUPPORT_FAQ[question_key]})
+
+    cached_answer = support_answer_cache.get(question_key)
+    if cached_answer is not None:
+        return jsonify({'response': cached_answer})
+
     try:
         # Usamos la misma configuración de Groq
         api_key = os.environ.get('GROQ_API_KEY')
@@ -1201,23 +3041,28 @@ def ask_support():
             # Modo Local sin API Key (Mock Response para evitar errores)
             return jsonify({'response': "⚠️ <b>Modo Desarrollo:</b> No se detectó <code style='background:#eee;padding:2px;'>GROQ_API_KEY</code> en tu .env local.<br><br>Por favor configura la variable de entorno para habilitar la IA. Mientras tanto, soy un bot simple: ¡Regístrate para probar la app!"})
 
-        # Import OpenAI here just in case it wasn't imported globally or to ensure scope
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
+        # 2. Proteger la cuota del LLM: límite por IP solo para preguntas que salen a Groq
+        if not support_limiter.allow(request.remote_addr):
+            return jsonify({'response': "Estoy recibiendo muchas preguntas en este momento. Por favor espera unos segundos e inténtalo de nuevo."}), 429
+
+        client = get_llm_client(api_key)
         
+        llm_start = time.perf_counter()
         completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+            model=AURELIUS_MODEL,
             messages=[
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": SUPPORT_SYSTEM_PROMPT},
                 {"role": "user", "content": user_message}
             ],
             temperature=0.6,
             max_tokens=300
         )
+        observe_outbound('llm_support', time.perf_counter() - llm_start)
         response_text = completion.choices[0].message.content
         
         # Formato HTML
         response_text = response_text.replace("\n", "<br>").replace("**", "<b>").replace("**", "</b>")
+        support_answer_cache.set(question_key, response_text)
         
         return jsonify({'response': response_text})
 
@@ -1249,6 +3094,127 @@ with app.app_context():
         # Si falla (ej. tabla "user" vs "users" o dialecto), logueamos pero no detenemos la app
         print(f" * Migración Advertencia: No se pudo verificar/actualizar esquema autom. Error: {e}")
 
+    # Auto-Migración para añadir columna version a monthly_summary si falta
+    try:
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('monthly_summary')]
+
+        if 'version' not in columns:
+            print(" * Migración: Detectada falta de columna 'version' en monthly_summary. Intentando añadirla...")
+            with db.engine.connect() as conn:
+                conn.execute(text('ALTER TABLE monthly_summary ADD COLUMN version INTEGER NOT NULL DEFAULT 0'))
+                conn.commit()
+            print(" * Migración: Columna 'version' añadida con éxito.")
+    except Exception as e:
+        print(f" * Migración Advertencia: No se pudo añadir la columna 'version'. Error: {e}")
+
+    # Auto-Migración para añadir columna data_version a user si falta
+    try:
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('user')]
+
+        if 'data_version' not in columns:
+            print(" * Migración: Detectada falta de columna 'data_version' en user. Intentando añadirla...")
+            with db.engine.connect() as conn:
+                conn.execute(text('ALTER TABLE "user" ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0'))
+                conn.commit()
+            print(" * Migración: Columna 'data_version' añadida con éxito.")
+    except Exception as e:
+        print(f" * Migración Advertencia: No se pudo añadir la columna 'data_version'. Error: {e}")
+
+    # Auto-Migración: enlace SubscriptionCharge -> Transaction (los cargos previos se enlazan por título y fecha)
+    try:
+        inspector = inspect(db.engine)
+        columns = [col['name'] for col in inspector.get_columns('subscription_charge')]
+
+        if 'transaction_id' not in columns:
+            print(" * Migración: Detectada falta de columna 'transaction_id' en subscription_charge. Intentando añadirla...")
+            with db.engine.begin() as conn:
+                conn.execute(text('ALTER TABLE subscription_charge ADD COLUMN transaction_id INTEGER '
+                                  'REFERENCES "transaction" (id) ON DELETE SET NULL'))
+                conn.execute(text('CREATE INDEX IF NOT EXISTS ix_subscription_charge_transaction_id ON subscription_charge (transaction_id)'))
+                conn.execute(text(
+                    'UPDATE subscription_charge SET transaction_id = ('
+                    ' SELECT MIN(t.id) FROM "transaction" t JOIN subscription s ON s.id = subscription_charge.subscription_id'
+                    ' WHERE t.user_id = s.user_id AND t.date = subscription_charge.due_date'
+                    " AND t.title = :prefix || s.name)"
+                ), {'prefix': RECURRING_TITLE_PREFIX})
+            print(" * Migración: Columna 'transaction_id' añadida y cargos enlazados con éxito.")
+    except Exception as e:
+        print(f" * Migración Advertencia: No se pudo enlazar los cargos de suscripción. Error: {e}")
+
+    # Auto-Migración de montos Float -> centavos enteros (columna <nombre>_cents)
+    try:
+        inspector = inspect(db.engine)
+        money_columns = [
+            ('transaction', 'amount'), ('subscription', 'amount'), ('budget', 'amount'),
+            ('savings_goal', 'target_amount'), ('savings_goal', 'current_amount'),
+            ('monthly_summary', 'total_income'), ('monthly_summary', 'total_expense')
+        ]
+        pending = [(t, c) for t, c in money_columns if c in [col['name'] for col in inspector.get_columns(t)]]
+        if pending and db.engine.dialect.name == 'sqlite':
+            import sqlite3
+            # DROP COLUMN existe desde SQLite 3.35: sin él no se toca el esquema para no dejarlo a medias
+            if sqlite3.sqlite_version_info < (3, 35, 0):
+                raise RuntimeError(f"SQLite {sqlite3.sqlite_version} no soporta DROP COLUMN (se requiere 3.35 o superior). "
+                                   "Actualiza SQLite (o Python) y vuelve a arrancar; los montos siguen en la columna float original")
+        with db.engine.begin() as conn:
+            for table_name, column in pending:
+                columns = [col['name'] for col in inspector.get_columns(table_name)]
+                print(f" * Migración: Convirtiendo '{table_name}.{column}' a centavos enteros...")
+                if f'{column}_cents' not in columns:
+                    conn.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN {column}_cents BIGINT NOT NULL DEFAULT 0'))
+                conn.execute(text(f'UPDATE "{table_name}" SET {column}_cents = CAST(ROUND(COALESCE({column}, 0) * 100) AS BIGINT)'))
+                # La columna float solo se elimina si cada fila quedó a menos de medio centavo del valor original;
+                # si no, la excepción revierte la transacción y el float sigue intacto
+                mismatched = conn.execute(text(
+                    f'SELECT COUNT(*) FROM "{table_name}" WHERE ABS({column}_cents - COALESCE({column}, 0) * 100) > 0.5'
+                )).scalar()
+                if mismatched:
+                    raise RuntimeError(f"{mismatched} filas de '{table_name}.{column}' no coinciden tras el backfill")
+                conn.execute(text(f'ALTER TABLE "{table_name}" DROP COLUMN {column}'))
+
+                if table_name == 'monthly_summary' and column == 'total_income':
+                    # category_totals (JSON) pasa de montos float a centavos
+                    summary_table = MonthlySummary.__table__
+                    for summary_id, category_totals in conn.execute(db.select(summary_table.c.id, summary_table.c.category_totals)).all():
+                        conn.execute(summary_table.update().where(summary_table.c.id == summary_id).values(
+                            category_totals={category: to_cents(amount) for category, amount in (category_totals or {}).items()}
+                        ))
+                print(f" * Migración: '{table_name}.{column}' convertida con éxito.")
+    except Exception as e:
+        # Los modelos solo leen <columna>_cents: arrancar con el esquema sin convertir rompería cada consulta de montos
+        print(f" * Migración Error: No se pudieron convertir los montos a centavos. Error: {e}")
+        raise RuntimeError(f"Migración a centavos incompleta, la aplicación no puede arrancar: {e}") from e
+
+    # Auto-Migración de índices compuestos (create_all no los añade a tablas ya existentes)
+    try:
+        inspector = inspect(db.engine)
+        for model in (Transaction, Subscription, SavingsGoal, Budget):
+            table = model.__table__
+            existing_indexes = {idx['name'] for idx in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    print(f" * Migración: Creando índice '{index.name}'...")
+                    index.create(bind=db.engine, checkfirst=True)
+    except Exception as e:
+        print(f" * Migración Advertencia: No se pudieron crear los índices. Error: {e}")
+
+    # Índice de búsqueda de texto completo sobre título y descripción
+    try:
+        setup_transaction_search()
+    except Exception as e:
+        print(f" * Migración Advertencia: No se pudo crear el índice de búsqueda (se usará LIKE). Error: {e}")
+
+    # Backfill inicial del resumen mensual para bases de datos existentes
+    try:
+        if MonthlySummary.query.first() is None and Transaction.query.first() is not None:
+            print(" * Migración: Generando resumen mensual a partir de las transacciones existentes...")
+            rebuild_monthly_summaries()
+    except Exception as e:
+        db.session.rollback()
+        print(f" * Migración Advertencia: No se pudo generar el resumen mensual. Error: {e}")
+
 if __name__ == '__main__':
     print(f" * GROQ_API_KEY detected: {'GROQ_API_KEY' in os.environ}")
     app.run(debug=True)
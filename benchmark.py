@@ -0,0 +1,482 @@
+"""Benchmark de las rutas de FinanzApp con datos sintéticos.
+
+Crea una base de datos desechable (SQLite temporal, o --database-url), la puebla con usuarios,
+movimientos, suscripciones, metas y presupuestos, y ejecuta las rutas principales con el
+test client de Flask. Reporta p50/p95 de latencia, consultas SQL por request y memoria pico.
+
+    python benchmark.py --transactions 100000 --save-baseline bench.json
+    python benchmark.py --transactions 100000 --baseline bench.json   # sale con 1 si hay regresión
+    python benchmark.py --transactions 1000000 --runs 1 --scenario export_csv --scenario export_xlsx --max-peak-mem-mb 64
+    python benchmark.py --transactions 100000 --scenario kpis_sql --scenario kpis_loop --scenario history_sql --scenario history_loop
+    python benchmark.py --transactions 100000 --scenario period_query_indexed --scenario period_query_noindex
+    python benchmark.py --transactions 1000000 --scenario search_prefix --scenario search_terms --scenario search_miss
+    python benchmark.py --scenario search_fanout_pooled --scenario search_fanout_unpooled --search-latency-ms 20
+
+El LLM de Aurelius se reemplaza por un cliente falso (sin red) con latencia configurable. Tavily se
+reemplaza por un servidor HTTPS local (certificado autofirmado generado con openssl), de modo que
+la búsqueda paga el handshake TLS real: search_fanout_pooled usa el cliente compartido del proceso
+y search_fanout_unpooled crea un TavilyClient por búsqueda, como antes del registro de clientes.
+"""
+import json
+import os
+import random
+import shutil
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import click
+
+BENCH_PASSWORD = 'Bench#2024'
+CATEGORIES = ['Comida', 'Transporte', 'Vivienda', 'Salud', 'Entretenimiento', 'Servicios', 'Otros']
+TITLES = ['Café', 'Supermercado', 'Gasolina', 'Farmacia', 'Cine', 'Alquiler', 'Luz', 'Internet',
+          'Restaurante', 'Taxi', 'Gimnasio', 'Librería', 'Panadería', 'Médico', 'Regalo']
+
+
+class FakeLLMClient:
+    """Imita client.chat.completions.create de OpenAI (sin streaming) con una respuesta fija."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        message = SimpleNamespace(content='Respuesta de benchmark.')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeTavilyHandler(BaseHTTPRequestHandler):
+    """Responde POST /search como la API de Tavily, con keep-alive y la latencia del servidor."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({'results': [
+            {'title': f'Resultado {i}', 'content': 'Tasa de referencia de benchmark.', 'url': f'https://example.com/{i}'}
+            for i in range(3)
+        ]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_search_stand_in(workdir, latency):
+    """Levanta el servidor HTTPS local de Tavily. Devuelve (servidor, base_url, ruta del certificado)."""
+    cert, key = os.path.join(workdir, 'tavily.crt'), os.path.join(workdir, 'tavily.key')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-keyout', key, '-out', cert, '-subj', '/CN=127.0.0.1',
+                    '-addext', 'subjectAltName=IP:127.0.0.1'], check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTavilyHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    # El handshake se hace en el hilo de cada conexión, no en el accept: si no, se serializarían
+    server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'https://127.0.0.1:{server.server_address[1]}', cert
+
+
+def seed_data(A, users, transactions, subscriptions, goals, rng):
+    """Puebla la base con `users` usuarios sintéticos y devuelve el email del primero."""
+    from werkzeug.security import generate_password_hash
+
+    password_hash = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256')
+    now = datetime.utcnow()
+    start = now - timedelta(days=730)
+    span_seconds = int((now - start).total_seconds())
+
+    emails = []
+    for u in range(users):
+        user = A.User(name=f'Bench {u}', email=f'bench{u}@finanzapp.local', password=password_hash)
+        A.db.session.add(user)
+        A.db.session.flush()
+        emails.append(user.email)
+
+        for offset in range(0, transactions, A.IMPORT_BATCH_SIZE):
+            batch = []
+            for _ in range(min(A.IMPORT_BATCH_SIZE, transactions - offset)):
+                is_income = rng.random() < 0.2
+                batch.append({
+                    'user_id': user.id,
+                    'title': f"{rng.choice(TITLES)} {rng.randint(1, 999)}",
+                    'description': rng.choice([None, 'pago con tarjeta', 'compra en línea']),
+                    'amount': round(rng.uniform(1500, 4000) if is_income else rng.uniform(1, 400), 2),
+                    'type': 'income' if is_income else 'expense',
+                    'category': 'Salario' if is_income else rng.choice(CATEGORIES),
+                    'date': start + timedelta(seconds=rng.randint(0, span_seconds))
+                })
+            A.db.session.execute(A.db.insert(A.Transaction), batch)
+
+        for i in range(subscriptions):
+            due = now + timedelta(days=rng.randint(1, 28))
+            A.db.session.add(A.Subscription(name=f'Suscripción {i}', amount=round(rng.uniform(5, 30), 2),
+                                            category='Servicios', billing_period=rng.choice(['mensual', 'anual']),
+                                            start_date=due - timedelta(days=30), next_due_date=due, user_id=user.id))
+        for i in range(goals):
+            A.db.session.add(A.SavingsGoal(name=f'Meta {i}', target_amount=rng.randint(1000, 50000),
+                                           current_amount=rng.randint(0, 900),
+                                           target_date=now + timedelta(days=rng.randint(30, 900)), user_id=user.id))
+        for category in CATEGORIES:
+            A.db.session.add(A.Budget(category=category, amount=rng.randint(200, 2000), user_id=user.id))
+        A.db.session.commit()
+
+    A.rebuild_monthly_summaries()
+    return emails[0]
+
+
+def loop_period_kpis(A, user_id, start_date, end_date):
+    """Referencia: KPIs del periodo como antes de get_period_kpis (cada Transaction como objeto ORM)."""
+    transactions = A.Transaction.query.filter_by(user_id=user_id).filter(
+        A.Transaction.date >= start_date, A.Transaction.date < end_date
+    ).order_by(A.Transaction.date.desc()).all()
+    total_income = sum(t.amount for t in transactions if t.type == 'income')
+    total_expense = sum(t.amount for t in transactions if t.type == 'expense')
+    cat_totals = {}
+    daily_balances = {}
+    for t in transactions:
+        if t.type == 'expense':
+            cat_totals[t.category] = cat_totals.get(t.category, 0) + t.amount
+        sign = 1 if t.type == 'income' else -1
+        daily_balances[t.date.day] = daily_balances.get(t.date.day, 0) + sign * t.amount
+    return {'total_income': total_income, 'total_expense': total_expense, 'cat_totals': cat_totals,
+            'daily_balances': daily_balances, 'tx_count': len(transactions)}
+
+
+def loop_monthly_history(A, user_id, since):
+    """Referencia: historial mensual como antes de get_monthly_history (recorre cada movimiento desde `since`)."""
+    history = {}
+    for t in A.Transaction.query.filter_by(user_id=user_id).filter(A.Transaction.date >= since).all():
+        month = history.setdefault((t.date.year, t.date.month), {'total_income': 0, 'total_expense': 0})
+        month['total_income' if t.type == 'income' else 'total_expense'] += t.amount
+    return [{'year': year, 'month': month, **totals} for (year, month), totals in sorted(history.items(), reverse=True)]
+
+
+def period_query(A, indexed, prefix=''):
+    """Consulta caliente de KPIs del mes (user_id + rango de fechas) con o sin ix_transaction_user_date.
+
+    Devuelve (sentencias previas, consulta). Sin índice: NOT INDEXED en SQLite; en PostgreSQL se
+    desactivan los index/bitmap scans solo dentro de la transacción. `prefix` antepone p. ej. EXPLAIN.
+    """
+    table = '"transaction"'
+    setup = []
+    if not indexed:
+        if A.db.engine.dialect.name == 'sqlite':
+            table = '"transaction" NOT INDEXED'
+        else:
+            setup = ['SET LOCAL enable_indexscan = off', 'SET LOCAL enable_bitmapscan = off']
+    query = A.db.text(
+        f'{prefix}SELECT type, category, SUM(amount_cents), COUNT(id) FROM {table} '
+        'WHERE user_id = :user_id AND date >= :start AND date < :end GROUP BY type, category'
+    ).bindparams(A.db.bindparam('start', type_=A.db.DateTime), A.db.bindparam('end', type_=A.db.DateTime))
+    return [A.db.text(statement) for statement in setup], query
+
+
+def print_query_plans(A, user_id, start, end):
+    """EXPLAIN de la consulta del mes con y sin el índice compuesto (user_id, date)."""
+    explain = 'EXPLAIN QUERY PLAN' if A.db.engine.dialect.name == 'sqlite' else 'EXPLAIN'
+    params = {'user_id': user_id, 'start': start, 'end': end}
+    for label, indexed in (('con índice', True), ('sin índice', False)):
+        setup, query = period_query(A, indexed, prefix=f'{explain} ')
+        with A.db.engine.begin() as conn:
+            for statement in setup:
+                conn.execute(statement)
+            plan = conn.execute(query, params).all()
+        print(f" * Plan {label}:")
+        for row in plan:
+            print(f"     {row[-1]}")
+
+
+def build_scenarios(A, client, rng, search_fanout):
+    """Escenarios medidos: nombre -> función que hace un request y devuelve la respuesta."""
+    now = datetime.utcnow()
+    with A.app.app_context():
+        budget_id = A.Budget.query.first().id
+        user_id = A.User.query.order_by(A.User.id).first().id
+
+    # El historial empieza el día 1: MonthlySummary agrega meses completos
+    month_start, month_end = A.month_range(now.year, now.month)
+    history_since = A.add_months(month_start, -6)
+
+    def run_period_query(indexed):
+        def run():
+            with A.app.app_context(), A.db.engine.begin() as conn:
+                setup, query = period_query(A, indexed)
+                for statement in setup:
+                    conn.execute(statement)
+                conn.execute(query, {'user_id': user_id, 'start': month_start, 'end': month_end}).all()
+        return run
+
+    def in_app_context(fn):
+        # Escenarios de funciones (sin request): se miden dentro de un contexto de aplicación
+        def run():
+            with A.app.app_context():
+                fn()
+        return run
+
+    # Ambas versiones deben dar lo mismo sobre los datos sembrados antes de comparar tiempos
+    with A.app.app_context():
+        same_kpis = A.get_period_kpis(user_id, month_start, month_end) == loop_period_kpis(A, user_id, month_start, month_end)
+        history = [{key: m[key] for key in ('year', 'month', 'total_income', 'total_expense')}
+                   for m in A.get_monthly_history(user_id, history_since)]
+        same_history = history == loop_monthly_history(A, user_id, history_since)
+    if not (same_kpis and same_history):
+        raise click.ClickException('get_period_kpis/get_monthly_history no coinciden con la versión en bucle.')
+
+    def download_report():
+        # Sin caché de disco: se mide el render completo del PDF
+        shutil.rmtree(A.REPORT_CACHE_DIR, ignore_errors=True)
+        return client.get(f'/download_report?year={now.year}&month={now.month}')
+
+    def export(export_format):
+        # Se consume el cuerpo por trozos, como un cliente real: bufferizarlo entero falsearía la memoria pico
+        def run():
+            response = client.get(f'/export_transactions?format={export_format}', buffered=False)
+            for _ in response.response:
+                pass
+            response.close()
+            return response
+        return run
+
+    def dashboard_sections(cold=True):
+        # Las seis secciones JSON en serie (el navegador las pide en paralelo); cold: sin caché
+        def run():
+            if cold:
+                A.dashboard_cache.clear()
+            for section in A.DASHBOARD_SECTIONS:
+                response = client.get(f'/api/dashboard/{section}')
+                if response.status_code >= 400:
+                    return response
+            return response
+        return run
+
+    def search_fanout_run(pooled):
+        # search_fanout búsquedas simultáneas en el executor de Aurelius contra el servidor HTTPS local
+        def search(i):
+            if pooled:
+                tavily = A.get_tavily_client('benchmark')
+            else:
+                from tavily import TavilyClient
+                tavily = TavilyClient(api_key='benchmark', api_base_url=A.TAVILY_BASE_URL)
+            try:
+                return tavily.search(query=f'tasa de interes {i}', search_depth='basic', max_results=3,
+                                     timeout=A.AURELIUS_SEARCH_TIMEOUT)
+            finally:
+                if not pooled:
+                    tavily.close()
+
+        def run():
+            futures = [A.aurelius_executor.submit(search, i) for i in range(search_fanout)]
+            for future in futures:
+                future.result()
+        return run
+
+    return {
+        'dashboard': lambda: client.get('/dashboard'),
+        'dashboard_sections': dashboard_sections(),
+        'dashboard_sections_warm': dashboard_sections(cold=False),
+        # KPIs del mes e historial de 6 meses: agregados en SQL / MonthlySummary frente al bucle previo
+        'kpis_sql': in_app_context(lambda: A.get_period_kpis(user_id, month_start, month_end)),
+        'kpis_loop': in_app_context(lambda: loop_period_kpis(A, user_id, month_start, month_end)),
+        'history_sql': in_app_context(lambda: A.get_monthly_history(user_id, history_since)),
+        'history_loop': in_app_context(lambda: loop_monthly_history(A, user_id, history_since)),
+        # Misma consulta del mes usando ix_transaction_user_date o forzando el recorrido completo
+        'period_query_indexed': run_period_query(True),
+        'period_query_noindex': run_period_query(False),
+        'transactions_page': lambda: client.get('/api/transactions?limit=50'),
+        # Búsqueda de texto completo: prefijo sin acento, varios términos (título + descripción) y sin resultados
+        'search_prefix': lambda: client.get('/api/transactions/search?q=cafe'),
+        'search_terms': lambda: client.get('/api/transactions/search?q=super compra linea'),
+        'search_miss': lambda: client.get('/api/transactions/search?q=xyz'),
+        'export_csv': export('csv'),
+        'export_xlsx': export('xlsx'),
+        'download_report': download_report,
+        'movements': lambda: client.post('/movements', data={
+            'title': 'Benchmark', 'amount': f"{rng.uniform(1, 100):.2f}", 'type': 'expense',
+            'category': rng.choice(CATEGORIES), 'date': now.strftime('%Y-%m-%d')
+        }),
+        # Fan-out de búsquedas de Aurelius: cliente con pool (keep-alive, sin handshake por request) frente a uno nuevo por búsqueda
+        'search_fanout_pooled': search_fanout_run(True),
+        'search_fanout_unpooled': search_fanout_run(False),
+        'ask_aurelius': lambda: client.post('/api/ask_aurelius', json={'message': '¿Cómo voy este mes?', 'history': []}),
+        'add_budget': lambda: client.post('/add_budget', data={'category': rng.choice(CATEGORIES), 'amount': rng.randint(200, 2000)}),
+        'edit_budget': lambda: client.post(f'/edit_budget/{budget_id}', data={'amount': rng.randint(200, 2000)}),
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run_scenario(fn, runs, query_counter):
+    latencies = []
+    queries = []
+    for _ in range(runs):
+        query_counter['count'] = 0
+        started = time.perf_counter()
+        response = fn()
+        if response is not None:
+            response.get_data()
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(query_counter['count'])
+        if response is not None and response.status_code >= 400:
+            raise click.ClickException(f'Respuesta {response.status_code}: {response.get_data(as_text=True)[:200]}')
+
+    # Pasada aparte con tracemalloc (ralentiza el código, no debe contaminar la latencia)
+    tracemalloc.start()
+    response = fn()
+    if response is not None:
+        response.get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'queries': max(queries),
+        'peak_mem_kb': round(peak / 1024, 1)
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Lista de regresiones: p95 por encima de baseline*(1+tolerance) o más consultas que en el baseline."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{name}: consultas {previous['queries']} -> {current['queries']}")
+    return regressions
+
+
+@click.command()
+@click.option('--users', type=int, default=1, help='Usuarios sintéticos (se mide con el primero).')
+@click.option('--transactions', type=int, default=10000, help='Movimientos por usuario (1k a 1M).')
+@click.option('--subscriptions', type=int, default=10, help='Suscripciones por usuario.')
+@click.option('--goals', type=int, default=5, help='Metas de ahorro por usuario.')
+@click.option('--runs', type=int, default=30, help='Repeticiones por escenario.')
+@click.option('--scenario', 'only', multiple=True, help='Medir solo estos escenarios (repetible).')
+@click.option('--llm-latency-ms', type=float, default=0, help='Latencia simulada del LLM falso.')
+@click.option('--search-latency-ms', type=float, default=0, help='Latencia simulada del servidor local de Tavily.')
+@click.option('--search-fanout', type=int, default=8, help='Búsquedas simultáneas por escenario search_fanout_*.')
+@click.option('--database-url', default=None, help='BD a poblar (por defecto un SQLite temporal).')
+@click.option('--seed', type=int, default=42, help='Semilla del generador de datos.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None, help='Resultados previos a comparar.')
+@click.option('--tolerance', type=float, default=0.2, help='Margen de p95 aceptado frente al baseline (0.2 = +20%).')
+@click.option('--save-baseline', type=click.Path(dir_okay=False), default=None, help='Guardar los resultados en este JSON.')
+@click.option('--max-peak-mem-mb', type=float, default=None, help='Techo de memoria pico por request; sale con 1 si se supera.')
+def main(users, transactions, subscriptions, goals, runs, only, llm_latency_ms, search_latency_ms, search_fanout,
+         database_url, seed, baseline, tolerance, save_baseline, max_peak_mem_mb):
+    workdir = tempfile.mkdtemp(prefix='finanzapp-bench-')
+    search_server = None
+    if not only or any(name.startswith('search_fanout') for name in only):
+        # requests confía en el certificado autofirmado vía REQUESTS_CA_BUNDLE (solo en este proceso)
+        search_server, os.environ['TAVILY_BASE_URL'], os.environ['REQUESTS_CA_BUNDLE'] = start_search_stand_in(
+            workdir, search_latency_ms / 1000)
+    # La configuración de app.py se lee al importarlo: el entorno debe quedar listo antes
+    os.environ['DATABASE_URL'] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['REPORT_CACHE_DIR'] = os.path.join(workdir, 'report_cache')
+    os.environ['GROQ_API_KEY'] = 'benchmark'
+    os.environ.pop('TAVILY_API_KEY', None)
+    os.environ.setdefault('SLOW_QUERY_MS', '1000000')
+    os.environ.setdefault('SLOW_REQUEST_MS', '1000000')
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    A = None
+    try:
+        import app as A
+        from sqlalchemy import event
+
+        fake_llm = FakeLLMClient(llm_latency_ms / 1000)
+        A.get_llm_client = lambda api_key: fake_llm
+
+        rng = random.Random(seed)
+        with A.app.app_context():
+            started = time.perf_counter()
+            email = seed_data(A, users, transactions, subscriptions, goals, rng)
+            print(f" * Datos generados en {time.perf_counter() - started:.1f}s "
+                  f"({users} usuario(s) x {transactions} movimientos)")
+            print(f" * Backend de búsqueda: {A.transaction_search_backend or 'LIKE'}")
+
+            query_counter = {'count': 0}
+            event.listen(A.db.engine, 'before_cursor_execute',
+                         lambda *args: query_counter.__setitem__('count', query_counter['count'] + 1))
+
+        client = A.app.test_client()
+        login = client.post('/login', data={'email': email, 'password': BENCH_PASSWORD})
+        if not (login.is_json and login.json.get('success')):
+            raise click.ClickException('No se pudo iniciar sesión con el usuario sintético.')
+
+        scenarios = build_scenarios(A, client, rng, search_fanout)
+        if not only or any(name.startswith('period_query') for name in only):
+            now = datetime.utcnow()
+            with A.app.app_context():
+                print_query_plans(A, A.User.query.order_by(A.User.id).first().id, *A.month_range(now.year, now.month))
+        results = {}
+        print(f"{'escenario':<26}{'p50 ms':>10}{'p95 ms':>10}{'consultas':>11}{'mem pico KB':>13}")
+        for name, fn in scenarios.items():
+            if only and name not in only:
+                continue
+            fn()  # calentamiento (cachés, pool de procesos)
+            results[name] = run_scenario(fn, runs, query_counter)
+            r = results[name]
+            print(f"{name:<26}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['queries']:>11}{r['peak_mem_kb']:>13}")
+
+        if save_baseline:
+            with open(save_baseline, 'w') as f:
+                json.dump({'params': {'users': users, 'transactions': transactions, 'runs': runs}, 'results': results},
+                          f, indent=2)
+            print(f" * Baseline guardado en {save_baseline}")
+
+        if max_peak_mem_mb is not None:
+            over_ceiling = {name: r['peak_mem_kb'] for name, r in results.items() if r['peak_mem_kb'] > max_peak_mem_mb * 1024}
+            if over_ceiling:
+                print(f" * Escenarios por encima del techo de {max_peak_mem_mb} MB:")
+                for name, peak_kb in over_ceiling.items():
+                    print(f"   - {name}: {peak_kb / 1024:.1f} MB")
+                sys.exit(1)
+            print(f" * Memoria pico dentro del techo de {max_peak_mem_mb} MB.")
+
+        if baseline:
+            with open(baseline) as f:
+                regressions = compare_with_baseline(results, json.load(f)['results'], tolerance)
+            if regressions:
+                print(" * Regresiones frente al baseline:")
+                for line in regressions:
+                    print(f"   - {line}")
+                sys.exit(1)
+            print(" * Sin regresiones frente al baseline.")
+    finally:
+        # A queda en None si falló el import de app.py: solo se limpia el directorio temporal
+        if A is not None and A._report_pool is not None:
+            A._report_pool.shutdown()
+        if search_server is not None:
+            search_server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Proyección de flujo de caja diario.
+
+Combina los cargos programados (suscripciones ya expandidas por la app) con el patrón histórico
+de ingresos y gastos por día del mes y categoría, y detecta los días en que el balance baja
+del mínimo o un presupuesto mensual se rebasa. Todo son operaciones de NumPy sobre una matriz
+(categorías x días), así que 12 meses se proyectan en milisegundos.
+
+No depende de Flask ni de la base de datos: recibe montos en unidades (no centavos) y fechas.
+"""
+import numpy as np
+
+def day_range(start, end):
+    """Días [start, end] como datetime64[D]."""
+    return np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+
+def calendar_parts(days):
+    """(día del mes, días del mes, mes 1-12, índice de mes relativo al primer día) de cada fecha."""
+    months = days.astype('datetime64[M]')
+    dom = (days - months).astype(np.int64) + 1
+    dim = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype(np.int64)
+    month_of_year = months.astype(np.int64) % 12 + 1
+    month_index = (months - months[0]).astype(np.int64)
+    return dom, dim, month_of_year, month_index
+
+def day_of_month_profile(series, dates, amounts, n_series, n_months):
+    """Monto promedio por (serie, día del mes 1..31) observado a lo largo de `n_months` meses.
+
+    Devuelve una matriz (n_series, 32); la columna 0 no se usa.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    dom = (dates - dates.astype('datetime64[M]')).astype(np.int64) + 1
+    flat = np.bincount(np.asarray(series, dtype=np.int64) * 32 + dom,
+                       weights=np.asarray(amounts, dtype=float), minlength=n_series * 32)
+    return flat.reshape(n_series, 32) / max(n_months, 1)
+
+def seasonal_factors(dates, amounts, min_months=12):
+    """Factor por mes del año (índices 1..12): gasto del mes / promedio mensual.
+
+    Con menos de `min_months` meses de historia no hay estacionalidad fiable y todos valen 1.
+    """
+    factors = np.ones(13)
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if dates.size == 0:
+        return factors
+    months = dates.astype('datetime64[M]')
+    if (months.max() - months.min()).astype(np.int64) + 1 < min_months:
+        return factors
+
+    totals = np.bincount(months.astype(np.int64) % 12 + 1, weights=np.asarray(amounts, dtype=float), minlength=13)[1:]
+    observed = np.bincount(np.unique(months).astype(np.int64) % 12 + 1, minlength=13)[1:]
+    per_month = np.divide(totals, observed, out=np.zeros(12), where=observed > 0)
+    mean = per_month[observed > 0].mean()
+    if mean > 0:
+        factors[1:] = np.where(observed > 0, per_month / mean, 1.0)
+    return factors
+
+def expand_profile(profile, days):
+    """Proyecta un perfil (n_series, 32) sobre `days`; el último día de cada mes absorbe los días que no existen (29-31)."""
+    dom, dim, _, _ = calendar_parts(days)
+    tail = np.cumsum(profile[:, ::-1], axis=1)[:, ::-1]  # tail[:, k] = suma de las columnas k..31
+    tail = np.concatenate([tail[:, 1:], np.zeros((profile.shape[0], 1))], axis=1)  # k+1..31
+    return profile[:, dom] + np.where(dom == dim, tail[:, dim], 0.0)
+
+def project_cash_flow(days, opening_balance, income_profile, expense_profile, seasonal,
+                      scheduled=(), budget_limits=None, month_to_date_spent=None, min_balance=0.0):
+    """Balance diario proyectado y alertas.
+
+    `income_profile`: (32,), `expense_profile`: (n_categorías, 32), `seasonal`: (13,) aplicado al gasto.
+    `scheduled`: [(índice de día, índice de categoría, monto)] de cargos conocidos (suscripciones).
+    `budget_limits` / `month_to_date_spent`: arreglos (n_categorías,) con NaN donde no hay presupuesto.
+    """
+    n_categories = expense_profile.shape[0]
+    _, _, month_of_year, month_index = calendar_parts(days)
+
+    income = expand_profile(income_profile[None, :], days)[0]
+    expense = expand_profile(expense_profile, days) * seasonal[month_of_year]
+    if len(scheduled):
+        day_idx, cat_idx, amounts = (np.asarray(col) for col in zip(*scheduled))
+        np.add.at(expense, (cat_idx.astype(np.int64), day_idx.astype(np.int64)), amounts.astype(float))
+
+    balance = opening_balance + np.cumsum(income - expense.sum(axis=0))
+
+    below = balance < min_balance
+    alerts = {
+        'balance': {
+            'min_balance': float(min_balance),
+            'first_breach': int(np.argmax(below)) if below.any() else None,
+            'days_below': int(below.sum()),
+            'lowest': int(np.argmin(balance)),
+        },
+        'budgets': []
+    }
+
+    if budget_limits is not None:
+        # Gasto acumulado por categoría que se reinicia cada mes; el mes en curso parte de lo ya gastado
+        month_starts = np.flatnonzero(np.r_[True, month_index[1:] != month_index[:-1]])
+        cumulative = np.cumsum(expense, axis=1)
+        base = np.concatenate([np.zeros((n_categories, 1)), cumulative[:, month_starts[1:] - 1]], axis=1)
+        month_cumulative = cumulative - base[:, month_index]
+        if month_to_date_spent is not None:
+            month_cumulative += np.where(month_index == 0, np.nan_to_num(month_to_date_spent)[:, None], 0.0)
+
+        over = month_cumulative > np.nan_to_num(budget_limits, nan=np.inf)[:, None]
+        day_positions = np.where(over, np.arange(len(days)), len(days))
+        first_over = np.minimum.reduceat(day_positions, month_starts, axis=1)  # (n_categorías, n_meses)
+        month_totals = np.add.reduceat(expense, month_starts, axis=1)
+        if month_to_date_spent is not None:
+            month_totals[:, 0] += np.nan_to_num(month_to_date_spent)
+
+        for cat, month in zip(*np.nonzero(first_over < len(days))):
+            alerts['budgets'].append({
+                'category': int(cat),
+                'month_start': int(month_starts[month]),
+                'breach_day': int(first_over[cat, month]),
+                'projected': float(month_totals[cat, month]),
+                'limit': float(budget_limits[cat])
+            })
+
+    return {'income': income, 'expense': expense.sum(axis=0), 'balance': balance, 'alerts': alerts}
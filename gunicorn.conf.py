@@ -0,0 +1,33 @@
+# Configuración de gunicorn (Procfile: gunicorn -c gunicorn.conf.py app:app)
+import os
+
+# Workers gevent: el streaming de Aurelius y las llamadas HTTP a Groq/Tavily ceden el hub
+# mientras esperan, en vez de ocupar un worker por chat lento.
+#
+# Dimensionamiento (medido con loadtest.py; repetir al cambiar de plan o de instancia):
+# - workers = núcleos disponibles. Las rutas de lectura son CPU (render + SQLAlchemy): un proceso
+#   satura con 1 usuario virtual (~450 req/s en local) y de 10 a 50 usuarios solo sube la latencia
+#   (p95 30 -> 130 ms) con el mismo throughput. Más req/s exige más procesos, no más greenlets.
+# - worker_connections = 100 greenlets por worker. No es para las rutas rápidas sino para las
+#   conexiones largas: chats en streaming (loadtest.py --stream-users) que esperan al LLM sin
+#   conexión a la base de datos (build_aurelius_messages la devuelve al pool antes de la red).
+# - Pool de la base de datos (app.py): DB_POOL_SIZE=5 + DB_MAX_OVERFLOW=10 por worker. Una
+#   conexión solo se retiene mientras se consulta, así que 5 cubren la carga sostenida de un núcleo
+#   y el overflow absorbe ráfagas de consultas lentas (exportaciones, reportes). El total,
+#   workers * 15 + el proceso `worker` de la facturación, debe quedar bajo max_connections de PostgreSQL.
+# - Pool HTTP (HTTP_POOL_MAX_CONNECTIONS=20 por proceso) >= AURELIUS_MAX_WORKERS=8 búsquedas en
+#   paralelo + las llamadas al LLM; benchmark.py --scenario search_fanout_pooled lo mide.
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+
+def post_worker_init(worker):
+    """Hace cooperativo a psycopg2 en cada worker, ya con gevent parcheado.
+
+    psycopg2 es una extensión en C que gevent no parchea: sin un wait callback, cada
+    consulta a PostgreSQL bloquea el hub y con él todas las conexiones del worker.
+    """
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    worker.log.info("psycopg2 parcheado para gevent (psycogreen)")
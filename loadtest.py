@@ -0,0 +1,128 @@
+"""Prueba de carga HTTP contra una instancia en marcha (gunicorn -c gunicorn.conf.py app:app).
+
+Cada usuario virtual abre su propia sesión (login con --email/--password) y repite la mezcla de
+rutas de lectura del dashboard durante --duration segundos. Se mide con varios niveles de
+concurrencia para encontrar el punto donde el throughput deja de crecer y la latencia se dispara.
+Con --stream-users se mantienen además chats de Aurelius en streaming abiertos a la vez (conexiones
+largas que ocupan greenlets, no conexiones a la base de datos).
+
+    gunicorn -c gunicorn.conf.py app:app &
+    python loadtest.py --url http://127.0.0.1:8000 --email demo@finanzapp.mx --password '...' \\
+        --concurrency 10 --concurrency 50 --concurrency 100 --duration 30
+
+Los valores de gunicorn.conf.py y del pool de la base de datos se eligieron con esta prueba.
+"""
+import statistics
+import threading
+import time
+
+import click
+import requests
+
+DEFAULT_PATHS = [
+    '/api/dashboard/kpis',
+    '/api/dashboard/history',
+    '/api/dashboard/budgets',
+    '/api/dashboard/goals',
+    '/api/dashboard/subscriptions',
+    '/api/dashboard/transactions',
+    '/api/transactions?limit=50',
+    '/api/transactions/search?q=cafe',
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def login(url, email, password):
+    session = requests.Session()
+    response = session.post(f'{url}/login', data={'email': email, 'password': password}, timeout=30)
+    if not (response.ok and response.headers.get('Content-Type', '').startswith('application/json')
+            and response.json().get('success')):
+        raise click.ClickException(f'No se pudo iniciar sesión como {email} ({response.status_code}).')
+    return session
+
+
+def virtual_user(session, url, paths, deadline, results, lock):
+    latencies, errors = [], 0
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            response = session.get(f'{url}{path}', timeout=30)
+            response.content
+            if response.status_code >= 400:
+                errors += 1
+        except requests.RequestException:
+            errors += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+
+
+def stream_user(session, url, deadline, stream_latencies):
+    # Chat en streaming: se consume el SSE completo y se vuelve a preguntar hasta el final de la prueba
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            with session.post(f'{url}/api/ask_aurelius/stream', json={'message': '¿Cómo voy este mes?', 'history': []},
+                              stream=True, timeout=60) as response:
+                for _ in response.iter_lines():
+                    pass
+            stream_latencies.append((time.perf_counter() - started) * 1000)
+        except requests.RequestException:
+            pass
+
+
+def run_level(url, email, password, concurrency, stream_users, duration, paths):
+    sessions = [login(url, email, password) for _ in range(concurrency + stream_users)]
+    results = {'latencies': [], 'errors': 0}
+    stream_latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=virtual_user, args=(s, url, paths, deadline, results, lock))
+               for s in sessions[:concurrency]]
+    threads += [threading.Thread(target=stream_user, args=(s, url, deadline, stream_latencies))
+                for s in sessions[concurrency:]]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = results['latencies'] or [0]
+    return {
+        'rps': round(len(results['latencies']) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p95_ms': round(percentile(latencies, 0.95), 1),
+        'p99_ms': round(percentile(latencies, 0.99), 1),
+        'errors': results['errors'],
+        'streams': len(stream_latencies),
+    }
+
+
+@click.command()
+@click.option('--url', default='http://127.0.0.1:8000', help='URL base de la instancia.')
+@click.option('--email', required=True, help='Usuario con datos (p. ej. sembrado por benchmark.py --database-url).')
+@click.option('--password', required=True)
+@click.option('--concurrency', type=int, multiple=True, default=[1, 10, 50, 100], help='Usuarios virtuales (repetible).')
+@click.option('--stream-users', type=int, default=0, help='Chats de Aurelius en streaming abiertos a la vez.')
+@click.option('--duration', type=float, default=20, help='Segundos por nivel de concurrencia.')
+@click.option('--path', 'paths', multiple=True, help='Rutas GET a repetir (por defecto, las secciones del dashboard).')
+def main(url, email, password, concurrency, stream_users, duration, paths):
+    url = url.rstrip('/')
+    paths = list(paths) or DEFAULT_PATHS
+    print(f"{'concurrencia':<14}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}{'streams':>9}")
+    for level in concurrency:
+        r = run_level(url, email, password, level, stream_users, duration, paths)
+        print(f"{level:<14}{r['rps']:>9}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>9}{r['streams']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Motor de ritmo (pacing) y viabilidad de metas de ahorro.
+
+Evalúa muchas metas a la vez con operaciones de NumPy sobre arreglos de montos y fechas.
+No depende de Flask ni de la base de datos: sirve igual para el dashboard de un usuario,
+para un job por lotes de todos los usuarios y para simulaciones "what-if".
+"""
+import numpy as np
+
+# Umbrales de ahorro mensual requerido / superávit mensual disponible
+HARD_RATIO = 0.8
+CHALLENGING_RATIO = 1.2
+# Cociente usado cuando no hay superávit (cualquier meta pendiente resulta retadora)
+NO_SURPLUS_RATIO = 999
+
+# Códigos de viabilidad -> (nombre, color de Bootstrap)
+HEALTHY, VIABLE, HARD, CHALLENGING = 0, 1, 2, 3
+FEASIBILITY_LEVELS = {
+    HEALTHY: ('viable', 'success'),
+    VIABLE: ('viable', 'success'),
+    HARD: ('ajustada', 'warning'),
+    CHALLENGING: ('retadora', 'danger'),
+}
+
+def plan_goals(target_cents, current_cents, target_dates, today):
+    """Progreso y ahorro sugerido (mensual, semanal, diario) de cada meta.
+
+    `target_cents`/`current_cents`: montos en centavos; `target_dates`: fechas límite; `today`: date.
+    Devuelve un dict de arreglos alineados con las metas (montos sugeridos en unidades, sin redondear).
+    """
+    target = np.asarray(target_cents, dtype=np.int64)
+    current = np.asarray(current_cents, dtype=np.int64)
+    dates = np.asarray(target_dates, dtype='datetime64[D]')
+    today = np.datetime64(today, 'D')
+
+    remaining_cents = np.maximum(target - current, 0)
+    days_remaining = (dates - today).astype(np.int64)
+    months_remaining = np.maximum((dates.astype('datetime64[M]') - today.astype('datetime64[M]')).astype(np.int64), 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progress = np.where(target > 0, np.minimum(current / target * 100, 100), 0.0)
+
+        # Solo hay ritmo sugerido para metas vigentes (ni vencidas ni con fecha hoy) con saldo pendiente
+        pending = (days_remaining > 0) & (remaining_cents > 0)
+        remaining = remaining_cents / 100
+        monthly = np.where(pending, remaining / months_remaining, 0.0)
+        daily = np.where(pending, remaining / np.maximum(days_remaining, 1), 0.0)
+
+    return {
+        'remaining_cents': remaining_cents,
+        'days_remaining': days_remaining,
+        'is_due_today': days_remaining == 0,
+        'is_past_due': days_remaining < 0,
+        'progress': progress,
+        'monthly': monthly,
+        'weekly': daily * 7,
+        'daily': daily,
+    }
+
+def rate_feasibility(monthly, monthly_surplus):
+    """Códigos de viabilidad y cociente ahorro requerido / superávit.
+
+    `monthly_surplus` puede ser un escalar, un arreglo por meta o, para simular varios escenarios
+    a la vez, un arreglo (n_metas, n_escenarios) o (1, n_escenarios): se aplica broadcasting.
+    """
+    monthly = np.asarray(monthly, dtype=float)
+    surplus = np.asarray(monthly_surplus, dtype=float)
+    if surplus.ndim == 2 and monthly.ndim == 1:
+        monthly = monthly[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(surplus > 0, monthly / surplus, NO_SURPLUS_RATIO)
+
+    levels = np.select(
+        [monthly <= 0, ratio > CHALLENGING_RATIO, ratio > HARD_RATIO],
+        [HEALTHY, CHALLENGING, HARD],
+        default=VIABLE
+    )
+    return levels, ratio
+
+def feasibility_message(level, monthly, ratio):
+    if level == CHALLENGING:
+        return f"Requiere un esfuerzo extra de ${monthly:,.0f}/mes. Considera extender el plazo."
+    if level == HARD:
+        return f"Requiere disciplina. Usarás el {ratio * 100:.0f}% de tu flujo libre."
+    if level == VIABLE:
+        return "Tu flujo de caja actual soporta esta meta cómodamente."
+    return "Meta saludable"
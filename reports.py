@@ -0,0 +1,191 @@
+"""Render de reportes PDF de FinanzApp.
+
+No depende de Flask ni de la base de datos para poder ejecutarse en un pool de procesos:
+recibe los movimientos ya consultados como diccionarios y escribe el PDF en disco.
+"""
+import calendar
+import os
+from datetime import datetime
+
+MONTH_NAMES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+
+def build_report_html(user_name, year, month, transactions, logo_path):
+    """HTML del estado financiero mensual. `transactions`: dicts con date, title, category, type y amount."""
+    incomes = [t for t in transactions if t['type'] == 'income']
+    expenses = [t for t in transactions if t['type'] == 'expense']
+
+    total_income = sum(t['amount'] for t in incomes)
+    total_expense = sum(t['amount'] for t in expenses)
+    balance = total_income - total_expense
+
+    month_name = MONTH_NAMES[month - 1]
+    
+    # Calcular último día del mes
+    last_day = calendar.monthrange(year, month)[1]
+        
+    period_name = f"Del 01 al {last_day} de {month_name.lower()} {year}"
+    
+    # Colores de marca
+    brand_color = "#1e3a8a" 
+    text_main = "#1e293b"
+    text_muted = "#64748b"
+
+    parts = [f"""
+    <html>
+    <head>
+        <style>
+            @page {{ size: letter; margin: 1.5cm; }}
+            body {{ font-family: 'Helvetica', sans-serif; color: {text_main}; line-height: 1.5; font-size: 12px; }}
+            
+            /* Header */
+            .header {{ margin-bottom: 40px; border-bottom: 2px solid #f1f5f9; padding-bottom: 20px; }}
+            .logo-img {{ width: 50px; height: auto; display: block; }}
+            .user-details {{ text-align: right; font-size: 10px; color: {text_muted}; vertical-align: middle; }}
+            .user-details strong {{ font-weight: bold; color: {text_main}; font-size: 11px; }}
+
+            /* Títulos */
+            .report-title {{ color: {brand_color}; font-size: 22px; font-weight: bold; margin-bottom: 5px; }}
+            .report-subtitle {{ color: {text_muted}; font-size: 14px; margin-bottom: 30px; }}
+            
+            .section-header {{ margin-bottom: 15px; margin-top: 30px; border-bottom: 1px solid #e2e8f0; padding-bottom: 5px; }}
+            .section-title {{ font-size: 14px; font-weight: bold; color: {brand_color}; text-transform: uppercase; letter-spacing: 0.5px; }}
+
+            /* Resumen Tabla */
+            .summary-table {{ width: 100%; border-collapse: collapse; margin-bottom: 20px; }}
+            .summary-row td {{ padding: 10px 0; border-bottom: 1px dashed #e2e8f0; }}
+            .summary-label {{ font-size: 12px; color: {text_main}; }}
+            .summary-value {{ font-size: 12px; font-weight: bold; text-align: right; }}
+            
+            /* Balance Row Fix: Completely Separate Style */
+            .balance-container {{
+                background-color: #f8fafc;
+                border-top: 2px solid {text_main};
+                border-bottom: 2px solid {text_main};
+                padding: 20px 10px;
+                margin-top: 20px;
+            }}
+            
+            .balance-table {{ width: 100%; }}
+            .balance-label {{ font-weight: bold; font-size: 14px; color: {brand_color}; }}
+            .balance-value {{ font-weight: bold; font-size: 14px; color: {brand_color}; text-align: right; }}
+
+            /* Detalle Movimientos */
+            .movements-table {{ width: 100%; border-collapse: collapse; margin-top: 10px; }}
+            .movements-header th {{ 
+                text-align: left; 
+                font-size: 9px; 
+                color: {text_muted}; 
+                padding: 8px 5px; 
+                border-bottom: 1px solid #cbd5e1; 
+                background-color: #f1f5f9;
+                text-transform: uppercase; 
+            }}
+            .movements-row td {{ padding: 10px 5px; border-bottom: 1px solid #f1f5f9; font-size: 11px; }}
+            .badge-cat {{ background-color: #f1f5f9; padding: 2px 6px; border-radius: 4px; font-size: 9px; color: {text_muted}; }}
+            .footer {{ position: fixed; bottom: 0; width: 100%; text-align: center; font-size: 8px; color: #cbd5e1; border-top: 1px solid #f1f5f9; padding-top: 10px; }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <table style="width: 100%;">
+                <tr>
+                    <td style="vertical-align: middle;"><img src="{logo_path}" class="logo-img" /></td>
+                    <td class="user-details">
+                        Reporte generado para:<br/>
+                        <strong>{user_name}</strong><br/>
+                        <span style="font-size: 9px;">{period_name}</span>
+                    </td>
+                </tr>
+            </table>
+        </div>
+
+        <div class="report-title">Estado financiero mensual</div>
+        <div class="report-subtitle">Resumen de tu actividad en {month_name.lower()}</div>
+
+        <div class="section-header">
+            <span class="section-title">Resumen general</span>
+        </div>
+
+        <table class="summary-table">
+            <tr class="summary-row">
+                <td class="summary-label">Ingresos totales</td>
+                <td class="summary-value" style="color: #10b981;">+${"{:,.2f}".format(total_income)}</td>
+            </tr>
+            <tr class="summary-row">
+                <td class="summary-label">Gastos totales</td>
+                <td class="summary-value" style="color: #ef4444;">-${"{:,.2f}".format(total_expense)}</td>
+            </tr>
+            <tr class="summary-row">
+                <td class="summary-label">Resultado neto</td>
+                <td class="summary-value" style="color: {text_muted};">${"{:,.2f}".format(max(total_income - total_expense, 0))}</td>
+            </tr>
+        </table>
+        
+        <!-- Bloque independiente para el balance para evitar overlap -->
+        <div class="balance-container">
+            <table class="balance-table">
+                <tr>
+                    <td class="balance-label">Balance global</td>
+                    <td class="balance-value">${"{:,.2f}".format(balance)}</td>
+                </tr>
+            </table>
+        </div>
+
+        <div class="section-header">
+            <span class="section-title">Detalle de operaciones</span>
+        </div>
+        
+        <table class="movements-table">
+            <tr class="movements-header">
+                <th style="width: 15%;">Fecha</th>
+                <th style="width: 45%;">Concepto</th>
+                <th style="width: 25%;">Categoría</th>
+                <th style="width: 15%; text-align: right;">Monto</th>
+            </tr>
+    """]
+    
+    for t in transactions:
+        amount_style = ""
+        sign = "-"
+        if t['type'] == 'income':
+            sign = "+"
+            amount_style = "color: #10b981;"
+        else:
+            amount_style = "color: #ef4444;"
+        
+        parts.append(f"""
+        <tr class="movements-row">
+            <td style="color: #64748b;">{t['date'].strftime('%d/%m')}</td>
+            <td><strong>{t['title']}</strong></td>
+            <td><span class="badge-cat">{t['category']}</span></td>
+            <td style="text-align: right; {amount_style}">{sign}${"{:,.2f}".format(t['amount'])}</td>
+        </tr>
+        """)
+        
+    parts.append(f"""
+        </table>
+        
+        <div class="footer">
+            FinanzApp &bull; Tu asistente financiero personal &bull; {datetime.now().year}
+        </div>
+    </body>
+    </html>
+    """)
+
+    return ''.join(parts)
+
+def render_report_pdf(user_name, year, month, transactions, logo_path, output_path):
+    """Genera el PDF en `output_path` (escritura atómica: archivo temporal + rename)."""
+    from xhtml2pdf import pisa
+
+    html = build_report_html(user_name, year, month, transactions, logo_path)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pisa_status = pisa.CreatePDF(html, dest=f)
+
+    if pisa_status.err:
+        os.remove(tmp_path)
+        raise RuntimeError("Error al generar PDF")
+
+    os.replace(tmp_path, output_path)
+    return output_path
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+import itertools
+
+import pytest
+
+# La app lee DATABASE_URL al importarse: se apunta a una SQLite temporal antes del import
+_db_dir = tempfile.mkdtemp(prefix='finanzapp-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_db_dir, 'test.db')
+os.environ.pop('TAVILY_API_KEY', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as finanzapp  # noqa: E402
+
+_user_ids = itertools.count(1)
+
+
+@pytest.fixture
+def app_module():
+    return finanzapp
+
+
+@pytest.fixture
+def user(app_module):
+    """Usuario nuevo por test (correo único) para no compartir datos entre tests."""
+    from werkzeug.security import generate_password_hash
+    email = f'user{next(_user_ids)}@test.local'
+    with app_module.app.app_context():
+        u = app_module.User(name='Tester', email=email,
+                            password=generate_password_hash('pw', method='pbkdf2:sha256'))
+        app_module.db.session.add(u)
+        app_module.db.session.commit()
+        return {'id': u.id, 'email': email, 'password': 'pw'}
+
+
+@pytest.fixture
+def client(app_module, user):
+    """Cliente de pruebas con sesión iniciada."""
+    c = app_module.app.test_client()
+    r = c.post('/login', data={'email': user['email'], 'password': user['password']})
+    assert r.json['success'], r.json
+    return c
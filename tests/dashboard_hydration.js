@@ -0,0 +1,147 @@
+// Ejecuta window.loadDashboardSection (copiado de la página renderizada) sobre un DOM mínimo.
+// Lo invoca tests/test_dashboard_hydration.py con un JSON por stdin:
+//   {script, page, fragments: {html: árbol}, responses: {sección: {status, payload}}}
+// Los árboles llegan ya parseados desde Python: ["tag", {atributos}, [hijos]] o texto.
+// Imprime el estado final de cada [data-slot] de la página.
+'use strict';
+
+class Text {
+    constructor(text) { this.text = text; }
+    get textContent() { return this.text; }
+    cloneNode() { const copy = new Text(this.text); copy.origin = this.origin; return copy; }
+}
+
+class Fragment {
+    constructor(children = []) { this.children = children; }
+    get textContent() { return this.children.map(c => c.textContent).join(''); }
+    querySelectorAll(selector) { return querySelectorAll(this, selector); }
+    cloneNode() { return new Fragment(this.children.map(c => c.cloneNode(true))); }
+}
+
+class Element extends Fragment {
+    constructor(tag, attrs = {}, children = []) {
+        super(children);
+        this.tag = tag;
+        this.attrs = attrs;
+        if (tag === 'template') {
+            // Como en el navegador: los hijos de <template> viven en .content, no en el árbol
+            this.content = new Fragment(children);
+            this.children = [];
+        }
+    }
+    get dataset() {
+        const dataset = {};
+        for (const [name, value] of Object.entries(this.attrs)) {
+            if (name.startsWith('data-')) dataset[name.slice(5).replace(/-(\w)/g, (_, c) => c.toUpperCase())] = value;
+        }
+        return dataset;
+    }
+    get classList() { return (this.attrs.class || '').split(/\s+/).filter(Boolean); }
+    set textContent(value) { this.children = [new Text(String(value))]; }
+    get textContent() { return super.textContent; }
+    set innerHTML(html) {
+        if (!(html in FRAGMENTS)) throw new Error('HTML sin parsear en el test: ' + html.slice(0, 80));
+        const children = FRAGMENTS[html].map(build);
+        if (this.tag === 'template') this.content = new Fragment(children);
+        else this.children = children;
+    }
+    replaceChildren(...nodes) {
+        this.children = nodes.flatMap(node => node instanceof Element || node instanceof Text ? [node] : node.children);
+    }
+    cloneNode(deep) {
+        const copy = new Element(this.tag, { ...this.attrs }, deep ? this.children.map(c => c.cloneNode(true)) : []);
+        if (this.content) copy.content = this.content.cloneNode(true);
+        copy.origin = this.origin;
+        return copy;
+    }
+}
+
+// Selectores usados por la hidratación: compuestos de tag, .clase y [atributo="valor"], separados por descendencia
+function parseCompound(text) {
+    const compound = { tag: null, classes: [], attrs: [] };
+    const re = /^([a-z][\w-]*)|\.([\w-]+)|\[([\w-]+)(?:="([^"]*)")?\]/g;
+    let match, consumed = 0;
+    while ((match = re.exec(text)) !== null && match.index === consumed) {
+        consumed += match[0].length;
+        if (match[1]) compound.tag = match[1];
+        else if (match[2]) compound.classes.push(match[2]);
+        else compound.attrs.push([match[3], match[4]]);
+    }
+    if (consumed !== text.length) throw new Error('Selector no soportado: ' + text);
+    return compound;
+}
+
+function matches(el, compound) {
+    if (!(el instanceof Element)) return false;
+    if (compound.tag && el.tag !== compound.tag) return false;
+    if (!compound.classes.every(c => el.classList.includes(c))) return false;
+    return compound.attrs.every(([name, value]) => name in el.attrs && (value === undefined || el.attrs[name] === value));
+}
+
+function descendants(root) {
+    const found = [];
+    const walk = node => (node.children || []).forEach(child => { found.push(child); walk(child); });
+    walk(root);
+    return found;
+}
+
+function querySelectorAll(root, selector) {
+    const parts = selector.trim().split(/\s+/).map(parseCompound);
+    let scope = [root];
+    parts.forEach(compound => {
+        const next = new Set();
+        scope.forEach(node => descendants(node).filter(el => matches(el, compound)).forEach(el => next.add(el)));
+        scope = [...next];
+    });
+    return scope;
+}
+
+function build(tree) {
+    if (typeof tree === 'string') return new Text(tree);
+    const [tag, attrs, children] = tree;
+    const el = new Element(tag, attrs, children.map(build));
+    if (el.content && attrs['data-slot']) {
+        // Marca de origen: permite comprobar que cada hueco quedó con el contenido de su propio <template>
+        descendants(el.content).forEach(node => { node.origin = attrs['data-slot']; });
+    }
+    return el;
+}
+
+let FRAGMENTS = {};
+
+function run(input) {
+    FRAGMENTS = input.fragments;
+    const root = new Fragment(input.page.map(build));
+    const errors = [];
+    const context = {
+        document: { querySelectorAll: s => root.querySelectorAll(s), createElement: tag => new Element(tag) },
+        fetch: url => {
+            const response = input.responses[url.split('/').pop()];
+            return Promise.resolve({ ok: response.status < 400, status: response.status, json: () => Promise.resolve(response.payload) });
+        },
+        console: { error: (...args) => errors.push(args.map(String).join(' ')) },
+        sectionHandlers: {},
+    };
+    context.window = context;
+    const load = new Function(...Object.keys(context), `${input.script}; return window.loadDashboardSection;`)(...Object.values(context));
+
+    return Promise.all(Object.keys(input.responses).map(section => load(section))).then(() => ({
+        errors,
+        slots: root.querySelectorAll('[data-slot]').filter(el => el.tag !== 'template').map(el => ({
+            slot: el.attrs['data-slot'],
+            section: el.attrs['data-section'],
+            loading: el.querySelectorAll('.section-loading').length,
+            origins: [...new Set(descendants(el).map(node => node.origin || null))],
+            text: el.textContent.replace(/\s+/g, ' ').trim(),
+        })),
+    }));
+}
+
+let raw = '';
+process.stdin.on('data', chunk => { raw += chunk; });
+process.stdin.on('end', () => {
+    run(JSON.parse(raw)).then(result => process.stdout.write(JSON.stringify(result)), error => {
+        console.error(error);
+        process.exit(1);
+    });
+});
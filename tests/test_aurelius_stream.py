@@ -0,0 +1,70 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+TOKENS = ['Hola', ', ', 'soy Aurelius']
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Servidor compatible con OpenAI: responde /chat/completions en streaming (SSE)."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(body)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for token in TOKENS:
+            chunk = {'id': 'fake', 'object': 'chat.completion.chunk', 'created': 0, 'model': body['model'],
+                     'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+            self._chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def fake_llm(app_module, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenAIHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv('GROQ_API_KEY', 'fake-key')
+    monkeypatch.setattr(app_module, 'GROQ_BASE_URL', f'http://127.0.0.1:{server.server_port}/v1')
+    app_module._client_registry.clear()
+    yield server
+    server.shutdown()
+    app_module._client_registry.clear()
+
+
+def parse_events(body):
+    events = [line[len('data: '):] for line in body.split('\n\n') if line.startswith('data: ')]
+    assert events[-1] == '[DONE]'
+    return [json.loads(e) for e in events[:-1]]
+
+
+def test_stream_relays_tokens_from_fake_server(client, fake_llm):
+    r = client.post('/api/ask_aurelius/stream', json={'message': '¿cómo voy este mes?', 'history': []})
+    assert r.status_code == 200
+    assert r.mimetype == 'text/event-stream'
+    events = parse_events(r.get_data(as_text=True))
+    assert [e['token'] for e in events] == TOKENS
+    assert len(fake_llm.requests) == 1
+    assert fake_llm.requests[0]['stream'] is True
+
+
+def test_stream_without_api_key_still_finishes(client, monkeypatch):
+    monkeypatch.delenv('GROQ_API_KEY', raising=False)
+    r = client.post('/api/ask_aurelius/stream', json={'message': 'hola', 'history': []})
+    events = parse_events(r.get_data(as_text=True))
+    assert len(events) == 1 and 'Tester' in events[0]['token']
@@ -0,0 +1,114 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.fixture
+def subscription(app_module, user):
+    def create(name, amount, next_due_date, billing_period='mensual', category='Servicios'):
+        with app_module.app.app_context():
+            sub = app_module.Subscription(name=name, amount=Decimal(amount), category=category, billing_period=billing_period,
+                                          start_date=next_due_date, next_due_date=next_due_date, user_id=user['id'])
+            app_module.db.session.add(sub)
+            app_module.db.session.commit()
+            return sub.id
+    return create
+
+
+def charges_of(A, sub_id):
+    return A.SubscriptionCharge.query.filter_by(subscription_id=sub_id).order_by(A.SubscriptionCharge.due_date).all()
+
+
+def test_catches_up_every_missed_period(app_module, user, subscription):
+    A = app_module
+    monthly = subscription('Internet', '499.90', datetime(2025, 1, 15))
+    yearly = subscription('Dominio', '250', datetime(2023, 6, 1), billing_period='anual')
+
+    with A.app.app_context():
+        A.bill_due_subscriptions(now=datetime(2025, 4, 20))
+
+        assert [c.due_date for c in charges_of(A, monthly)] == [datetime(2025, m, 15) for m in (1, 2, 3, 4)]
+        assert [c.due_date for c in charges_of(A, yearly)] == [datetime(2023, 6, 1), datetime(2024, 6, 1)]
+        assert A.db.session.get(A.Subscription, monthly).next_due_date == datetime(2025, 5, 15)
+        assert A.db.session.get(A.Subscription, yearly).next_due_date == datetime(2025, 6, 1)
+
+        # Cada cargo enlaza su propio movimiento, con la fecha del periodo
+        for charge in charges_of(A, monthly):
+            tx = A.db.session.get(A.Transaction, charge.transaction_id)
+            assert (tx.date, tx.amount, tx.title) == (charge.due_date, Decimal('499.90'), f"{A.RECURRING_TITLE_PREFIX}Internet")
+
+        # El resumen mensual recibe cada periodo en su mes
+        march = A.MonthlySummary.query.filter_by(user_id=user['id'], year=2025, month=3).one()
+        assert march.total_expense == Decimal('499.90')
+        assert march.category_totals == {'Servicios': 49990}
+
+
+def test_running_twice_posts_no_second_charge(app_module, user, subscription):
+    A = app_module
+    sub_id = subscription('Gimnasio', '350', datetime(2025, 2, 28))
+    now = datetime(2025, 5, 1)
+
+    with A.app.app_context():
+        A.bill_due_subscriptions(now=now)
+        first = [(c.due_date, c.transaction_id) for c in charges_of(A, sub_id)]
+        assert len(first) == 3
+
+        assert A.bill_due_subscriptions(now=now) == 0
+        assert [(c.due_date, c.transaction_id) for c in charges_of(A, sub_id)] == first
+        assert A.Transaction.query.filter_by(user_id=user['id']).count() == 3
+
+
+def test_already_recorded_period_is_skipped(app_module, user, subscription):
+    A = app_module
+    sub_id = subscription('Streaming', '199', datetime(2025, 3, 10))
+
+    with A.app.app_context():
+        A.bill_due_subscriptions(now=datetime(2025, 3, 31))
+        # Otro worker dejó next_due_date sin avanzar tras registrar el cargo: no se vuelve a cobrar
+        A.db.session.get(A.Subscription, sub_id).next_due_date = datetime(2025, 3, 10)
+        A.db.session.commit()
+        A.bill_due_subscriptions(now=datetime(2025, 4, 30))
+
+        assert [c.due_date for c in charges_of(A, sub_id)] == [datetime(2025, 3, 10), datetime(2025, 4, 10)]
+        assert A.Transaction.query.filter_by(user_id=user['id']).count() == 2
+        assert A.db.session.get(A.Subscription, sub_id).next_due_date == datetime(2025, 5, 10)
+
+
+def test_cli_one_shot(app_module, user, subscription):
+    A = app_module
+    sub_id = subscription('Nube', '50', datetime(2020, 1, 1), billing_period='anual')
+    result = A.app.test_cli_runner().invoke(args=['bill-subscriptions'])
+    assert result.exit_code == 0, result.output
+    assert 'cargos posteados' in result.output
+    with A.app.app_context():
+        assert len(charges_of(A, sub_id)) >= 6
+
+
+def test_cli_worker_survives_a_failed_run(app_module, monkeypatch):
+    A = app_module
+    runs = []
+
+    def flaky_billing(batch_size):
+        runs.append(batch_size)
+        if len(runs) == 1:
+            raise RuntimeError('BD reiniciándose')
+        return 0
+
+    class StopWorker(Exception):
+        pass
+
+    sleeps = []
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise StopWorker
+
+    monkeypatch.setattr(A, 'bill_due_subscriptions', flaky_billing)
+    monkeypatch.setattr(A.time, 'sleep', fake_sleep)
+    result = A.app.test_cli_runner().invoke(args=['bill-subscriptions', '--interval', '30', '--batch-size', '7'])
+
+    assert isinstance(result.exception, StopWorker)
+    assert runs == [7, 7] and sleeps == [30, 30]
+    assert 'Error en facturación de suscripciones: BD reiniciándose' in result.output
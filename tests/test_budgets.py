@@ -0,0 +1,78 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+
+def add_movement(client, title, amount, category, date, type='expense'):
+    r = client.post('/movements', data={'title': title, 'amount': amount, 'type': type,
+                                        'category': category, 'date': date.strftime('%Y-%m-%d')})
+    assert r.status_code < 400
+
+
+def budgets_by_category(response):
+    return {b['category']: b for b in response.json['budgets']}
+
+
+@pytest.fixture
+def budgeted_client(app_module, client, user):
+    with app_module.app.app_context():
+        app_module.db.session.add_all([
+            app_module.Budget(category='Comida', amount=Decimal('1000'), user_id=user['id']),
+            app_module.Budget(category='Transporte', amount=Decimal('500'), user_id=user['id']),
+        ])
+        app_module.db.session.commit()
+    return client
+
+
+def test_status_for_a_given_month(budgeted_client):
+    add_movement(budgeted_client, 'Súper', 850.25, 'Comida', datetime(2025, 3, 31))
+    add_movement(budgeted_client, 'Abril', '99', 'Comida', datetime(2025, 4, 1))
+    add_movement(budgeted_client, 'Nómina', '5000', 'Comida', datetime(2025, 3, 15), type='income')
+
+    r = budgeted_client.get('/api/budgets/status?year=2025&month=3')
+    assert r.status_code == 200
+    assert r.json['success'] is True and r.json['month'] == '2025-03'
+    budgets = budgets_by_category(r)
+    # Solo los gastos de marzo: ni el ingreso ni el gasto del 1 de abril cuentan
+    assert budgets['Comida']['spent'] == 850.25
+    assert budgets['Comida']['remaining'] == 149.75
+    assert budgets['Comida']['percentage'] == 85.0
+    assert budgets['Comida']['status_color'] == 'warning'
+    assert budgets['Transporte']['spent'] == 0
+    assert budgets['Transporte']['status_color'] == 'success'
+
+
+@pytest.mark.parametrize('query', ['month=13', 'month=0', 'month=-2&year=2025', 'month=marzo', 'year=dos&month=3'])
+def test_invalid_month_returns_400(budgeted_client, query):
+    r = budgeted_client.get(f'/api/budgets/status?{query}')
+    assert r.status_code == 400
+    assert r.json == {'success': False, 'message': 'Parámetros inválidos.'}
+
+
+def test_spent_and_remaining_follow_transaction_edits(app_module, budgeted_client, user):
+    add_movement(budgeted_client, 'Súper', '400', 'Comida', datetime(2025, 6, 10))
+    with app_module.app.app_context():
+        tx_id = app_module.Transaction.query.filter_by(user_id=user['id'], title='Súper').one().id
+
+    # Más monto: se pasa del presupuesto
+    budgeted_client.post(f'/edit_transaction/{tx_id}', data={
+        'title': 'Súper', 'amount': '1200', 'type': 'expense', 'category': 'Comida', 'date': '2025-06-10'})
+    budgets = budgets_by_category(budgeted_client.get('/api/budgets/status?year=2025&month=6'))
+    assert (budgets['Comida']['spent'], budgets['Comida']['remaining']) == (1200.0, 0)
+    assert budgets['Comida']['status_color'] == 'danger'
+
+    # Cambio de categoría: el gasto pasa de Comida a Transporte
+    budgeted_client.post(f'/edit_transaction/{tx_id}', data={
+        'title': 'Súper', 'amount': 125.5, 'type': 'expense', 'category': 'Transporte', 'date': '2025-06-10'})
+    budgets = budgets_by_category(budgeted_client.get('/api/budgets/status?year=2025&month=6'))
+    assert (budgets['Comida']['spent'], budgets['Comida']['remaining']) == (0.0, 1000.0)
+    assert (budgets['Transporte']['spent'], budgets['Transporte']['remaining']) == (125.5, 374.5)
+
+    # Cambio de mes: junio queda sin gasto y julio lo recibe
+    budgeted_client.post(f'/edit_transaction/{tx_id}', data={
+        'title': 'Súper', 'amount': 125.5, 'type': 'expense', 'category': 'Transporte', 'date': '2025-07-01'})
+    june = budgets_by_category(budgeted_client.get('/api/budgets/status?year=2025&month=6'))
+    july = budgets_by_category(budgeted_client.get('/api/budgets/status?year=2025&month=7'))
+    assert june['Transporte']['spent'] == 0.0
+    assert july['Transporte']['spent'] == 125.5
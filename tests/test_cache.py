@@ -0,0 +1,169 @@
+import fnmatch
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_lru_eviction_at_maxsize(app_module, clock):
+    cache = app_module.TTLCache(maxsize=3, ttl=60, clock=clock)
+    for key in 'abc':
+        cache.set(key, key.upper())
+    assert cache.get('a') == 'A'  # 'a' pasa a ser la más reciente
+    cache.set('d', 'D')           # desaloja 'b', la menos usada
+
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in 'acd'] == ['A', 'C', 'D']
+    assert cache.stats()['size'] == 3
+
+
+def test_overwrite_refreshes_recency_without_growing(app_module, clock):
+    cache = app_module.TTLCache(maxsize=2, ttl=60, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('a', 3)
+    cache.set('c', 4)
+    assert cache.get('a') == 3
+    assert cache.get('b') is None
+    assert cache.stats()['size'] == 2
+
+
+def test_entries_expire_after_ttl(app_module, clock):
+    cache = app_module.TTLCache(maxsize=10, ttl=30, clock=clock)
+    cache.set('default', 1)
+    cache.set('short', 2, ttl=5)
+
+    clock.advance(5)
+    assert cache.get('short') == 2  # vence al pasar el TTL, no al alcanzarlo
+    clock.advance(0.001)
+    assert cache.get('short') is None
+    assert cache.get('default') == 1
+
+    clock.advance(25)
+    assert cache.get('default') is None
+    # La entrada vencida se descarta al leerla
+    assert cache.stats()['size'] == 0
+
+
+def test_set_after_expiry_starts_a_new_ttl(app_module, clock):
+    cache = app_module.TTLCache(maxsize=10, ttl=10, clock=clock)
+    cache.set('k', 'old')
+    clock.advance(11)
+    cache.set('k', 'new')
+    clock.advance(9)
+    assert cache.get('k') == 'new'
+
+
+def test_hit_and_miss_counters(app_module, clock):
+    cache = app_module.TTLCache(maxsize=1, ttl=10, clock=clock)
+    assert cache.get('x') is None          # miss: nunca guardada
+    cache.set('x', 0)
+    assert cache.get('x') == 0             # hit (un valor falsy sigue siendo acierto)
+    cache.set('y', 1)
+    assert cache.get('x') is None          # miss: desalojada
+    clock.advance(11)
+    assert cache.get('y') is None          # miss: vencida
+    cache.delete('y')
+    cache.set('z', 2)
+    assert cache.get('z') == 2             # hit
+    assert cache.stats() == {'backend': 'memory', 'size': 1, 'hits': 2, 'misses': 3}
+
+    cache.clear()
+    assert cache.stats()['size'] == 0
+
+
+class FakeRedis:
+    """Subconjunto de redis.Redis usado por RedisCache, con TTL sobre un reloj falso."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    def get(self, key):
+        item = self.data.get(key)
+        if item is None or item[0] <= self.clock():
+            return None
+        return item[1]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = (self.clock() + ttl, value.encode())
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, pattern):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, pattern)]
+
+
+def test_redis_cache_round_trip_and_counters(app_module, clock):
+    client = FakeRedis(clock)
+    cache = app_module.RedisCache(client, 'tests', ttl=30)
+    other = app_module.RedisCache(client, 'otra', ttl=30)
+    assert cache.get('k') is None
+    cache.set('k', {'total': 5})
+    other.set('k', 'ajena')
+    assert cache.get('k') == {'total': 5}
+    clock.advance(31)
+    assert cache.get('k') is None
+    assert cache.stats() == {'backend': 'redis', 'hits': 1, 'misses': 2}
+
+    other.set('j', 1)
+    cache.set('j', 2)
+    cache.clear()  # solo borra su espacio de nombres
+    assert cache.get('j') is None and other.get('j') == 1
+
+
+def test_redis_errors_degrade_to_misses(app_module):
+    class BrokenRedis:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise ConnectionError('redis caído')
+            return fail
+
+    cache = app_module.RedisCache(BrokenRedis(), 'tests')
+    cache.set('k', 1)
+    assert cache.get('k') is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_make_cache_backends(app_module, monkeypatch):
+    monkeypatch.delenv('CACHE_REDIS_URL', raising=False)
+    cache = app_module.make_cache('tests', maxsize=7, ttl=9)
+    assert isinstance(cache, app_module.TTLCache)
+    assert (cache.maxsize, cache.ttl) == (7, 9)
+
+    fake = object()
+    monkeypatch.setenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    monkeypatch.setattr(app_module, '_redis_client', fake)
+    cache = app_module.make_cache('tests', ttl=9)
+    assert isinstance(cache, app_module.RedisCache)
+    assert (cache.client, cache.namespace, cache.ttl) == (fake, 'tests', 9)
+
+
+def test_make_cache_falls_back_to_memory_without_redis(app_module, monkeypatch):
+    import builtins
+    real_import = builtins.__import__
+
+    def no_redis(name, *args, **kwargs):
+        if name == 'redis':
+            raise ImportError('No module named redis')
+        return real_import(name, *args, **kwargs)
+
+    monkeypatch.setenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    monkeypatch.setattr(app_module, '_redis_client', None)
+    monkeypatch.setattr(builtins, '__import__', no_redis)
+    assert isinstance(app_module.make_cache('tests'), app_module.TTLCache)
@@ -0,0 +1,49 @@
+def test_page_shell_is_not_stored_but_keeps_etag(app_module, client):
+    app_module.dashboard_cache.clear()
+    r = client.get('/dashboard')
+    assert r.status_code == 200 and r.headers['ETag']
+    assert app_module.dashboard_cache.get(r.headers['ETag'].strip('"')) is None
+
+    again = client.get('/dashboard', headers={'If-None-Match': r.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_sections_are_cached_until_data_changes(app_module, client):
+    app_module.dashboard_cache.clear()
+    first = client.get('/api/dashboard/budgets')
+    etag = first.headers['ETag']
+    assert app_module.dashboard_cache.get(etag.strip('"')) is not None
+    assert client.get('/api/dashboard/budgets', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/add_budget', data={'category': 'Comida', 'amount': '300'})
+    changed = client.get('/api/dashboard/budgets', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert [b['category'] for b in changed.json['data']['budgets']] == ['Comida']
+
+
+def test_every_page_slot_is_filled_by_its_section(app_module, client):
+    import re
+
+    page = client.get('/dashboard').get_data(as_text=True)
+    page_slots = {}
+    for slot, section in re.findall(r'<div data-slot="([\w-]+)" data-section="(\w+)"', page):
+        page_slots.setdefault(section, set()).add(slot)
+
+    # El JS de hidratación pide exactamente las secciones registradas
+    requested = re.search(r"\[([^\]]+)\]\.forEach\(section =>", page).group(1)
+    assert re.findall(r"'(\w+)'", requested) == list(app_module.DASHBOARD_SECTIONS)
+    assert set(page_slots) == set(app_module.DASHBOARD_SECTIONS)
+
+    for section in app_module.DASHBOARD_SECTIONS:
+        payload = client.get(f'/api/dashboard/{section}').json
+        fragment_slots = set(re.findall(r'<template data-slot="([\w-]+)"', payload['html']))
+        assert fragment_slots == page_slots[section], section
+
+
+def test_section_data_has_the_fields_the_page_reads(client):
+    kpis = client.get('/api/dashboard/kpis').json['data']
+    assert {'balance', 'total_income', 'total_expense', 'top_category', 'top_cat_percentage', 'savings_rate'} <= set(kpis)
+    assert 'chart_data' in client.get('/api/dashboard/history').json['data']
+    assert 'subscriptions' in client.get('/api/dashboard/subscriptions').json['data']
+    assert 'savings_goals' in client.get('/api/dashboard/goals').json['data']
@@ -0,0 +1,124 @@
+"""Hidratación del dashboard en JS: cada sección llena sus huecos y una sección caída muestra el aviso.
+
+Corre el loadDashboardSection real de la página con node sobre un DOM mínimo (tests/dashboard_hydration.js).
+El HTML se parsea aquí con html.parser y viaja como árbol; fetch devuelve las respuestas reales de
+/api/dashboard/<sección> obtenidas con el test client.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+from datetime import datetime, timedelta
+from decimal import Decimal
+from html.parser import HTMLParser
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason='requiere node')
+
+HARNESS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard_hydration.js')
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+FALLBACK = 'No se pudo cargar esta sección'
+
+
+class TreeBuilder(HTMLParser):
+    """HTML -> ["tag", {atributos}, [hijos]] / texto, cerrando como el navegador las etiquetas sin cierre."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = []
+        self.stack = [('#root', self.root)]
+
+    def handle_starttag(self, tag, attrs):
+        children = []
+        self.stack[-1][1].append([tag, {name: value or '' for name, value in attrs}, children])
+        if tag not in VOID_TAGS:
+            self.stack.append((tag, children))
+
+    def handle_startendtag(self, tag, attrs):
+        self.stack[-1][1].append([tag, {name: value or '' for name, value in attrs}, []])
+
+    def handle_endtag(self, tag):
+        if any(open_tag == tag for open_tag, _ in self.stack[1:]):
+            while self.stack.pop()[0] != tag:
+                pass
+
+    def handle_data(self, data):
+        if data.strip():
+            self.stack[-1][1].append(data)
+
+
+def parse(html):
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def hydrate(app_module, client, failing=None):
+    page = client.get('/dashboard').get_data(as_text=True)
+    script = re.search(r'(window\.loadDashboardSection = function.*?\n\s*};)', page, re.S).group(1)
+    responses, fragments = {}, {}
+    for section in app_module.DASHBOARD_SECTIONS:
+        if section == failing:
+            responses[section] = {'status': 500, 'payload': None}
+            continue
+        payload = client.get(f'/api/dashboard/{section}').json
+        responses[section] = {'status': 200, 'payload': payload}
+        fragments[payload['html']] = parse(payload['html'])
+
+    body = page[page.index('<body'):]
+    result = subprocess.run(['node', HARNESS], input=json.dumps({
+        'script': script, 'page': parse(body), 'fragments': fragments, 'responses': responses
+    }), capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+@pytest.fixture
+def populated_client(app_module, client, user):
+    # Datos en todas las secciones, para que ningún hueco quede vacío por falta de datos
+    now = datetime.utcnow()
+    with app_module.app.app_context():
+        uid = user['id']
+        app_module.db.session.add_all([
+            app_module.Transaction(title='Nómina', amount=Decimal('20000'), type='income', category='Salario', date=now, user_id=uid),
+            app_module.Transaction(title='Súper', amount=Decimal('1500'), type='expense', category='Comida', date=now, user_id=uid),
+            app_module.Budget(category='Comida', amount=Decimal('3000'), user_id=uid),
+            app_module.SavingsGoal(name='Viaje', target_amount=Decimal('10000'), current_amount=Decimal('500'),
+                                   target_date=now + timedelta(days=200), user_id=uid),
+            app_module.Subscription(name='Streaming', amount=Decimal('199'), category='Entretenimiento',
+                                    billing_period='monthly', next_due_date=now + timedelta(days=10), user_id=uid),
+        ])
+        app_module.db.session.commit()
+    return client
+
+
+def test_every_slot_is_filled_by_its_own_template(app_module, populated_client):
+    result = hydrate(app_module, populated_client)
+    assert result['errors'] == []
+    assert {slot['section'] for slot in result['slots']} == set(app_module.DASHBOARD_SECTIONS)
+    for slot in result['slots']:
+        assert slot['loading'] == 0, slot
+        # Todo lo que queda en el hueco viene del <template> con su mismo nombre
+        assert slot['origins'] == [slot['slot']], slot
+        assert slot['text'] and slot['text'] != '—', slot
+
+
+@pytest.mark.parametrize('failing', ['kpis', 'history', 'budgets', 'goals', 'subscriptions', 'transactions'])
+def test_failed_section_shows_fallback(app_module, populated_client, failing):
+    result = hydrate(app_module, populated_client, failing=failing)
+    assert any(failing in error for error in result['errors'])
+
+    failed = [slot for slot in result['slots'] if slot['section'] == failing]
+    # Los paneles muestran el aviso; las tarjetas de Aurelius conservan su marcador "—"
+    assert any(FALLBACK in slot['text'] for slot in failed)
+    for slot in failed:
+        assert slot['origins'] == [None], slot
+        assert FALLBACK in slot['text'] or slot['text'] == '—', slot
+
+    # Las demás secciones se hidratan con normalidad
+    for slot in result['slots']:
+        if slot['section'] != failing:
+            assert slot['loading'] == 0 and slot['origins'] == [slot['slot']], slot
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+
+def add_expense(app_module, user_id, amount, date, category='Comida', title='Súper'):
+    tx = app_module.Transaction(title=title, amount=amount, type='expense', category=category, date=date, user_id=user_id)
+    app_module.db.session.add(tx)
+    app_module.db.session.flush()
+    return tx
+
+
+def test_last_day_of_month_does_not_seed_next_month(app_module, user):
+    with app_module.app.app_context():
+        app_module.db.session.add(app_module.Budget(category='Comida', amount=100, user_id=user['id']))
+        add_expense(app_module, user['id'], 120, datetime(2026, 1, 20))
+        app_module.db.session.commit()
+
+        mid_month = app_module.build_cash_flow_forecast(user['id'], months=1, now=datetime(2026, 1, 25, 12))
+        last_day = app_module.build_cash_flow_forecast(user['id'], months=1, now=datetime(2026, 1, 31, 12))
+
+    # Sin historial completo no hay gasto proyectado: la alerta sale solo del gasto ya hecho en enero
+    assert [a['month'] for a in mid_month['alerts']['budgets']] == ['2026-01']
+    assert last_day['dates'][0] == '2026-02-01'
+    assert last_day['alerts']['budgets'] == []
+
+
+def test_history_excludes_subscription_charges_by_link(app_module, user):
+    with app_module.app.app_context():
+        sub = app_module.Subscription(name='Gym', amount=500, category='Salud', billing_period='mensual',
+                                      start_date=datetime(2025, 10, 5), next_due_date=datetime(2025, 10, 5),
+                                      user_id=user['id'])
+        app_module.db.session.add(sub)
+        app_module.db.session.commit()
+        app_module.bill_due_subscriptions(now=datetime(2026, 1, 15))
+        # Un gasto manual con el mismo título sí es parte del patrón histórico
+        add_expense(app_module, user['id'], 300, datetime(2025, 12, 10), category='Salud', title='Pago recurrente: Gym')
+        app_module.db.session.commit()
+
+        charges = app_module.SubscriptionCharge.query.filter_by(subscription_id=sub.id).all()
+        assert len(charges) == 4 and all(c.transaction_id for c in charges)
+
+        result = app_module.build_cash_flow_forecast(user['id'], months=1, now=datetime(2026, 1, 15, 12))
+
+    # Solo el gasto manual forma el patrón (300 el día 10) + el cobro programado del 5 de febrero
+    assert round(sum(result['expense']), 2) == 800.0
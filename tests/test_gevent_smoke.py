@@ -0,0 +1,73 @@
+"""Smoke check del worker gevent de gunicorn: los pools de app.py deben funcionar con monkey.patch_all().
+
+Corre en un subproceso porque el parcheo de gevent es global y debe hacerse antes de cualquier import,
+igual que en el worker. Mientras espera al pool de procesos (reportes) y al de hilos (búsqueda de
+Aurelius contra el servidor HTTPS local de benchmark.py), un greenlet cuenta ticks: si el hub se
+bloqueara, no avanzaría.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+pytest.importorskip('gevent')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SMOKE_SCRIPT = textwrap.dedent('''
+    from gevent import monkey
+    monkey.patch_all()
+
+    import os
+    import sys
+    import gevent
+
+    workdir = sys.argv[1]
+    sys.path.insert(0, sys.argv[2])
+    import benchmark
+    server, base_url, cert = benchmark.start_search_stand_in(workdir, 0.05)
+    os.environ.update(TAVILY_BASE_URL=base_url, REQUESTS_CA_BUNDLE=cert, TAVILY_API_KEY='smoke',
+                      DATABASE_URL='sqlite:///' + os.path.join(workdir, 'smoke.db'),
+                      REPORT_CACHE_DIR=os.path.join(workdir, 'report_cache'))
+    import app as A
+    import reports
+
+    ticks = [0]
+    def ticker():
+        while True:
+            ticks[0] += 1
+            gevent.sleep(0.01)
+    gevent.spawn(ticker)
+
+    # Reporte: ProcessPoolExecutor con contexto spawn
+    pdf_path = os.path.join(workdir, 'smoke.pdf')
+    before = ticks[0]
+    A.get_report_pool().submit(reports.render_report_pdf, 'Smoke', 2026, 1, [], A.REPORT_LOGO_PATH, pdf_path).result(timeout=90)
+    assert os.path.getsize(pdf_path) > 0
+    print('report ticks', ticks[0] - before)
+    assert ticks[0] - before >= 5, 'el hub se bloqueó esperando al pool de procesos'
+
+    # Búsqueda de Aurelius: fan-out en el ThreadPoolExecutor con el cliente Tavily compartido
+    before = ticks[0]
+    context = A.aurelius_executor.submit(A.aurelius_search_context, benchmark.FakeLLMClient(0), '¿Cómo está la inflación?', {}).result(timeout=30)
+    assert 'Resultado 0' in context, context
+    futures = [A.aurelius_executor.submit(A.get_tavily_client('smoke').search, query=f'tasa {i}', timeout=10) for i in range(8)]
+    assert all(len(f.result(timeout=30)['results']) == 3 for f in futures)
+    print('search ticks', ticks[0] - before)
+    assert ticks[0] - before >= 5, 'el hub se bloqueó esperando al pool de hilos'
+
+    A.get_report_pool().shutdown()
+    server.shutdown()
+    print('OK')
+''')
+
+
+@pytest.mark.skipif(shutil.which('openssl') is None, reason='el servidor HTTPS local necesita openssl')
+def test_report_pool_and_search_fanout_under_gevent(tmp_path):
+    result = subprocess.run([sys.executable, '-c', SMOKE_SCRIPT, str(tmp_path), ROOT],
+                            capture_output=True, text=True, timeout=180)
+    assert result.returncode == 0, result.stdout[-2000:] + result.stderr[-4000:]
+    assert result.stdout.strip().endswith('OK')
@@ -0,0 +1,39 @@
+import io
+from datetime import datetime
+from decimal import Decimal
+
+
+def add_transaction(app_module, user_id, **values):
+    with app_module.app.app_context():
+        app_module.db.session.add(app_module.Transaction(user_id=user_id, **values))
+        app_module.db.session.commit()
+
+
+def upload(client, content, filename='movimientos.csv'):
+    return client.post('/import_transactions', data={'file': (io.BytesIO(content.encode('utf-8')), filename)},
+                       content_type='multipart/form-data')
+
+
+def test_reimporting_an_export_skips_existing_rows(app_module, client, user):
+    # Movimientos con hora: la exportación solo conserva el día
+    add_transaction(app_module, user['id'], title='Café', amount=Decimal('3.50'), type='expense',
+                    category='Comida', date=datetime(2025, 6, 2, 8, 45))
+    add_transaction(app_module, user['id'], title='Sueldo', amount=Decimal('1500'), type='income',
+                    category='Salario', date=datetime(2025, 6, 30, 23, 10))
+
+    exported = client.get('/export_transactions?format=csv').get_data(as_text=True)
+    r = upload(client, exported)
+    assert r.json['success']
+    assert (r.json['imported'], r.json['duplicates']) == (0, 2)
+
+
+def test_same_day_different_amount_or_title_is_imported(app_module, client, user):
+    add_transaction(app_module, user['id'], title='Taxi', amount=Decimal('12.00'), type='expense',
+                    category='Transporte', date=datetime(2025, 7, 4, 19, 0))
+
+    r = upload(client, 'Fecha,Concepto,Tipo,Categoría,Monto\n'
+                       '2025-07-04,Taxi,Gasto,Transporte,12\n'
+                       '2025-07-04,Taxi,Gasto,Transporte,12.01\n'
+                       '2025-07-04,Taxi nocturno,Gasto,Transporte,12\n'
+                       '2025-07-05,Taxi,Gasto,Transporte,12\n')
+    assert (r.json['imported'], r.json['duplicates']) == (3, 1)
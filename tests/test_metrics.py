@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.fixture
+def anon(app_module):
+    return app_module.app.test_client()
+
+
+def test_metrics_hidden_without_token(app_module, anon, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', None)
+    assert anon.get('/metrics').status_code == 404
+
+
+def test_metrics_open_in_debug_without_token(app_module, anon, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', None)
+    monkeypatch.setattr(app_module.app, 'debug', True)
+    r = anon.get('/metrics')
+    assert r.status_code == 200
+    assert 'cache_hits_total' in r.get_data(as_text=True)
+
+
+def test_metrics_requires_bearer_token(app_module, anon, monkeypatch):
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', 's3cret')
+    assert anon.get('/metrics').status_code == 401
+    assert anon.get('/metrics', headers={'Authorization': 'Bearer otro'}).status_code == 401
+    assert anon.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
@@ -0,0 +1,73 @@
+"""Migración de montos float -> centavos sobre una base SQLite con el esquema anterior.
+
+Cada caso importa app.py en un subproceso: las migraciones corren al importarlo.
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = textwrap.dedent('''
+    import sqlite3
+    import sys
+    if sys.argv[2]:
+        # Simula un SQLite sin DROP COLUMN
+        sqlite3.sqlite_version_info = tuple(int(p) for p in sys.argv[2].split('.'))
+        sqlite3.sqlite_version = sys.argv[2]
+    sys.path.insert(0, sys.argv[1])
+    import app
+''')
+
+
+def legacy_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE "transaction" (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL, amount FLOAT NOT NULL, '
+                 'type VARCHAR(20) NOT NULL, category VARCHAR(50) NOT NULL, date DATETIME NOT NULL, description TEXT, '
+                 'user_id INTEGER NOT NULL)')
+    conn.executemany('INSERT INTO "transaction" (title, amount, type, category, date, user_id) VALUES (?, ?, ?, ?, ?, 1)', [
+        ('Café', 45.5, 'expense', 'Comida', '2024-02-29 10:00:00'),
+        ('Nómina', 15000.1, 'income', 'Salario', '2024-03-01 00:00:00'),
+    ])
+    conn.commit()
+    conn.close()
+
+
+def import_app(db_path, sqlite_version=''):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+    env.pop('TAVILY_API_KEY', None)
+    return subprocess.run([sys.executable, '-c', IMPORT_APP, ROOT, sqlite_version],
+                          capture_output=True, text=True, timeout=120, env=env)
+
+
+def transaction_columns(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[1] for row in conn.execute('PRAGMA table_info("transaction")')}
+    finally:
+        conn.close()
+
+
+def test_legacy_amounts_are_converted_to_cents(tmp_path):
+    db_path = tmp_path / 'legacy.db'
+    legacy_database(db_path)
+    result = import_app(db_path)
+    assert result.returncode == 0, result.stdout[-2000:] + result.stderr[-2000:]
+
+    assert 'amount' not in transaction_columns(db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('SELECT amount_cents FROM "transaction" ORDER BY id').fetchall() == [(4550,), (1500010,)]
+    conn.close()
+
+
+def test_old_sqlite_refuses_to_start_and_leaves_schema_untouched(tmp_path):
+    db_path = tmp_path / 'legacy.db'
+    legacy_database(db_path)
+    result = import_app(db_path, sqlite_version='3.34.1')
+
+    assert result.returncode != 0
+    assert 'no soporta DROP COLUMN' in result.stderr
+    columns = transaction_columns(db_path)
+    assert 'amount' in columns and 'amount_cents' not in columns
@@ -0,0 +1,78 @@
+"""Propiedades de exactitud de Money/to_cents/parse_money sobre montos generados al azar (semilla fija)."""
+import random
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+SEEDS = range(20)
+
+
+def random_amounts(rng, n, max_cents=10**11):
+    """Montos de 2 decimales como Decimal, incluidos negativos, ceros y valores grandes."""
+    amounts = []
+    for _ in range(n):
+        cents = rng.choice([rng.randint(0, 99), rng.randint(0, 10**6), rng.randint(0, max_cents)])
+        amounts.append(Decimal(cents * rng.choice([1, -1])).scaleb(-2))
+    return amounts
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_to_cents_roundtrip(app_module, seed):
+    rng = random.Random(seed)
+    for amount in random_amounts(rng, 200):
+        cents = app_module.to_cents(amount)
+        assert app_module.from_cents(cents) == amount
+        assert app_module.to_cents(str(amount)) == cents
+        assert app_module.to_cents(float(amount)) == cents
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_totals_in_cents_are_exact(app_module, seed):
+    rng = random.Random(seed)
+    amounts = random_amounts(rng, 500)
+    cents_total = sum(app_module.to_cents(a) for a in amounts)
+    assert app_module.from_cents(cents_total) == sum(amounts)
+    # Lo que el float no garantiza: sumar 0.1 mil veces
+    assert app_module.from_cents(sum(app_module.to_cents(0.1) for _ in range(1000))) == Decimal('100.00')
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_parse_money_rounds_half_up_to_cents(app_module, seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        cents = rng.randint(0, 10**9)
+        # Un tercer decimal 0..9 decide el redondeo del centavo
+        third = rng.randint(0, 9)
+        text = f"{Decimal(cents).scaleb(-2)}{third}"
+        expected = Decimal(cents + (1 if third >= 5 else 0)).scaleb(-2)
+        assert app_module.parse_money(text) == expected
+        assert app_module.parse_money(f"  {text} ") == expected
+        assert app_module.to_cents(app_module.parse_money(text)) == int(expected.scaleb(2))
+
+
+@pytest.mark.parametrize('value', ['', 'abc', '1,5', 'nan', 'inf', '-Infinity', None])
+def test_parse_money_rejects_invalid(app_module, value):
+    with pytest.raises(ValueError):
+        app_module.parse_money(value)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_sql_totals_match_decimal_sum(app_module, user, seed):
+    """Lo que suma la BD (BIGINT de centavos) coincide al centavo con la suma Decimal en Python."""
+    rng = random.Random(seed)
+    amounts = [abs(a) for a in random_amounts(rng, 300, max_cents=10**8)]
+    kinds = [rng.choice(['income', 'expense']) for _ in amounts]
+    with app_module.app.app_context():
+        app_module.db.session.add_all(app_module.Transaction(
+            title=f'm{i}', amount=amount, type=kind, category=rng.choice(['A', 'B', 'C']),
+            date=datetime(2025, 3, 1 + i % 28), user_id=user['id']
+        ) for i, (amount, kind) in enumerate(zip(amounts, kinds)))
+        app_module.db.session.commit()
+        kpis = app_module.get_period_kpis(user['id'], *app_module.month_range(2025, 3))
+
+    income = sum(a for a, k in zip(amounts, kinds) if k == 'income')
+    expense = sum(a for a, k in zip(amounts, kinds) if k == 'expense')
+    assert Decimal(kpis['total_income']) == income
+    assert Decimal(kpis['total_expense']) == expense
+    assert sum(Decimal(v) for v in kpis['cat_totals'].values()) == expense
@@ -0,0 +1,39 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+
+def get_summary(app_module, user_id, year, month):
+    return app_module.MonthlySummary.query.filter_by(user_id=user_id, year=year, month=month).one()
+
+
+def test_first_write_creates_the_month(app_module, user):
+    with app_module.app.app_context():
+        app_module.update_monthly_summary(user['id'], datetime(2025, 7, 3), 'expense', 'Comida', Decimal('12.50'))
+        app_module.update_monthly_summary(user['id'], datetime(2025, 7, 9), 'income', 'Salario', Decimal('1000'))
+        app_module.db.session.commit()
+
+        summary = get_summary(app_module, user['id'], 2025, 7)
+        assert (summary.total_income, summary.total_expense) == (Decimal('1000.00'), Decimal('12.50'))
+        assert summary.category_totals == {'Comida': 1250}
+        assert summary.tx_count == 2
+
+
+def test_row_created_by_another_transaction_is_reused(app_module, user):
+    """La fila del mes aparece entre el arranque de la transacción y la escritura (otro worker)."""
+    with app_module.app.app_context():
+        app_module.db.session.execute(text('SELECT 1'))
+        with app_module.db.engine.begin() as other:
+            other.execute(app_module.MonthlySummary.__table__.insert().values(
+                user_id=user['id'], year=2025, month=8, total_income_cents=Decimal(0), total_expense_cents=Decimal('5'),
+                category_totals={'Ocio': 500}, tx_count=1, version=1
+            ))
+
+        app_module.update_monthly_summary(user['id'], datetime(2025, 8, 20), 'expense', 'Ocio', Decimal('2.25'))
+        app_module.db.session.commit()
+
+        summary = get_summary(app_module, user['id'], 2025, 8)
+        assert summary.total_expense == Decimal('7.25')
+        assert summary.category_totals == {'Ocio': 725}
+        assert (summary.tx_count, summary.version) == (2, 2)
@@ -0,0 +1,103 @@
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+TODAY = datetime(2026, 1, 31, 10, 0)
+
+
+def loop_goal_plan(goal, today, avg_monthly_surplus):
+    """Cálculo por meta previo al motor vectorizado (referencia)."""
+    target, current = float(goal.target_amount), float(goal.current_amount)
+    progress = min(current / target * 100, 100) if target > 0 else 0
+    is_due_today = goal.target_date.date() == today.date()
+    is_past_due = goal.target_date.date() < today.date()
+    days_remaining = (goal.target_date.date() - today.date()).days
+    remaining = max(target - current, 0)
+
+    monthly = weekly = daily = 0
+    if not is_past_due and not is_due_today and remaining > 0:
+        diff_months = max((goal.target_date.year - today.year) * 12 + (goal.target_date.month - today.month), 1)
+        monthly = remaining / diff_months
+        daily = remaining / days_remaining
+        weekly = daily * 7
+
+    feasibility, color, msg = 'viable', 'success', 'Meta saludable'
+    if remaining > 0 and monthly > 0:
+        ratio = monthly / avg_monthly_surplus if avg_monthly_surplus > 0 else 999
+        if ratio > 1.2:
+            feasibility, color = 'retadora', 'danger'
+            msg = f"Requiere un esfuerzo extra de ${monthly:,.0f}/mes. Considera extender el plazo."
+        elif ratio > 0.8:
+            feasibility, color = 'ajustada', 'warning'
+            msg = f"Requiere disciplina. Usarás el {ratio*100:.0f}% de tu flujo libre."
+        else:
+            msg = "Tu flujo de caja actual soporta esta meta cómodamente."
+
+    return {
+        'progress': round(progress, 1), 'monthly_contribution': round(monthly, 2),
+        'weekly_contribution': round(weekly, 2), 'daily_contribution': round(daily, 2),
+        'remaining_amount': remaining, 'is_due_today': is_due_today, 'is_past_due': is_past_due,
+        'days_remaining': days_remaining, 'feasibility': feasibility, 'feasibility_color': color,
+        'feasibility_msg': msg,
+    }
+
+
+def goal(i, target, current, target_date):
+    return SimpleNamespace(id=i, name=f'Meta {i}', target_amount=Decimal(target), current_amount=Decimal(current),
+                           target_date=target_date)
+
+
+GOALS = [
+    goal(1, '5000', '1000', datetime(2025, 12, 1)),     # vencida
+    goal(2, '3000', '3000', datetime(2026, 6, 1)),      # ya financiada
+    goal(3, '3000', '3500', datetime(2026, 6, 1)),      # financiada de más
+    goal(4, '1200', '200', datetime(2026, 1, 31)),      # vence hoy
+    goal(5, '1200', '200', datetime(2026, 2, 1)),       # mañana, ya en el mes siguiente
+    goal(6, '10000.50', '0.25', datetime(2026, 2, 28)), # fin del mes siguiente
+    goal(7, '900', '0', datetime(2026, 12, 31)),
+    goal(8, '0', '0', datetime(2026, 3, 1)),            # objetivo cero
+]
+
+
+@pytest.mark.parametrize('surplus', [0, 150, 900, 5000])
+def test_vectorized_plan_matches_per_goal_loop(app_module, surplus):
+    plans = app_module.build_goal_plans(GOALS, TODAY, surplus)
+    for g, plan in zip(GOALS, plans):
+        expected = loop_goal_plan(g, TODAY, surplus)
+        actual = {key: plan[key] for key in expected}
+        actual['remaining_amount'] = float(actual['remaining_amount'])
+        assert actual == expected, g.name
+
+
+def test_what_if_shape_is_goals_by_scenarios(app_module, client):
+    goals = [{'name': f'G{i}', 'target_amount': '1000', 'current_amount': '100', 'target_date': '2030-01-01'} for i in range(3)]
+    r = client.post('/api/goals/what_if', json={'monthly_surplus': [10, 100, 1000, 10000], 'goals': goals})
+    assert r.status_code == 200
+    scenarios = r.json['scenarios']
+    assert [s['monthly_surplus'] for s in scenarios] == [10, 100, 1000, 10000]
+    assert all(len(s['goals']) == 3 for s in scenarios)
+
+    levels, ratios = app_module.pacing.rate_feasibility([100.0, 0.0, 250.0], [[10, 100, 1000, 10000]])
+    assert levels.shape == ratios.shape == (3, 4)
+    assert levels[1].tolist() == [app_module.pacing.HEALTHY] * 4
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'texto', 5, {'monthly_surplus': 'mucho'},
+                                  {'monthly_surplus': 100, 'goals': [{'target_amount': '1', 'target_date': 'ayer'}]},
+                                  {'monthly_surplus': 100, 'goals': [3]}])
+def test_what_if_rejects_malformed_bodies(client, body):
+    r = client.post('/api/goals/what_if', json=body)
+    assert r.status_code == 400
+    assert r.json['success'] is False
+
+
+def test_plan_goals_cli(app_module, user):
+    with app_module.app.app_context():
+        app_module.db.session.add(app_module.SavingsGoal(name='Viaje', target_amount=Decimal('1000'), current_amount=Decimal('0'),
+                                                         target_date=datetime(2030, 1, 1), user_id=user['id']))
+        app_module.db.session.commit()
+    result = app_module.app.test_cli_runner().invoke(args=['plan-goals', '--user-id', str(user['id'])])
+    assert result.exit_code == 0, result.output
+    assert '1 metas de 1 usuarios evaluadas' in result.output
@@ -0,0 +1,156 @@
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.mark.parametrize('year, month, start, end', [
+    (2025, 1, datetime(2025, 1, 1), datetime(2025, 2, 1)),
+    (2025, 12, datetime(2025, 12, 1), datetime(2026, 1, 1)),
+    (2024, 2, datetime(2024, 2, 1), datetime(2024, 3, 1)),
+    (2023, 2, datetime(2023, 2, 1), datetime(2023, 3, 1)),
+    (1999, 12, datetime(1999, 12, 1), datetime(2000, 1, 1)),
+])
+def test_month_range_boundaries(app_module, year, month, start, end):
+    assert app_module.month_range(year, month) == (start, end)
+
+
+@pytest.mark.parametrize('source, months, expected', [
+    (datetime(2024, 1, 31), 1, datetime(2024, 2, 29)),
+    (datetime(2023, 1, 31), 1, datetime(2023, 2, 28)),
+    (datetime(2024, 2, 29), 12, datetime(2025, 2, 28)),
+    (datetime(2025, 12, 15), 1, datetime(2026, 1, 15)),
+    (datetime(2026, 1, 15), -1, datetime(2025, 12, 15)),
+    (datetime(2024, 3, 31), -1, datetime(2024, 2, 29)),
+])
+def test_add_months_clamps_to_month_end(app_module, source, months, expected):
+    assert app_module.add_months(source, months) == expected
+
+
+def test_leap_day_falls_inside_february(app_module):
+    start, end = app_module.month_range(2024, 2)
+    assert start <= datetime(2024, 2, 29, 23, 59) < end
+    assert not start <= datetime(2024, 3, 1) < end
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('month=12&year=2025', (2025, 12)),
+    ('month=1&year=2026', (2026, 1)),
+    ('month=2&year=2024', (2024, 2)),
+    ('month=13&year=2025', None),
+    ('month=0&year=2025', None),
+    ('month=-1&year=2025', None),
+    ('month=5&year=0', None),
+    ('month=12&year=9999', None),
+])
+def test_parse_report_period_ranges(app_module, query, expected):
+    with app_module.app.test_request_context(f'/download_report?{query}'):
+        assert app_module.parse_report_period() == expected
+
+
+def test_parse_report_period_defaults_to_current_month(app_module):
+    now = datetime.now()
+    with app_module.app.test_request_context('/download_report?month=abc'):
+        assert app_module.parse_report_period() == (now.year, now.month)
+
+
+@pytest.mark.parametrize('url', ['/download_report?month=13', '/download_report?month=0&year=2025'])
+def test_download_report_rejects_invalid_month(client, url):
+    r = client.get(url)
+    assert r.status_code == 400
+    assert r.json['success'] is False
+
+
+def test_enqueue_report_rejects_invalid_month(client):
+    r = client.post('/reports', data={'month': '13', 'year': '2025'})
+    assert r.status_code == 400
+
+
+# Movimientos en los bordes de mes/año, incluido el 29 de febrero de un año bisiesto
+BOUNDARY_DATES = [
+    datetime(2023, 12, 31, 0, 0), datetime(2023, 12, 31, 23, 59, 59),
+    datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 31, 23, 59, 59),
+    datetime(2024, 2, 1, 0, 0), datetime(2024, 2, 28, 12, 0), datetime(2024, 2, 29, 0, 0), datetime(2024, 2, 29, 23, 59, 59),
+    datetime(2024, 3, 1, 0, 0), datetime(2024, 3, 1, 0, 0, 1),
+    datetime(2025, 2, 28, 23, 59, 59), datetime(2025, 3, 1, 0, 0),
+]
+BOUNDARY_MONTHS = [(2023, 12), (2024, 1), (2024, 2), (2024, 3), (2025, 2), (2025, 3)]
+
+
+@pytest.fixture
+def boundary_user(app_module, user):
+    from decimal import Decimal
+    with app_module.app.app_context():
+        for i, date in enumerate(BOUNDARY_DATES):
+            app_module.db.session.add(app_module.Transaction(
+                title=f'Borde {i}', amount=Decimal(10 + i), type='income' if i % 3 == 0 else 'expense',
+                category=f'Cat {i % 2}', date=date, user_id=user['id']))
+        app_module.db.session.commit()
+    return user
+
+
+def extract_rows(A, user_id, year, month):
+    """Filtro previo al rango [inicio, fin): extract(year/month) sobre la fecha."""
+    return A.Transaction.query.filter(
+        A.Transaction.user_id == user_id,
+        A.db.extract('year', A.Transaction.date) == year,
+        A.db.extract('month', A.Transaction.date) == month
+    ).all()
+
+
+def frozen_datetime(now):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now
+
+        @classmethod
+        def now(cls, tz=None):
+            return now
+    return FrozenDatetime
+
+
+@pytest.mark.parametrize('year, month', BOUNDARY_MONTHS)
+def test_kpis_match_extract_filter(app_module, boundary_user, year, month):
+    A = app_module
+    with A.app.app_context():
+        expected = extract_rows(A, boundary_user['id'], year, month)
+        kpis = A.get_period_kpis(boundary_user['id'], *A.month_range(year, month))
+        assert kpis['tx_count'] == len(expected)
+        assert kpis['total_income'] == sum(t.amount for t in expected if t.type == 'income')
+        assert kpis['total_expense'] == sum(t.amount for t in expected if t.type == 'expense')
+        cat_totals = {}
+        for t in expected:
+            if t.type == 'expense':
+                cat_totals[t.category] = cat_totals.get(t.category, 0) + t.amount
+        assert kpis['cat_totals'] == cat_totals
+
+
+@pytest.mark.parametrize('year, month', BOUNDARY_MONTHS)
+def test_dashboard_sections_match_extract_filter(app_module, boundary_user, monkeypatch, year, month):
+    A = app_module
+    # El dashboard usa el mes en curso: se congela el reloj en el último instante del mes
+    monkeypatch.setattr(A, 'datetime', frozen_datetime(A.month_range(year, month)[1] - timedelta(seconds=1)))
+    with A.app.app_context():
+        expected = extract_rows(A, boundary_user['id'], year, month)
+        kpis = A.dashboard_kpis(boundary_user['id'])
+        assert kpis['tx_count'] == len(expected)
+        assert kpis['balance'] == sum(t.amount if t.type == 'income' else -t.amount for t in expected)
+        page = A.dashboard_transactions(boundary_user['id'])
+        assert {t['id'] for t in page['transactions']} == {t.id for t in expected}
+
+
+@pytest.mark.parametrize('year, month', BOUNDARY_MONTHS)
+def test_report_rows_match_extract_filter(app_module, boundary_user, monkeypatch, tmp_path, year, month):
+    A = app_module
+    submitted = []
+    monkeypatch.setattr(A, 'REPORT_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(A, 'get_report_pool', lambda: SimpleNamespace(submit=lambda fn, *args: submitted.append(args) or Future()))
+    monkeypatch.setattr(A, '_report_jobs', {})
+    with A.app.app_context():
+        expected = extract_rows(A, boundary_user['id'], year, month)
+        A.report_job(A.db.session.get(A.User, boundary_user['id']), year, month)
+    transactions = submitted[0][3]
+    assert sorted((t['date'], t['title'], t['amount']) for t in transactions) == \
+        sorted((t.date, t.title, t.amount) for t in expected)
@@ -0,0 +1,75 @@
+from concurrent.futures import Future
+
+import pytest
+
+
+def finished(result=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+
+class FakePool:
+    """Ejecutor que registra los envíos y deja el future pendiente."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.submitted.append((args, future))
+        return future
+
+
+@pytest.fixture
+def report_env(app_module, monkeypatch, tmp_path):
+    pool = FakePool()
+    monkeypatch.setattr(app_module, 'REPORT_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'get_report_pool', lambda: pool)
+    monkeypatch.setattr(app_module, '_report_jobs', {})
+    return pool
+
+
+def test_prune_drops_succeeded_and_bounds_failed(app_module, report_env, monkeypatch):
+    monkeypatch.setattr(app_module, 'REPORT_FAILED_JOBS_MAX', 2)
+    pending = Future()
+    app_module._report_jobs.update({
+        'ok': finished(),
+        'fail-1': finished(error=RuntimeError('a')),
+        'running': pending,
+        'fail-2': finished(error=RuntimeError('b')),
+        'fail-3': finished(error=RuntimeError('c')),
+    })
+    with app_module._report_jobs_lock:
+        app_module.prune_report_jobs()
+    assert list(app_module._report_jobs) == ['running', 'fail-2', 'fail-3']
+
+
+def test_finished_job_without_pdf_is_rendered_again(app_module, user, report_env):
+    with app_module.app.app_context():
+        account = app_module.db.session.get(app_module.User, user['id'])
+        job_id, pdf_path, future = app_module.report_job(account, 2025, 3)
+        assert len(report_env.submitted) == 1
+
+        # El render terminó, pero el PDF ya no está (caché limpiada): se vuelve a encolar
+        future.set_result(None)
+        again_id, _, again = app_module.report_job(account, 2025, 3)
+        assert again_id == job_id
+        assert again is not future and not again.done()
+        assert len(report_env.submitted) == 2
+
+        # Un job en curso se reutiliza
+        assert app_module.report_job(account, 2025, 3)[2] is again
+        assert len(report_env.submitted) == 2
+
+
+def test_report_status_reports_failed_job(app_module, client, user, report_env):
+    with app_module.app.app_context():
+        account = app_module.db.session.get(app_module.User, user['id'])
+        job_id, _, future = app_module.report_job(account, 2025, 4)
+    future.set_exception(RuntimeError('render roto'))
+    r = client.get(f'/reports/{job_id}')
+    assert r.json['status'] == 'error'
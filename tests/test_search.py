@@ -0,0 +1,31 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+
+def test_search_matches_prefix_without_accents(app_module, client, user):
+    with app_module.app.app_context():
+        for title in ['Café de la esquina', 'Panadería', 'Cafetería central']:
+            app_module.db.session.add(app_module.Transaction(
+                title=title, amount=Decimal('4'), type='expense', category='Comida',
+                date=datetime(2025, 5, 1), user_id=user['id']
+            ))
+        app_module.db.session.commit()
+
+    assert app_module.transaction_search_backend == 'fts5'
+    r = client.get('/api/transactions/search?q=cafe')
+    assert {t['title'] for t in r.json['items']} == {'Café de la esquina', 'Cafetería central'}
+
+
+def test_backend_follows_what_exists_in_the_database(app_module):
+    with app_module.app.app_context():
+        with app_module.db.engine.begin() as conn:
+            conn.execute(text('DROP TRIGGER transaction_fts_au'))
+            assert app_module.detect_transaction_search_backend(conn) is None
+
+        # Otro arranque repara lo que falta y vuelve a detectar el índice
+        app_module.setup_transaction_search()
+        assert app_module.transaction_search_backend == 'fts5'
+        with app_module.db.engine.connect() as conn:
+            assert app_module.detect_transaction_search_backend(conn) == 'fts5'
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def identity_cache(app_module, monkeypatch):
+    cache = app_module.TTLCache()
+    monkeypatch.setattr(app_module, 'user_identity_cache', cache)
+    return cache
+
+
+def rename_with_core(A, user_id, name):
+    # UPDATE directo (sin eventos del ORM): simula un cambio que la caché no ve
+    A.db.session.execute(A.db.update(A.User).where(A.User.id == user_id).values(name=name))
+    A.db.session.commit()
+
+
+def test_cached_identity_is_used_until_invalidated(app_module, user, identity_cache):
+    A = app_module
+    with A.app.app_context():
+        first = A.get_session_user(user['id'])
+        assert (first.id, first.name, first.email) == (user['id'], 'Tester', user['email'])
+        rename_with_core(A, user['id'], 'Otro')
+
+        assert A.get_session_user(user['id']).name == 'Tester'
+        assert identity_cache.stats()['hits'] == 1
+
+        A.invalidate_session_user(user['id'])
+        assert A.get_session_user(user['id']).name == 'Otro'
+
+
+def test_user_loader_reads_from_cache(app_module, client, user, identity_cache):
+    A = app_module
+    client.get('/api/dashboard/kpis')
+    with A.app.app_context():
+        rename_with_core(A, user['id'], 'Sin Recargar')
+    hits = identity_cache.stats()['hits']
+    client.get('/api/dashboard/kpis')
+    assert identity_cache.stats()['hits'] == hits + 1
+    with A.app.test_request_context():
+        assert A.load_user(str(user['id'])).name == 'Tester'
+
+
+def test_orm_update_invalidates_on_commit(app_module, user, identity_cache):
+    A = app_module
+    with A.app.app_context():
+        A.get_session_user(user['id'])
+        account = A.db.session.get(A.User, user['id'])
+        account.name = 'Nuevo Nombre'
+        account.email = 'nuevo@test.local'
+        A.db.session.flush()
+        # Flush sin commit: la identidad cacheada sigue siendo la confirmada
+        assert identity_cache.get(user['id']) is not None
+        A.db.session.commit()
+
+        assert identity_cache.get(user['id']) is None
+        fresh = A.get_session_user(user['id'])
+        assert (fresh.name, fresh.email) == ('Nuevo Nombre', 'nuevo@test.local')
+
+
+def test_rolled_back_update_keeps_identity(app_module, user, identity_cache):
+    A = app_module
+    with A.app.app_context():
+        A.get_session_user(user['id'])
+        A.db.session.get(A.User, user['id']).name = 'Descartado'
+        A.db.session.flush()
+        A.db.session.rollback()
+        assert 'stale_user_ids' not in A.db.session.info
+        assert A.get_session_user(user['id']).name == 'Tester'
+
+
+def test_update_password_evicts_identity(app_module, client, user, identity_cache):
+    A = app_module
+    client.get('/api/dashboard/kpis')
+    assert identity_cache.stats()['size'] == 1
+    r = client.post('/update_password', data={
+        'current_password': user['password'], 'new_password': 'Nueva#Clave1', 'confirm_password': 'Nueva#Clave1'})
+    assert r.status_code == 302
+    assert identity_cache.stats()['size'] == 0
+    with A.app.app_context():
+        from werkzeug.security import check_password_hash
+        assert check_password_hash(A.db.session.get(A.User, user['id']).password, 'Nueva#Clave1')
+
+
+class DictRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def test_identity_round_trips_through_shared_cache(app_module, user, monkeypatch):
+    A = app_module
+    redis = DictRedis()
+    monkeypatch.setattr(A, 'user_identity_cache', A.RedisCache(redis, 'user_identity', ttl=60))
+    with A.app.app_context():
+        A.get_session_user(user['id'])
+        assert json.loads(redis.data[f"finanzapp:user_identity:{user['id']}"]) == [user['id'], 'Tester', user['email'], 'email']
+        cached = A.get_session_user(user['id'])
+        assert isinstance(cached, A.SessionUser)
+        assert (cached.id, cached.name, cached.is_authenticated) == (user['id'], 'Tester', True)
+
+        A.db.session.get(A.User, user['id']).name = 'Compartido'
+        A.db.session.commit()
+        assert redis.data == {}
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 50.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class SpyLLM:
+    """Cliente LLM falso que cuenta las llamadas."""
+
+    def __init__(self):
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='Respuesta del modelo.'))])
+
+
+@pytest.fixture
+def llm(app_module, monkeypatch):
+    spy = SpyLLM()
+    monkeypatch.setenv('GROQ_API_KEY', 'test')
+    monkeypatch.setattr(app_module, 'get_llm_client', lambda api_key: spy)
+    monkeypatch.setattr(app_module, 'support_answer_cache', app_module.TTLCache())
+    monkeypatch.setattr(app_module, 'support_limiter', app_module.TokenBucketLimiter(rate=0, capacity=100))
+    return spy
+
+
+@pytest.mark.parametrize('variant', ['¿Es gratis?', 'es gratis', '  ES   GRATIS!!! ', '¿És grátis?', 'es, gratis...'])
+def test_question_variants_share_support_key(app_module, variant):
+    assert app_module.support_key(variant) == app_module.support_key('¿Es gratis?') == 'es gratis'
+
+
+def test_different_questions_have_different_keys(app_module):
+    assert app_module.support_key('¿Es gratis?') != app_module.support_key('¿Es seguro?')
+
+
+def test_faq_hit_skips_llm(app_module, llm):
+    app = app_module.app.test_client()
+    r = app.post('/api/ask_support', json={'message': '¿CUANTO cuesta???'})
+    assert r.status_code == 200
+    assert r.json['response'] == app_module.SUPPORT_FAQ[app_module.support_key('¿Cuánto cuesta?')]
+    assert llm.calls == []
+
+
+def test_llm_answer_is_cached_by_normalized_question(app_module, llm):
+    app = app_module.app.test_client()
+    first = app.post('/api/ask_support', json={'message': '¿Puedo usarla en mi celular?'})
+    second = app.post('/api/ask_support', json={'message': 'puedo usarla en mi celular'})
+    assert first.json == second.json == {'response': 'Respuesta del modelo.'}
+    assert len(llm.calls) == 1
+
+
+def test_route_returns_429_when_bucket_is_empty(app_module, llm, monkeypatch):
+    monkeypatch.setattr(app_module, 'support_limiter', app_module.TokenBucketLimiter(rate=0, capacity=1))
+    app = app_module.app.test_client()
+    assert app.post('/api/ask_support', json={'message': 'pregunta nueva uno'}).status_code == 200
+    assert app.post('/api/ask_support', json={'message': 'pregunta nueva dos'}).status_code == 429
+    # Las FAQ no consumen cuota
+    assert app.post('/api/ask_support', json={'message': 'Contacto'}).status_code == 200
+    assert len(llm.calls) == 1
+
+
+def test_token_bucket_refuses_past_capacity_and_refills(app_module):
+    clock = FakeClock()
+    limiter = app_module.TokenBucketLimiter(rate=2, capacity=3, clock=clock)
+    assert [limiter.allow('ip') for _ in range(4)] == [True, True, True, False]
+
+    clock.advance(0.25)  # medio token
+    assert limiter.allow('ip') is False
+    clock.advance(0.25)  # el rechazo no consume: medio + medio = un token
+    assert limiter.allow('ip') is True
+    assert limiter.allow('ip') is False
+
+    clock.advance(60)  # el relleno se topa en capacity
+    assert [limiter.allow('ip') for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_is_per_key_and_bounded(app_module):
+    clock = FakeClock()
+    limiter = app_module.TokenBucketLimiter(rate=0, capacity=1, max_keys=2, clock=clock)
+    assert limiter.allow('a') and limiter.allow('b')
+    assert not limiter.allow('a')
+    # 'c' desaloja a 'b' (la clave usada hace más tiempo), que vuelve con el cubo lleno
+    assert limiter.allow('c')
+    assert limiter.allow('b')
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+
+@pytest.fixture
+def many_user(app_module, user):
+    """23 movimientos: 15 con la misma fecha y hora (solo el id los desempata) y 8 en días anteriores."""
+    same = datetime(2025, 5, 10, 12, 0)
+    with app_module.app.app_context():
+        for i in range(23):
+            app_module.db.session.add(app_module.Transaction(
+                title=f'Mov {i}', amount=Decimal('1.50'), type='expense', category='Otros',
+                date=same if i < 15 else same - timedelta(days=i), user_id=user['id']))
+        app_module.db.session.commit()
+        ids = [t.id for t in app_module.Transaction.query.filter_by(user_id=user['id']).order_by(
+            app_module.Transaction.date.desc(), app_module.Transaction.id.desc())]
+    return {**user, 'ordered_ids': ids}
+
+
+@pytest.mark.parametrize('limit', [1, 4, 5, 15, 22, 23, 200])
+def test_pages_are_continuous_without_overlap(client, many_user, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = f'/api/transactions?limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        r = client.get(url)
+        assert r.status_code == 200
+        items = r.json['items']
+        assert len(items) <= limit
+        seen.extend(item['id'] for item in items)
+        cursor = r.json['next_cursor']
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == many_user['ordered_ids']
+    # Sin página vacía al final: la última página con datos ya no trae cursor
+    assert pages == -(-23 // limit)
+
+
+def test_last_page_has_no_cursor(app_module, many_user):
+    with app_module.app.app_context():
+        rows, cursor = app_module.transactions_page(many_user['id'], {}, limit=20)
+        assert len(rows) == 20 and cursor is not None
+        rows, cursor = app_module.transactions_page(many_user['id'], {}, limit=20, cursor=cursor)
+        assert [r.id for r in rows] == many_user['ordered_ids'][20:]
+        assert cursor is None
+        # Exactamente limit filas restantes: tampoco hay cursor
+        rows, cursor = app_module.transactions_page(many_user['id'], {}, limit=23)
+        assert len(rows) == 23 and cursor is None
+
+
+def test_cursor_round_trip(app_module, many_user):
+    with app_module.app.app_context():
+        _, cursor = app_module.transactions_page(many_user['id'], {}, limit=3)
+    date, row_id = app_module.decode_transactions_cursor(cursor)
+    assert date == datetime(2025, 5, 10, 12, 0)
+    assert row_id == many_user['ordered_ids'][2]
+
+
+@pytest.mark.parametrize('cursor', [
+    'abc', '.', '20250510120000000000', '20250510120000000000.', '.15',
+    '20250510120000000000.x', '20250510120000000000.1.2', '2025051012000000000.1',
+    '20251310120000000000.1', '20250510120000000000.-5', '20250510120000000000.99999999999999999999999',
+    '20250510120000000000. 5', '２０２５0510120000000000.1',
+])
+def test_malformed_cursor_is_rejected(client, many_user, cursor):
+    r = client.get('/api/transactions', query_string={'cursor': cursor})
+    assert r.status_code == 400
+    assert r.json == {'success': False, 'message': 'Parámetros inválidos.'}
+
+
+@pytest.mark.parametrize('limit', ['0', '-1', '201', '100000', 'diez', '1.5'])
+def test_out_of_range_limit_is_rejected(client, many_user, limit):
+    r = client.get(f'/api/transactions?limit={limit}')
+    assert r.status_code == 400
+    assert r.json['success'] is False
+
+
+def test_cursor_only_pages_own_transactions(client, app_module, many_user):
+    # Un cursor válido de otra persona solo desplaza la ventana: el filtro por usuario se mantiene
+    r = client.get('/api/transactions?limit=200&cursor=99991231235959999999.999999999')
+    assert r.status_code == 200
+    assert [item['id'] for item in r.json['items']] == many_user['ordered_ids']